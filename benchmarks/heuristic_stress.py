@@ -0,0 +1,112 @@
+"""
+Worst-case latency benchmark for HeuristicTextParser.
+
+Parses generated adversarial inputs (long separator runs after labels,
+repeated labels, garbage OCR) at growing sizes and reports the parse time
+and its growth exponent: ~1 is linear, ~2 is the quadratic backtracking
+this guards against. Fails if any input grows faster than --max-exponent
+or takes longer than --budget-ms at the largest size.
+
+    python benchmarks/heuristic_stress.py
+    python benchmarks/heuristic_stress.py --sizes 20000 80000 320000 --no-guard
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+GARBAGE_WORDS = [
+    "Invoice", "inv", "No:", "#", "Ref:", "ID", "Total", "Subtotal", "Tax", "VAT",
+    "$", "€", "1,234.56", "194,82", "2024-01-05", "Jan", "Seller:", "FROM", ":", "\n",
+]
+
+# Input name -> generator(n chars)
+GENERATORS = {
+    "invoice_whitespace": lambda n: "Invoice" + " " * n + "!",
+    "invoice_breaks": lambda n: "Invoice" + " \n:" * (n // 3),
+    "invoice_repeated": lambda n: "inv " * (n // 4),
+    "ref_separators": lambda n: "Ref" + " #:." * (n // 4) + "!",
+    "id_breaks": lambda n: "id" + " \n" * (n // 2) + "!",
+    "money_whitespace": lambda n: "$" + " " * n,
+    "money_repeated": lambda n: "$ 1," * (n // 4),
+    "subtotal_whitespace": lambda n: "Sub" + " " * n + "-",
+    "sales_tax_whitespace": lambda n: "Sales" + " " * n + "x",
+    "month_whitespace": lambda n: "Jan" + " " * n + "x",
+    "vendor_unterminated": lambda n: "Seller:" + "x" * n,
+    "vendor_repeated": lambda n: "BILL FROM " * (n // 10),
+    "vendor_separators": lambda n: "FROM" + " :\n" * (n // 3) + "x",
+    "digits": lambda n: "1" * n,
+    "garbage": lambda n: _garbage(n),
+}
+
+
+def _garbage(n: int) -> str:
+    rng = random.Random(n)
+    words, size = [], 0
+    while size < n:
+        word = rng.choice(GARBAGE_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def measure(parser, text: str, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress HeuristicTextParser with worst-case inputs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 40_000, 160_000],
+        help="Input sizes in characters (ascending)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per input, best is kept")
+    parser.add_argument("--max-exponent", type=float, default=1.5,
+        help="Fail if time grows faster than size**max_exponent")
+    parser.add_argument("--budget-ms", type=float, default=1000.0,
+        help="Fail if an input takes longer at the largest size")
+    parser.add_argument("--no-guard", action="store_true",
+        help="Disable truncation and the time budget (measures the patterns alone)")
+    args = parser.parse_args()
+
+    if args.no_guard:
+        os.environ["HEURISTIC__MAX_CHARS"] = str(10 ** 12)
+        os.environ["HEURISTIC__TIME_BUDGET_MS"] = str(10 ** 9)
+
+    from src.services.parser.providers.heuristic.heuristic_text import \
+        HeuristicTextParser
+    text_parser = HeuristicTextParser()
+
+    header = " ".join(f"{size:>10}" for size in args.sizes)
+    print(f"{'input':<22} {header} {'exponent':>9}")
+
+    failed = []
+    for name, generate in GENERATORS.items():
+        times = [measure(text_parser, generate(size), args.repeat) for size in args.sizes]
+
+        # Growth between the two largest sizes (small inputs are noise-bound)
+        exponent = math.log(max(times[-1], 1e-3) / max(times[-2], 1e-3)) / math.log(
+            args.sizes[-1] / args.sizes[-2]
+        ) if len(times) > 1 else 0.0
+
+        row = " ".join(f"{t:8.1f}ms" for t in times)
+        print(f"{name:<22} {row} {exponent:9.2f}")
+
+        if exponent > args.max_exponent or times[-1] > args.budget_ms:
+            failed.append(name)
+
+    if failed:
+        print(f"\nFAILED: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
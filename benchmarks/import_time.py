@@ -0,0 +1,88 @@
+"""
+Import-time regression guard.
+
+Imports each entry point in a fresh interpreter, reports the wall time and
+fails if it exceeds its budget or pulls in a heavy OCR/LLM dependency that
+should only load when a provider is selected.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 5 --budget-scale 2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point -> import-time budget (ms)
+TARGETS = {
+    "src.services.ocr.factory": 1500,
+    "src.services.ocr.main": 1500,
+    "src.services.parser.main": 2500,
+    "app": 1500,
+}
+
+# Must not be imported until a provider is actually used
+HEAVY_MODULES = [
+    "paddleocr",
+    "paddle",
+    "onnxruntime",
+    "cv2",
+    "pytesseract",
+    "pdfplumber",
+    "langchain_core",
+    "langchain_openai",
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {target}
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"ms": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(target: str):
+    code = PROBE.format(target=target, heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of entry points.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per target")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply all budgets (slow CI)")
+    args = parser.parse_args()
+
+    failed = False
+    for target, budget_ms in TARGETS.items():
+        runs = [measure(target) for _ in range(args.repeat)]
+        median_ms = statistics.median(r["ms"] for r in runs)
+        heavy = sorted({m for r in runs for m in r["heavy"]})
+        budget_ms *= args.budget_scale
+
+        status = "ok"
+        if heavy:
+            status = f"FAIL (imports {', '.join(heavy)})"
+        elif median_ms > budget_ms:
+            status = f"FAIL (budget {budget_ms:.0f}ms)"
+        failed = failed or status != "ok"
+
+        print(f"{target:<28} {median_ms:8.1f}ms  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Simple load generator for the HTTP service (stdlib only).
+
+    uvicorn src.main:app --workers 4
+    python benchmarks/load_service.py data/ --endpoint /process --concurrency 32 --requests 500
+
+Reports throughput, latency percentiles and how many requests were shed (429).
+"""
+import argparse
+import http.client
+import mimetypes
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+VALID_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".tiff"}
+
+
+def build_multipart(file_path: str):
+    boundary = uuid.uuid4().hex
+    filename = os.path.basename(file_path)
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def send(url, endpoint: str, payload):
+    body, content_type = payload
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=300)
+    start = time.perf_counter()
+    try:
+        conn.request("POST", endpoint, body=body, headers={"Content-Type": content_type})
+        status = conn.getresponse().status
+    except Exception:
+        status = -1
+    finally:
+        conn.close()
+    return status, time.perf_counter() - start
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the InvoiceFlow HTTP service.")
+    parser.add_argument("path", help="Invoice file or folder to upload")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="/process", choices=["/ocr", "/process"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    if os.path.isdir(args.path):
+        files = [
+            os.path.join(args.path, f) for f in sorted(os.listdir(args.path))
+            if os.path.splitext(f)[1].lower() in VALID_EXTENSIONS
+        ]
+    else:
+        files = [args.path]
+    if not files:
+        parser.error("No invoice files found")
+
+    payloads = [build_multipart(fp) for fp in files]
+    url = urlparse(args.url)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(
+            lambda i: send(url, args.endpoint, payloads[i % len(payloads)]),
+            range(args.requests)
+        ))
+    elapsed = time.perf_counter() - start
+
+    ok = [latency for status, latency in results if status == 200]
+    shed = sum(1 for status, _ in results if status == 429)
+    failed = len(results) - len(ok) - shed
+
+    print(f"requests:   {len(results)} in {elapsed:.2f}s ({len(results) / elapsed:.1f} req/s)")
+    print(f"ok:         {len(ok)} ({len(ok) / elapsed:.1f} req/s)")
+    print(f"shed (429): {shed}")
+    print(f"failed:     {failed}")
+    if ok:
+        print(
+            f"latency:    p50={percentile(ok, 50) * 1000:.0f}ms "
+            f"p95={percentile(ok, 95) * 1000:.0f}ms "
+            f"p99={percentile(ok, 99) * 1000:.0f}ms "
+            f"mean={statistics.mean(ok) * 1000:.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
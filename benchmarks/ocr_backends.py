@@ -0,0 +1,125 @@
+"""
+Side-by-side OCR engine benchmark on the same images.
+
+Each engine runs in a fresh interpreter, so import time, model load time
+and peak memory are measured independently. Reports per-image latency,
+throughput and text agreement with the first engine (the reference).
+
+    python benchmarks/ocr_backends.py data/ --engines paddleocr onnx
+    OCR__ONNX_QUANTIZED=true python benchmarks/ocr_backends.py data/ --engines paddleocr onnx --repeat 5
+"""
+import argparse
+import difflib
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff"}
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from src.services.ocr.factory import InvoiceExtractorFactory
+extractor = InvoiceExtractorFactory.get_engine({engine!r})
+load_ms = (time.perf_counter() - start) * 1000
+
+images = {images!r}
+InvoiceExtractorFactory.extract(extractor, images[0])  # warm-up
+
+latencies, texts, errors = [], {{}}, 0
+for _ in range({repeat}):
+    for path in images:
+        start = time.perf_counter()
+        result = InvoiceExtractorFactory.extract(extractor, path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if result.error:
+            errors += 1
+        texts[path] = result.text or ""
+
+print(json.dumps({{
+    "load_ms": load_ms,
+    "latencies": latencies,
+    "errors": errors,
+    "texts": texts,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def run_engine(engine: str, images: list, repeat: int) -> dict:
+    code = PROBE.format(engine=engine, images=images, repeat=repeat)
+    env = {**os.environ, "OCR__OCR_OUTPUT_MODE": "text"}
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"{engine} failed:\n{out.stderr.strip()}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def agreement(reference: dict, texts: dict) -> float:
+    """Mean character-level similarity (0-1) to the reference engine."""
+    ratios = [
+        difflib.SequenceMatcher(None, reference[path], texts.get(path, "")).ratio()
+        for path in reference
+    ]
+    return statistics.mean(ratios) if ratios else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR engines on the same images.")
+    parser.add_argument("path", help="Image file or folder")
+    parser.add_argument("--engines", nargs="+", default=["paddleocr", "onnx"],
+        help="Engine names (see ENGINE_MAPPING); the first is the reference")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the images per engine")
+    parser.add_argument("--limit", type=int, default=50, help="Max images")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.path):
+        images = sorted(
+            os.path.abspath(os.path.join(args.path, f)) for f in os.listdir(args.path)
+            if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS
+        )[:args.limit]
+    else:
+        images = [os.path.abspath(args.path)]
+
+    if not images:
+        print(f"No images found in {args.path}")
+        sys.exit(1)
+
+    print(f"{len(images)} images x {args.repeat} passes\n")
+    print(f"{'engine':<12} {'load':>9} {'p50':>9} {'p95':>9} {'img/s':>7} {'rss':>8} {'agree':>6} {'errors':>6}")
+
+    reference = None
+    for engine in args.engines:
+        try:
+            stats = run_engine(engine, images, args.repeat)
+        except RuntimeError as e:
+            print(f"{engine:<12} {e}")
+            continue
+
+        latencies = sorted(stats["latencies"])
+        p50 = statistics.median(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        throughput = len(latencies) / (sum(latencies) / 1000)
+
+        if reference is None:
+            reference = stats["texts"]
+        agree = agreement(reference, stats["texts"])
+
+        print(
+            f"{engine:<12} {stats['load_ms']:8.0f}ms {p50:8.1f}ms {p95:8.1f}ms "
+            f"{throughput:7.2f} {stats['peak_rss_mb']:6.0f}MB {agree:6.2f} {stats['errors']:6d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
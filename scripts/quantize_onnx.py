@@ -0,0 +1,39 @@
+"""
+Writes dynamically int8-quantized copies of the ONNX OCR models next to
+them (det.onnx -> det_int8.onnx), used when OCRSettings.onnx_quantized is
+set. Needs the "onnx" extra.
+
+    python scripts/quantize_onnx.py
+    python scripts/quantize_onnx.py --models models/onnx/det.onnx
+
+Compare the quantized engine against the float one with
+benchmarks/ocr_backends.py (OCR__ONNX_QUANTIZED=true).
+"""
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def main():
+    from src.config import get_settings
+    from src.services.ocr.providers.onnx_ocr import quantized_path
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Quantize the ONNX OCR models to int8.")
+    parser.add_argument("--models", nargs="+",
+        default=[settings.ocr.onnx_det_model, settings.ocr.onnx_rec_model],
+        help="Models to quantize (default: the configured detection and recognition models)")
+    args = parser.parse_args()
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    for model in args.models:
+        quantize_dynamic(model, quantized_path(model), weight_type=QuantType.QUInt8)
+        print(f"Quantized {model} -> {quantized_path(model)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -37,6 +37,70 @@ class OCRSettings(BaseConfigSettings):
     max_pages: int = 20
     ocr_output_mode: Literal["text", "json", "table"] = "text"
 
+    # PDF text layer: page-parallel extraction for long documents (off with
+    # one worker); the threshold stays below max_pages so it can apply
+    pdf_page_workers: int = 1
+    pdf_parallel_min_pages: int = 8
+
+    # Scanned PDFs: rasterize pages without a text layer and OCR them
+    pdf_ocr_fallback: bool = True
+    pdf_raster_dpi: int = 200
+    pdf_min_text_chars: int = 10
+    pdf_ocr_extension: str = ".png"  # picks the image provider via EXTRACTOR_MAPPING
+    pdf_ocr_workers: int = 2
+
+    # PaddleOCR tiling: images with a side >= tile_min_side are OCR'd at
+    # full resolution in overlapping tiles instead of being downscaled
+    tiling_enabled: bool = False
+    tile_size: int = 960
+    tile_overlap: int = 128
+    tile_min_side: int = 1600
+
+    # OCR cascade for images: cheap engines first, escalate when the result
+    # falls below any threshold (confidence 0-100, non-space characters,
+    # invoice fields found by the heuristic parser)
+    cascade_enabled: bool = False
+    cascade_engines: list[str] = ["tesseract", "paddleocr"]
+    cascade_min_confidence: float = 70.0
+    cascade_min_chars: int = 40
+    cascade_min_fields: int = 2
+
+    # Multi-page images (TIFF): frames OCR'd concurrently, up to max_pages
+    image_page_workers: int = 2
+
+    # ONNX Runtime OCR engine ("onnx"): PaddleOCR det/rec models exported to ONNX
+    onnx_det_model: str = str(PROJECT_ROOT / "models" / "onnx" / "det.onnx")
+    onnx_rec_model: str = str(PROJECT_ROOT / "models" / "onnx" / "rec.onnx")
+    onnx_rec_dict: str = str(PROJECT_ROOT / "models" / "onnx" / "rec_dict.txt")
+    onnx_quantized: bool = False  # use *_int8.onnx next to the models (scripts/quantize_onnx.py)
+    onnx_intra_op_threads: int = 0  # 0 = ONNX Runtime default
+    onnx_det_limit_side: int = 960
+
+    # Engine per extension, overriding EXTRACTOR_MAPPING (e.g. {".jpg": "onnx"})
+    extractor_overrides: dict[str, str] = {}
+
+    # Tesseract: "auto" uses the in-process tesserocr engine when installed
+    tesseract_backend: Literal["auto", "tesserocr", "subprocess"] = "auto"
+    tesseract_lang: str = "eng"
+
+    # On-disk OCR result cache
+    cache_enabled: bool = True
+    cache_dir: str = str(PROJECT_ROOT / "cache" / "ocr")
+    cache_max_bytes: int = 2 * 1024 ** 3  # 2 GiB
+
+    # Memory budget for cached extractor instances (OCR models)
+    extractor_cache_max_bytes: int = 3 * 1024 ** 3  # 3 GiB
+
+    # Async OCR (InvoiceExtractorFactory.aextract)
+    async_max_concurrency: int = 4
+    async_timeout_sec: float = 120.0
+
+    # Micro-batching of concurrent async OCR calls (extractors with
+    # batched inference only, e.g. PaddleOCR)
+    batch_enabled: bool = False
+    batch_max_size: int = 8
+    batch_max_wait_ms: float = 10.0
+
 
 class LLMParserSettings(BaseConfigSettings):
     model_name: str = "gpt-4o-mini"
@@ -45,6 +109,26 @@ class LLMParserSettings(BaseConfigSettings):
     retry_delay_sec: float = 2.0
 
 
+class HeuristicParserSettings(BaseConfigSettings):
+    # Guard against pathological OCR dumps (multi-megabyte garbage from bad
+    # scans): longer texts keep their head and tail, and fields not
+    # extracted within the time budget (CPU time of the parsing thread)
+    # are left empty
+    max_chars: int = 200_000
+    time_budget_ms: float = 500.0
+
+
+class ServiceSettings(BaseConfigSettings):
+    # Requests admitted at once (running + waiting); beyond this -> 429
+    max_pending_requests: int = 32
+    # Files per /batch request; also capped at max_pending_requests, since
+    # each file takes an admission slot
+    max_batch_files: int = 100
+    # Extractors loaded at worker start-up, by file extension
+    prewarm_extensions: list[str] = [".pdf", ".jpg", ".tif"]
+    default_parser: str = "heuristic"
+
+
 # class AppSettings(BaseConfigSettings):
 #     service_name: str = "InvoiceAI"
 #     environment: Literal["development", "staging", "production"] = "development"
@@ -56,6 +140,8 @@ class Settings(BaseConfigSettings):
     db: DatabaseSettings = Field(default_factory=DatabaseSettings)
     ocr: OCRSettings = Field(default_factory=OCRSettings)
     llm: LLMParserSettings = Field(default_factory=LLMParserSettings)
+    heuristic: HeuristicParserSettings = Field(default_factory=HeuristicParserSettings)
+    service: ServiceSettings = Field(default_factory=ServiceSettings)
     # app: AppSettings = Field(default_factory=AppSettings)
 
 @lru_cache
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from src.config import get_settings
+from src.models.models import OCRResult
+from src.services.ocr.cache import get_ocr_cache
+from src.services.ocr.factory import InvoiceExtractorFactory
+from src.services.ocr.main import aprocess_invoice
+from src.services.ocr.providers.cascade import cascade_stats
+from src.services.parser.factory import ParserFactory
+from src.services.parser.interface import BaseParser
+from src.services.parser.main import (VALID_EXTENSIONS, _serialize,
+                                      parse_ocr_output)
+from src.services.parser.reparse import ocr_result_from_payload
+from src.utils.logging_config import logger
+
+settings = get_settings()
+
+
+# Admission control
+class AdmissionQueue:
+    """
+    Bounded admission for the whole worker: requests beyond capacity are
+    rejected with 429 instead of queueing without limit.
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.pending = 0
+
+    def acquire(self, n: int = 1):
+        if self.pending + n > self.capacity:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Server busy ({self.pending}/{self.capacity} pending)",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += n
+
+    def release(self, n: int = 1):
+        self.pending = max(0, self.pending - n)
+
+
+admission = AdmissionQueue(settings.service.max_pending_requests)
+
+
+# Parsers (one instance per name per worker). Building one imports its
+# provider (and, for the LLM parser, its client), so it runs in a thread
+# instead of on the event loop; the lock keeps concurrent first requests
+# from building the same parser twice.
+_PARSERS: Dict[str, BaseParser] = {}
+_parsers_lock = asyncio.Lock()
+
+
+async def _get_parser(parser_name: str) -> BaseParser:
+    parser_name = parser_name.lower()
+    if parser_name in _PARSERS:
+        return _PARSERS[parser_name]
+
+    async with _parsers_lock:
+        if parser_name not in _PARSERS:
+            try:
+                _PARSERS[parser_name] = await asyncio.to_thread(ParserFactory.get_parser, parser_name)
+            except (ValueError, RuntimeError) as e:
+                raise HTTPException(status_code=400, detail=str(e))
+    return _PARSERS[parser_name]
+
+
+# Worker start-up: load models once per worker process
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for ext in settings.service.prewarm_extensions:
+        try:
+            await asyncio.to_thread(InvoiceExtractorFactory.prewarm, [ext])
+        except Exception as e:
+            logger.warning(f"[Service] Could not prewarm extractor for {ext}: {e}")
+    logger.info(f"[Service] Extractor cache: {InvoiceExtractorFactory.cache_info()}")
+
+    await _get_parser(settings.service.default_parser)
+    logger.info(f"[Service] Worker {os.getpid()} ready")
+
+    yield
+
+    InvoiceExtractorFactory.shutdown_async_executor(wait=False)
+
+
+app = FastAPI(title="InvoiceFlow AI", lifespan=lifespan)
+
+
+# Helpers
+def _json_response(payload: Any, status_code: int = 200) -> Response:
+    return Response(
+        content=json.dumps(payload, default=_serialize),
+        media_type="application/json",
+        status_code=status_code,
+    )
+
+
+def _dump_ocr(ocr_result: OCRResult, include_raw: bool) -> Dict[str, Any]:
+    dumped = ocr_result.model_dump()
+    if not include_raw:
+        dumped["raw"] = None
+    return dumped
+
+
+def _check_extension(filename: Optional[str]) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in VALID_EXTENSIONS:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported file type '{ext}'. Allowed: {sorted(VALID_EXTENSIONS)}",
+        )
+    return ext
+
+
+def _write_file(fd: int, data: bytes):
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+
+
+async def _save_upload(upload: UploadFile) -> str:
+    ext = _check_extension(upload.filename)
+    data = await upload.read()
+    fd, path = tempfile.mkstemp(suffix=ext, prefix="invoice_")
+    await asyncio.to_thread(_write_file, fd, data)
+    return path
+
+
+async def _ocr_upload(upload: UploadFile) -> OCRResult:
+    path = await _save_upload(upload)
+    try:
+        return await aprocess_invoice(path)
+    finally:
+        os.remove(path)
+
+
+async def _process_upload(upload: UploadFile, parser: BaseParser, include_raw: bool) -> Dict[str, Any]:
+    ocr_result = await _ocr_upload(upload)
+    parsed = await asyncio.to_thread(parse_ocr_output, ocr_result, parser, upload.filename)
+    if parsed.get("ocr_result"):
+        parsed["ocr_result"] = _dump_ocr(ocr_result, include_raw)
+    return {"file": upload.filename, **parsed}
+
+
+# Request bodies
+class ParseRequest(BaseModel):
+    text: Optional[str] = None
+    tables: Optional[List[Dict[str, Any]]] = None
+
+
+# Endpoints
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "pending": admission.pending,
+        "capacity": admission.capacity,
+        "ocr_cache": get_ocr_cache().stats(),
+        "extractor_cache": InvoiceExtractorFactory.cache_info(),
+        "ocr_cascade": cascade_stats.snapshot() if settings.ocr.cascade_enabled else None,
+    }
+
+
+@app.post("/ocr")
+async def ocr(file: UploadFile = File(...), include_raw: bool = Query(False)):
+    """OCR only."""
+    admission.acquire()
+    try:
+        ocr_result = await _ocr_upload(file)
+    finally:
+        admission.release()
+
+    status_code = 422 if ocr_result.error else 200
+    return _json_response(_dump_ocr(ocr_result, include_raw), status_code)
+
+
+@app.post("/parse")
+async def parse(body: ParseRequest, parser_name: str = Query(settings.service.default_parser)):
+    """Parse only: takes OCR output (text and/or table records)."""
+    parser = await _get_parser(parser_name)
+    admission.acquire()
+    try:
+        ocr_result = ocr_result_from_payload(body.model_dump())
+        parsed = await asyncio.to_thread(parse_ocr_output, ocr_result, parser, "<request>")
+    finally:
+        admission.release()
+
+    status_code = 422 if parsed.get("error") else 200
+    return _json_response(parsed, status_code)
+
+
+@app.post("/process")
+async def process(
+    file: UploadFile = File(...),
+    parser_name: str = Query(settings.service.default_parser),
+    include_raw: bool = Query(False),
+):
+    """Full pipeline: OCR + parsing."""
+    parser = await _get_parser(parser_name)
+    admission.acquire()
+    try:
+        result = await _process_upload(file, parser, include_raw)
+    finally:
+        admission.release()
+
+    status_code = 422 if result.get("error") else 200
+    return _json_response(result, status_code)
+
+
+@app.post("/batch")
+async def batch(
+    files: List[UploadFile] = File(...),
+    parser_name: str = Query(settings.service.default_parser),
+    include_raw: bool = Query(False),
+):
+    """
+    Full pipeline over several files. Results are streamed back as NDJSON,
+    one line per file in completion order.
+    """
+    # A batch takes one admission slot per file, so one larger than the
+    # admission capacity could never be admitted: reject it instead of
+    # answering 429 forever
+    max_files = min(settings.service.max_batch_files, admission.capacity)
+    if len(files) > max_files:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files ({len(files)} > {max_files})",
+        )
+    for upload in files:
+        _check_extension(upload.filename)
+
+    parser = await _get_parser(parser_name)
+
+    # One admission slot per file, released as each one finishes
+    admission.acquire(len(files))
+
+    async def run_one(index: int, upload: UploadFile) -> Dict[str, Any]:
+        try:
+            result = await _process_upload(upload, parser, include_raw)
+        except Exception as e:
+            logger.error(f"[Service] Batch item {upload.filename} failed: {e}", exc_info=True)
+            result = {"file": upload.filename, "error": str(e)}
+        return {"index": index, **result}
+
+    tasks = [asyncio.create_task(run_one(i, upload)) for i, upload in enumerate(files)]
+    for task in tasks:
+        # Runs even for tasks cancelled before they started
+        task.add_done_callback(lambda _: admission.release())
+
+    async def stream():
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                yield json.dumps(result, default=_serialize) + "\n"
+        finally:
+            # Client went away: stop outstanding work
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -1,6 +1,20 @@
-from typing import Any, Optional
+import math
+from typing import Annotated, Any, Dict, Optional
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, Field, PlainSerializer
+
+
+def _line_items_json(items: Dict[str, Any]) -> Dict[str, list]:
+    # Arrays as lists, NaN (missing number) as null
+    return {
+        name: [None if isinstance(v, float) and math.isnan(v) else v for v in np.asarray(column).tolist()]
+        for name, column in items.items()
+    }
+
+
+# Python dumps keep the arrays; JSON dumps get plain lists
+LineItems = Annotated[Dict[str, Any], PlainSerializer(_line_items_json, when_used="json")]
 
 
 class InvoiceParseResult(BaseModel):
@@ -14,6 +28,10 @@ class InvoiceParseResult(BaseModel):
     tax_amount: Optional[float] = Field(None, description="Total tax/VAT amount")
     total_amount: Optional[float] = Field(None, description="Final total amount on the invoice")
 
+    # Columnar: {"description": [...], "quantity": [...], "unit_price": [...],
+    # "amount": [...]}, one numpy array per column (NaN = missing number)
+    line_items: Optional[LineItems] = Field(None, description="Line items, one array per column")
+
     summary: Optional[str] = Field(None, description="Short summary of the invoice")
     raw_text_length: int = Field(0, description="Length of the input text")
 
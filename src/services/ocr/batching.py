@@ -0,0 +1,114 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Marks shutdown of the collector thread
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Collects sources from concurrent callers and runs them as one batch:
+    - a batch closes at `max_batch_size` items or `max_wait_ms` after its
+      first item, whichever comes first
+    - `run_batch` takes a list of sources and returns results in order
+      (e.g. an extractor's extract_batch)
+    - each caller gets its own result (or exception) back via a Future
+    A single collector thread runs batches one after another, so the
+    wrapped model is never called concurrently. After close(), sources
+    already submitted still run; submit() raises RuntimeError.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8, max_wait_ms: float = 10.0, name: str = "ocr-batcher"):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+
+        self.batches = 0
+        self.items = 0
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        # Guards _closed, so nothing is queued behind _STOP
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+
+    def submit(self, source: Any) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put((source, future))
+        return future
+
+    def extract(self, source: Any, timeout: Optional[float] = None) -> Any:
+        return self.submit(source).result(timeout)
+
+    def close(self, wait: bool = True):
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        if wait:
+            self._thread.join()
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+
+    # Collector thread
+    def _collect(self, first) -> Tuple[List[Tuple[Any, Future]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+
+            batch, stopping = self._collect(first)
+
+            # Callers that gave up (cancelled) before the batch started are dropped
+            batch = [(source, future) for source, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                self._run_one(batch)
+
+    def _run_one(self, batch: List[Tuple[Any, Future]]):
+        try:
+            results = self.run_batch([source for source, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} inputs")
+        except Exception as e:
+            logger.error(f"[Batcher] Batch of {len(batch)} failed: {e}", exc_info=True)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
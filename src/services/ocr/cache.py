@@ -0,0 +1,246 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from src.config import get_settings
+from src.models.models import OCRResult
+from src.utils.file_utils import file_digest
+
+from .interface import BaseInvoiceExtractor
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when the stored payload format changes
+CACHE_VERSION = 1
+
+# After eviction the cache is trimmed to this fraction of the budget
+EVICTION_TARGET_RATIO = 0.9
+
+
+class OCRResultCache:
+    """
+    Content-addressed on-disk cache for OCRResult objects.
+    - Key: hash of file bytes + extractor class + OCR settings
+    - Size-based LRU eviction (file mtime is bumped on every hit)
+    - Hit/miss counters
+    Safe to share between processes: writes are atomic renames.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._size_bytes: Optional[int] = None  # lazily scanned
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+
+    # Keys
+    def make_key(self, file_path: str, extractor: BaseInvoiceExtractor,
+        digest: Optional[str] = None) -> str:
+        """
+        Key of a file's OCR result under the extractor's current settings.
+        `digest` is the file's sha256 when the caller already has it.
+        """
+        settings = get_settings()
+        params: Dict[str, Any] = {
+            "version": CACHE_VERSION,
+            "extractor": f"{extractor.__class__.__module__}.{extractor.__class__.__qualname__}",
+            "ocr_output_mode": settings.ocr.ocr_output_mode,
+            "max_pages": settings.ocr.max_pages,
+            "extractor_params": extractor.cache_key_params(),
+        }
+        fingerprint = json.dumps(params, sort_keys=True, default=str)
+
+        h = hashlib.sha256()
+        h.update((digest or file_digest(file_path)).encode())
+        h.update(fingerprint.encode())
+        return h.hexdigest()
+
+    def _path_for(self, key: str) -> str:
+        # Shard by prefix so a single directory never holds every entry
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl")
+
+
+    # Lookup / store
+    def get(self, key: str) -> Optional[OCRResult]:
+        if not self.enabled:
+            return None
+
+        path = self._path_for(key)
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+            os.utime(path)  # LRU touch
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except Exception as e:
+            logger.warning(f"[OCRCache] Dropping unreadable entry {path}: {e}")
+            self._remove(path)
+            self._count("misses")
+            return None
+
+        if payload.get("version") != CACHE_VERSION:
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return OCRResult(**payload["result"])
+
+    def put(self, key: str, result: OCRResult, source_path: Optional[str] = None) -> None:
+        if not self.enabled or result.error:
+            return
+
+        path = self._path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(
+                    {
+                        "version": CACHE_VERSION,
+                        "source_path": source_path,
+                        "result": result.model_dump(),
+                    },
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL
+                )
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"[OCRCache] Failed to store entry {key}: {e}")
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            self.writes += 1
+            if self._size_bytes is not None:
+                self._size_bytes += size
+
+        if self._current_size() > self.max_bytes:
+            self.evict()
+
+
+    def iter_entries(self) -> Iterator[Tuple[str, OCRResult]]:
+        """
+        Yields (source_path, OCRResult) for every stored entry.
+        Entries written without a source path are labelled by their key.
+        """
+        for _, _, path in self._scan():
+            try:
+                with open(path, "rb") as f:
+                    payload = pickle.load(f)
+            except Exception as e:
+                logger.warning(f"[OCRCache] Skipping unreadable entry {path}: {e}")
+                continue
+
+            if payload.get("version") != CACHE_VERSION:
+                continue
+
+            label = payload.get("source_path") or os.path.basename(path)[:-len(".pkl")]
+            yield label, OCRResult(**payload["result"])
+
+
+    # Eviction
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _current_size(self) -> int:
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = sum(size for _, size, _ in self._scan())
+            return self._size_bytes
+
+    def evict(self) -> int:
+        """
+        Removes least recently used entries until the cache is below the budget.
+        Rescans the directory since other processes may share it.
+        """
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * EVICTION_TARGET_RATIO)
+
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+
+        with self._lock:
+            self._size_bytes = total
+            self.evictions += removed
+
+        if removed:
+            logger.info(f"[OCRCache] Evicted {removed} entries ({total} bytes left)")
+        return removed
+
+    def clear(self) -> None:
+        for _, _, path in self._scan():
+            self._remove(path)
+        with self._lock:
+            self._size_bytes = 0
+
+
+    # Helpers
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "size_bytes": self._size_bytes,
+            }
+
+
+@lru_cache
+def get_ocr_cache() -> OCRResultCache:
+    settings = get_settings()
+    return OCRResultCache(
+        cache_dir=settings.ocr.cache_dir,
+        max_bytes=settings.ocr.cache_max_bytes,
+        enabled=settings.ocr.cache_enabled,
+    )
@@ -1,96 +1,411 @@
+import asyncio
+import functools
+import gc
 import logging
 import os
 import threading
+import weakref
 from collections import OrderedDict
-from typing import Any, Dict, Type
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (Any, Dict, Iterable, List, Optional, Tuple, Type,
+                    Union)
 
+from src.config import get_settings
+from src.utils.lazy_import import LazyClass
+
+from .batching import MicroBatcher
 from .interface import BaseInvoiceExtractor
-from .providers.paddleocr import PaddleOCRExtractor
-from .providers.pdfplumber import PDFPlumberExtractor
-from .providers.tesseract import TesseractExtractor
 
 logger = logging.getLogger(__name__)
 
 
-MAX_CACHE_SIZE = 4  # LRU capacity
+MAX_CACHE_SIZE = 4  # LRU capacity (instances); memory budget is in OCRSettings
+
+
+# Providers are imported on first selection: paddle, cv2, pytesseract and
+# pdfplumber together cost seconds of start-up time
+_PADDLEOCR = LazyClass("src.services.ocr.providers.paddleocr:PaddleOCRExtractor")
+_PDFPLUMBER = LazyClass("src.services.ocr.providers.pdfplumber:PDFPlumberExtractor")
+_TESSERACT = LazyClass("src.services.ocr.providers.tesseract:TesseractExtractor")
+_ONNXOCR = LazyClass("src.services.ocr.providers.onnx_ocr:ONNXOCRExtractor")
+_CASCADE = LazyClass("src.services.ocr.providers.cascade:CascadeExtractor")
 
 
 # Extractor mapping
-EXTRACTOR_MAPPING: Dict[str, Type[BaseInvoiceExtractor]] = {
-    ".pdf": PDFPlumberExtractor,
-    ".jpg": PaddleOCRExtractor,
-    ".jpeg": PaddleOCRExtractor,
-    ".png": PaddleOCRExtractor,
-    ".tif": TesseractExtractor,
-    ".tiff": TesseractExtractor,
-    "default": TesseractExtractor,
+EXTRACTOR_MAPPING: Dict[str, Union[LazyClass, Type[BaseInvoiceExtractor]]] = {
+    ".pdf": _PDFPLUMBER,
+    ".jpg": _PADDLEOCR,
+    ".jpeg": _PADDLEOCR,
+    ".png": _PADDLEOCR,
+    ".tif": _TESSERACT,
+    ".tiff": _TESSERACT,
+    "default": _TESSERACT,
+}
+
+
+# Engines by name (used by the cascade's tiers)
+ENGINE_MAPPING: Dict[str, Union[LazyClass, Type[BaseInvoiceExtractor]]] = {
+    "onnx": _ONNXOCR,
+    "paddleocr": _PADDLEOCR,
+    "pdfplumber": _PDFPLUMBER,
+    "tesseract": _TESSERACT,
 }
 
+# Extensions routed to the cascade when OCRSettings.cascade_enabled
+CASCADE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tif", ".tiff"}
+
+
+def _resolve(entry: Union[LazyClass, Type[BaseInvoiceExtractor]]) -> Type[BaseInvoiceExtractor]:
+    # Mapping entries may also be plain classes
+    return entry.load() if isinstance(entry, LazyClass) else entry
+
 
 # LRU cache (Thread-safe)
+CacheKey = Tuple[Type[BaseInvoiceExtractor], Tuple[Tuple[str, Any], ...]]
+
+
+@dataclass
+class _CacheEntry:
+    instance: BaseInvoiceExtractor
+    footprint_bytes: int
+
+
 _CACHE_LOCK = threading.Lock()
-_EXTRACTOR_INSTANCE_CACHE: "OrderedDict[Type[BaseInvoiceExtractor], BaseInvoiceExtractor]" = OrderedDict()
+_LOAD_LOCK = threading.Lock()
+_EXTRACT_LOCKS: "weakref.WeakKeyDictionary[BaseInvoiceExtractor, threading.Lock]" = weakref.WeakKeyDictionary()
+_EXTRACTOR_INSTANCE_CACHE: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+
+
+def _describe(key: CacheKey) -> str:
+    cls, options = key
+    if not options:
+        return cls.__name__
+    return f"{cls.__name__}({', '.join(f'{k}={v!r}' for k, v in options)})"
+
+
+def _rss_bytes() -> Optional[int]:
+    """
+    Current resident set size (Linux). None where /proc isn't available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _cache_lookup(key: CacheKey) -> Optional[BaseInvoiceExtractor]:
+    with _CACHE_LOCK:
+        entry = _EXTRACTOR_INSTANCE_CACHE.get(key)
+        if entry is None:
+            return None
+        # Update LRU
+        _EXTRACTOR_INSTANCE_CACHE.move_to_end(key)
+        logger.debug(f"[Factory] Cache HIT → {_describe(key)}")
+        return entry.instance
+
+
+def _evict_locked(keep: CacheKey) -> int:
+    """
+    Evicts least recently used instances until both the memory budget and
+    MAX_CACHE_SIZE hold. `keep` (the instance just loaded) is never evicted.
+    Caller holds _CACHE_LOCK.
+    """
+    budget = get_settings().ocr.extractor_cache_max_bytes
+    total = sum(e.footprint_bytes for e in _EXTRACTOR_INSTANCE_CACHE.values())
+
+    evicted = 0
+    for key in list(_EXTRACTOR_INSTANCE_CACHE):
+        if total <= budget and len(_EXTRACTOR_INSTANCE_CACHE) <= MAX_CACHE_SIZE:
+            break
+        if key == keep:
+            continue
+        entry = _EXTRACTOR_INSTANCE_CACHE.pop(key)
+        total -= entry.footprint_bytes
+        evicted += 1
+        logger.warning(
+            f"[Factory] LRU Evicted → {_describe(key)} "
+            f"(freed ~{entry.footprint_bytes / 1024 ** 2:.0f} MiB, {total / 1024 ** 2:.0f} MiB in use)"
+        )
+
+    return evicted
+
+
+# Async execution (Thread-safe, one executor per process)
+_ASYNC_LOCK = threading.Lock()
+_ASYNC_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_ASYNC_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _get_async_executor() -> ThreadPoolExecutor:
+    global _ASYNC_EXECUTOR
+    with _ASYNC_LOCK:
+        if _ASYNC_EXECUTOR is None:
+            # Extra threads for model loads, which don't take an OCR slot
+            max_workers = get_settings().ocr.async_max_concurrency + 2
+            _ASYNC_EXECUTOR = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="ocr-async"
+            )
+        return _ASYNC_EXECUTOR
+
+
+_BATCHERS: "weakref.WeakKeyDictionary[BaseInvoiceExtractor, MicroBatcher]" = weakref.WeakKeyDictionary()
+
+
+def _get_batcher(extractor: BaseInvoiceExtractor) -> MicroBatcher:
+    with _ASYNC_LOCK:
+        batcher = _BATCHERS.get(extractor)
+        if batcher is None:
+            settings = get_settings()
+            batcher = MicroBatcher(
+                functools.partial(InvoiceExtractorFactory.extract_batch, extractor),
+                max_batch_size=settings.ocr.batch_max_size,
+                max_wait_ms=settings.ocr.batch_max_wait_ms,
+                name=f"ocr-batcher-{extractor.__class__.__name__}",
+            )
+            _BATCHERS[extractor] = batcher
+        return batcher
+
+
+def _get_async_semaphore(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    # asyncio primitives are bound to one loop
+    with _ASYNC_LOCK:
+        semaphore = _ASYNC_SEMAPHORES.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(get_settings().ocr.async_max_concurrency)
+            _ASYNC_SEMAPHORES[loop] = semaphore
+        return semaphore
 
 
 class InvoiceExtractorFactory:
     """
     Factory that returns the correct OCR extractor with:
     - Thread-safe lazy loading
-    - LRU caching
-    - Async wrapper
+    - LRU caching keyed by (class, constructor options), bounded by a
+      memory budget using measured per-instance footprints
+    - Prewarming for services
+    - Async API backed by a bounded executor, with optional micro-batching
     """
 
     @staticmethod
-    def get_extractor(source_path: str) -> BaseInvoiceExtractor:
+    def get_extractor(source_path: str, **options: Any) -> BaseInvoiceExtractor:
+        """
+        Returns a cached extractor for the file's extension.
+        `options` are passed to the extractor constructor (e.g. lang="fr")
+        and are part of the cache key.
+        """
+
+        ExtractorClass = InvoiceExtractorFactory.extractor_class(source_path)
+        return InvoiceExtractorFactory._get_instance(ExtractorClass, options)
 
-        # Extract extension
+    @staticmethod
+    def get_engine(name: str, **options: Any) -> BaseInvoiceExtractor:
+        """
+        Returns a cached extractor by engine name (see ENGINE_MAPPING).
+        """
+        return InvoiceExtractorFactory._get_instance(InvoiceExtractorFactory.engine_class(name), options)
+
+    @staticmethod
+    def extractor_class(source_path: str) -> Type[BaseInvoiceExtractor]:
+        """
+        The extractor class get_extractor would use for the file, without
+        building an instance.
+        """
         _, ext = os.path.splitext(source_path)
         ext = ext.lower()
 
-        ExtractorClass = EXTRACTOR_MAPPING.get(ext, EXTRACTOR_MAPPING["default"])
+        settings = get_settings()
+        if ext in settings.ocr.extractor_overrides:
+            return InvoiceExtractorFactory.engine_class(settings.ocr.extractor_overrides[ext])
 
-        # Thread-safe LRU caching
-        with _CACHE_LOCK:
-            if ExtractorClass in _EXTRACTOR_INSTANCE_CACHE:
-                # Update LRU
-                _EXTRACTOR_INSTANCE_CACHE.move_to_end(ExtractorClass)
-                logger.debug(f"[Factory] Cache HIT → {ExtractorClass.__name__}")
-                return _EXTRACTOR_INSTANCE_CACHE[ExtractorClass]
+        if settings.ocr.cascade_enabled and ext in CASCADE_EXTENSIONS:
+            return _resolve(_CASCADE)
 
-            # Cache MISS → load instance
-            logger.info(f"[Factory] Cache MISS → Loading {ExtractorClass.__name__}")
+        return _resolve(EXTRACTOR_MAPPING.get(ext, EXTRACTOR_MAPPING["default"]))
 
-            instance = ExtractorClass()
-            _EXTRACTOR_INSTANCE_CACHE[ExtractorClass] = instance
-            _EXTRACTOR_INSTANCE_CACHE.move_to_end(ExtractorClass)
+    @staticmethod
+    def engine_class(name: str) -> Type[BaseInvoiceExtractor]:
+        entry = ENGINE_MAPPING.get(name.lower())
+        if entry is None:
+            raise ValueError(f"Unknown OCR engine '{name}'. Available: {sorted(ENGINE_MAPPING)}")
+        return _resolve(entry)
 
-            # Enforce LRU capacity
-            if len(_EXTRACTOR_INSTANCE_CACHE) > MAX_CACHE_SIZE:
-                evicted_class, _ = _EXTRACTOR_INSTANCE_CACHE.popitem(last=False)
-                logger.warning(f"[Factory] LRU Evicted → {evicted_class.__name__}")
+    @staticmethod
+    def _get_instance(ExtractorClass: Type[BaseInvoiceExtractor], options: Dict[str, Any]) -> BaseInvoiceExtractor:
+        key: CacheKey = (ExtractorClass, tuple(sorted(options.items())))
 
+        instance = _cache_lookup(key)
+        if instance is not None:
             return instance
 
+        # One load at a time so RSS deltas can be attributed to one instance
+        with _LOAD_LOCK:
+            instance = _cache_lookup(key)  # loaded while we waited
+            if instance is not None:
+                return instance
+
+            # Cache MISS → load instance
+            logger.info(f"[Factory] Cache MISS → Loading {_describe(key)}")
+
+            rss_before = _rss_bytes()
+            instance = ExtractorClass(**options)
+            rss_after = _rss_bytes()
+
+            measured = 0
+            if rss_before is not None and rss_after is not None:
+                measured = max(rss_after - rss_before, 0)
+            # Freed memory may be reused on reload, so never go below the hint
+            footprint = max(measured, ExtractorClass.memory_hint_bytes)
+
+            with _CACHE_LOCK:
+                _EXTRACTOR_INSTANCE_CACHE[key] = _CacheEntry(instance, footprint)
+                evicted = _evict_locked(keep=key)
+
+        logger.info(f"[Factory] Loaded {_describe(key)} (~{footprint / 1024 ** 2:.0f} MiB)")
+        if evicted:
+            gc.collect()
+
+        return instance
+
+
+    @staticmethod
+    def prewarm(specs: Iterable[Union[str, Tuple[str, Dict[str, Any]]]]) -> List[BaseInvoiceExtractor]:
+        """
+        Loads extractors ahead of traffic.
+        Each spec is an extension (".jpg") or (extension, constructor options).
+        """
+        instances = []
+        for spec in specs:
+            ext, options = (spec, {}) if isinstance(spec, str) else spec
+            instances.append(InvoiceExtractorFactory.get_extractor(f"prewarm{ext}", **options))
+        return instances
+
+
+    @staticmethod
+    def cache_info() -> Dict[str, Any]:
+        with _CACHE_LOCK:
+            entries = [
+                {"extractor": _describe(key), "footprint_bytes": entry.footprint_bytes}
+                for key, entry in _EXTRACTOR_INSTANCE_CACHE.items()
+            ]
+        return {
+            "entries": entries,
+            "total_bytes": sum(e["footprint_bytes"] for e in entries),
+            "budget_bytes": get_settings().ocr.extractor_cache_max_bytes,
+            "max_instances": MAX_CACHE_SIZE,
+        }
+
 
     # Async version
     @staticmethod
-    async def aget_extractor(source_path: str) -> BaseInvoiceExtractor:
+    async def aget_extractor(source_path: str, **options: Any) -> BaseInvoiceExtractor:
         """
-        Async wrapper for FastAPI.
+        Async variant for FastAPI: a cache miss loads the model on the
+        executor instead of blocking the event loop.
         """
-        return InvoiceExtractorFactory.get_extractor(source_path)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_async_executor(),
+            functools.partial(InvoiceExtractorFactory.get_extractor, source_path, **options)
+        )
 
 
     # OCR (sync)
     @staticmethod
     def extract(extractor: BaseInvoiceExtractor, source: Any) -> Any:
-        return extractor.extract_data(source)
+        if extractor.thread_safe:
+            return extractor.extract_data(source)
+
+        # Cached instances are shared between threads
+        with _CACHE_LOCK:
+            lock = _EXTRACT_LOCKS.setdefault(extractor, threading.Lock())
+        with lock:
+            return extractor.extract_data(source)
+
+    @staticmethod
+    def extract_batch(extractor: BaseInvoiceExtractor, sources: List[Any]) -> List[Any]:
+        if extractor.thread_safe:
+            return extractor.extract_batch(sources)
+
+        with _CACHE_LOCK:
+            lock = _EXTRACT_LOCKS.setdefault(extractor, threading.Lock())
+        with lock:
+            return extractor.extract_batch(sources)
 
 
     # OCR (async)
     @staticmethod
-    async def aextract(extractor: BaseInvoiceExtractor, source: Any) -> Any:
-        return extractor.extract_data(source)
+    async def aextract(extractor: BaseInvoiceExtractor, source: Any,
+        timeout: Optional[float] = None) -> Any:
+        """
+        Runs extraction on the managed executor.
+        - At most OCRSettings.async_max_concurrency extractions run at once;
+          further callers wait without blocking the loop
+        - Raises asyncio.TimeoutError after `timeout` seconds
+          (default: OCRSettings.async_timeout_sec, None/0 disables it)
+        - On timeout/cancellation work that hasn't started is dropped. Work
+          already running can't be interrupted: it keeps its slot until it
+          finishes so the concurrency limit stays honest.
+        - With OCRSettings.batch_enabled, extractors that support batching
+          go through a per-instance MicroBatcher instead: concurrent callers
+          share one model call, and the batcher's single thread is the limit
+        """
+        settings = get_settings()
+        if timeout is None:
+            timeout = settings.ocr.async_timeout_sec or None
+
+        if settings.ocr.batch_enabled and extractor.supports_batching:
+            cfuture = _get_batcher(extractor).submit(source)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(cfuture), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                cfuture.cancel()  # dropped if its batch hasn't started
+                raise
+
+        loop = asyncio.get_running_loop()
+        semaphore = _get_async_semaphore(loop)
+        await semaphore.acquire()
+
+        try:
+            cfuture = _get_async_executor().submit(
+                InvoiceExtractorFactory.extract, extractor, source
+            )
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # loop already closed
+
+        cfuture.add_done_callback(release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(cfuture), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if not cfuture.cancel():
+                logger.warning(
+                    f"[Factory] {extractor.__class__.__name__} call abandoned; "
+                    f"finishing in background"
+                )
+            raise
+
+
+    # Async executor
+    @staticmethod
+    def shutdown_async_executor(wait: bool = True):
+        global _ASYNC_EXECUTOR
+        with _ASYNC_LOCK:
+            if _ASYNC_EXECUTOR is not None:
+                _ASYNC_EXECUTOR.shutdown(wait=wait, cancel_futures=True)
+                _ASYNC_EXECUTOR = None
+            batchers = list(_BATCHERS.values())
+            _BATCHERS.clear()
+        for batcher in batchers:
+            batcher.close(wait=wait)
 
 
     # Reset cache
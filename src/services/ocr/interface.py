@@ -1,10 +1,44 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Dict, List
 
 
 class BaseInvoiceExtractor(ABC):
     """ Abstract OCR interface """
 
+    # Whether extract_data may run concurrently on one instance.
+    # The factory serializes calls on extractors that leave this False.
+    thread_safe: bool = False
+
+    # Lower bound for the instance's memory footprint, used by the
+    # factory's memory-budgeted cache when RSS can't be measured reliably
+    memory_hint_bytes: int = 0
+
+    # Whether extract_batch does real batched inference (rather than the
+    # default loop), which makes micro-batching worthwhile
+    supports_batching: bool = False
+
     @abstractmethod
     def extract_data(self, source: Any) -> str:
         pass
+
+    def extract_batch(self, sources: List[Any]) -> List[Any]:
+        """
+        Extracts several sources; results are in input order.
+        """
+        return [self.extract_data(source) for source in sources]
+
+    def cache_key_params(self) -> Dict[str, Any]:
+        """
+        Settings that change this extractor's output.
+        Folded into the OCR cache key.
+        """
+        return {}
+
+    @classmethod
+    def cache_key_params_for(cls, **options: Any) -> Dict[str, Any]:
+        """
+        cache_key_params of an instance built with `options` under the
+        current settings, without building one (no models are loaded).
+        Used where another extractor's settings are part of a key.
+        """
+        return {}
@@ -1,58 +1,134 @@
 import argparse
+import asyncio
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from src.models.models import OCRResult
 from src.utils.logging_config import logger
 
+from .cache import get_ocr_cache
 from .factory import InvoiceExtractorFactory
 
 
-def process_invoice(file_path: str) -> OCRResult:
+def process_invoice(file_path: str, use_cache: bool = True,
+    extractor_options: Optional[Dict[str, Any]] = None,
+    digest: Optional[str] = None) -> OCRResult:
     """
-    Runs OCR on the invoice and returns an OCRResult
+    Runs OCR on the invoice and returns an OCRResult.
+    Results are served from / stored in the on-disk OCR cache unless
+    use_cache is False. `extractor_options` are passed to the extractor
+    constructor (e.g. {"lang": "fr"}). `digest` is the file's sha256 when
+    the caller already has it (saves hashing it again for the cache key).
     """
     if not os.path.exists(file_path):
         logger.warning(f"File path does not exist: {file_path}")
-        return {
-            "error": f"File not found: {file_path}"
-        }
+        return OCRResult(error=f"File not found: {file_path}")
 
     try:
-        extractor = InvoiceExtractorFactory.get_extractor(file_path)
+        extractor = InvoiceExtractorFactory.get_extractor(file_path, **(extractor_options or {}))
         logger.info(
             f"Using OCR provider: {extractor.__class__.__name__} for {file_path}"
         )
 
+        cache = get_ocr_cache()
+        cache_key = None
+
+        if use_cache and cache.enabled:
+            cache_key = cache.make_key(file_path, extractor, digest)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"OCR cache hit for {file_path}")
+                return cached
+
         ocr_result = InvoiceExtractorFactory.extract(extractor, file_path)
+        _check_result(ocr_result, file_path)
+
+        if cache_key is not None:
+            cache.put(cache_key, ocr_result, source_path=file_path)
+
+        return ocr_result
+
+    except Exception as e:
+        logger.error(
+            f"FATAL ERROR during invoice processing for {file_path}: {e}",
+            exc_info=True
+        )
+        return OCRResult(error=f"OCR failed: {e}")
 
-        if not isinstance(ocr_result, OCRResult):
-            raise TypeError(
-                f"OCR extractor returned invalid type: {type(ocr_result)}"
-            )
 
+async def aprocess_invoice(file_path: str, use_cache: bool = True,
+    timeout: Optional[float] = None,
+    extractor_options: Optional[Dict[str, Any]] = None) -> OCRResult:
+    """
+    Async counterpart of process_invoice for asyncio servers.
+    Model loading, cache I/O and OCR run on the factory's executor, so the
+    event loop is never blocked. Times out after `timeout` seconds
+    (default: OCRSettings.async_timeout_sec); cancellation propagates.
+    """
+    if not os.path.exists(file_path):
+        logger.warning(f"File path does not exist: {file_path}")
+        return OCRResult(error=f"File not found: {file_path}")
+
+    try:
+        extractor = await InvoiceExtractorFactory.aget_extractor(file_path, **(extractor_options or {}))
         logger.info(
-            f"OCR completed for {file_path} | "
-            f"text={'yes' if ocr_result.text else 'no'} | "
-            f"tables={'yes' if ocr_result.tables is not None else 'no'}"
+            f"Using OCR provider: {extractor.__class__.__name__} for {file_path}"
         )
 
+        cache = get_ocr_cache()
+        cache_key = None
+
+        if use_cache and cache.enabled:
+            cache_key = await asyncio.to_thread(cache.make_key, file_path, extractor)
+            cached = await asyncio.to_thread(cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"OCR cache hit for {file_path}")
+                return cached
+
+        ocr_result = await InvoiceExtractorFactory.aextract(extractor, file_path, timeout=timeout)
+        _check_result(ocr_result, file_path)
+
+        if cache_key is not None:
+            await asyncio.to_thread(cache.put, cache_key, ocr_result, file_path)
+
         return ocr_result
 
+    except asyncio.TimeoutError:
+        logger.error(f"OCR timed out for {file_path}")
+        return OCRResult(error="OCR timed out")
+
     except Exception as e:
         logger.error(
             f"FATAL ERROR during invoice processing for {file_path}: {e}",
             exc_info=True
         )
-        return OCRResult(error="File not found")
+        return OCRResult(error=f"OCR failed: {e}")
+
+
+def _check_result(ocr_result: Any, file_path: str):
+    if not isinstance(ocr_result, OCRResult):
+        raise TypeError(
+            f"OCR extractor returned invalid type: {type(ocr_result)}"
+        )
+
+    logger.info(
+        f"OCR completed for {file_path} | "
+        f"text={'yes' if ocr_result.text else 'no'} | "
+        f"tables={'yes' if ocr_result.tables is not None else 'no'}"
+    )
 
 
 def cli():
     parser = argparse.ArgumentParser(description="Process an invoice with OCR.")
     parser.add_argument("file_path", help="Path to the invoice file")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the on-disk OCR result cache"
+    )
     args = parser.parse_args()
 
-    result = process_invoice(args.file_path)
+    result = process_invoice(args.file_path, use_cache=not args.no_cache)
 
     if isinstance(result, OCRResult):
         print("=== OCR RESULT ===")
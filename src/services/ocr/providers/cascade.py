@@ -0,0 +1,194 @@
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.config import get_settings
+from src.models.models import OCRResult
+
+from ..interface import BaseInvoiceExtractor
+
+logger = logging.getLogger(__name__)
+
+
+# Parsed fields counted for coverage
+COVERAGE_FIELDS = ("invoice_id", "vendor_name", "invoice_date", "total_amount")
+
+
+class CascadeStats:
+    """
+    Process-wide counters: which tier resolved each document.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.resolved: Dict[str, int] = {}
+        self.escalations: Dict[str, Dict[str, int]] = {}
+        self.documents = 0
+
+    def record(self, tier: str, reasons: Dict[str, List[str]]):
+        with self._lock:
+            self.documents += 1
+            self.resolved[tier] = self.resolved.get(tier, 0) + 1
+            for engine, engine_reasons in reasons.items():
+                counts = self.escalations.setdefault(engine, {})
+                for reason in engine_reasons:
+                    counts[reason] = counts.get(reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "resolved": dict(self.resolved),
+                "resolved_share": {
+                    tier: n / self.documents for tier, n in self.resolved.items()
+                } if self.documents else {},
+                "escalations": {engine: dict(c) for engine, c in self.escalations.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.resolved.clear()
+            self.escalations.clear()
+            self.documents = 0
+
+
+cascade_stats = CascadeStats()
+
+
+class CascadeExtractor(BaseInvoiceExtractor):
+    """
+    Runs OCR engines from cheapest to most expensive and stops at the first
+    result that looks good enough:
+    - mean word confidence >= cascade_min_confidence
+    - at least cascade_min_chars non-space characters
+    - at least cascade_min_fields of COVERAGE_FIELDS found by the heuristic parser
+    The last tier's result is always accepted.
+    """
+
+    thread_safe = True
+
+    def __init__(self, lang: Optional[str] = None):
+        settings = get_settings()
+        self.engines = [name.lower() for name in settings.ocr.cascade_engines]
+        if not self.engines:
+            raise ValueError("OCRSettings.cascade_engines is empty")
+
+        self.min_confidence = settings.ocr.cascade_min_confidence
+        self.min_chars = settings.ocr.cascade_min_chars
+        self.min_fields = settings.ocr.cascade_min_fields
+
+        # Only PaddleOCR takes a language option
+        self.lang = lang
+        self._parser = None
+
+    def cache_key_params(self) -> Dict[str, Any]:
+        return self.cache_key_params_for(lang=self.lang)
+
+    @classmethod
+    def cache_key_params_for(cls, lang: Optional[str] = None) -> Dict[str, Any]:
+        from ..factory import InvoiceExtractorFactory
+
+        settings = get_settings()
+        engines = [name.lower() for name in settings.ocr.cascade_engines]
+        params = {
+            "engines": engines,
+            "min_confidence": settings.ocr.cascade_min_confidence,
+            "min_chars": settings.ocr.cascade_min_chars,
+            "min_fields": settings.ocr.cascade_min_fields,
+        }
+        # Tier settings change the output too; taken from the tier classes,
+        # so computing a key doesn't load every tier's models
+        for name in engines:
+            EngineClass = InvoiceExtractorFactory.engine_class(name)
+            params[name] = EngineClass.cache_key_params_for(**cls._engine_options(name, lang))
+        return params
+
+
+    # Helper
+    @staticmethod
+    def _engine_options(name: str, lang: Optional[str]) -> Dict[str, Any]:
+        return {"lang": lang} if name == "paddleocr" and lang else {}
+
+    def _engine(self, factory, name: str) -> BaseInvoiceExtractor:
+        return factory.get_engine(name, **self._engine_options(name, self.lang))
+
+    @staticmethod
+    def _text(result: OCRResult) -> str:
+        if result.text:
+            return result.text
+        if result.tables is not None and len(result.tables):
+            return "\n".join(result.tables["text"])
+        return ""
+
+    @staticmethod
+    def _confidence(result: OCRResult) -> Optional[float]:
+        """
+        Mean word confidence on a 0-100 scale, None if the engine has none.
+        """
+        raw = result.raw if isinstance(result.raw, dict) else {}
+        if raw.get("mean_confidence") is not None:
+            return float(raw["mean_confidence"])
+        scores = raw.get("rec_scores")
+        if scores is not None and len(scores):
+            return float(sum(scores) / len(scores) * 100)
+        return None
+
+    def _field_coverage(self, text: str) -> int:
+        if self._parser is None:
+            # Imported lazily: OCR doesn't otherwise depend on parsers
+            from src.services.parser.providers.heuristic.heuristic_text import \
+                HeuristicTextParser
+            self._parser = HeuristicTextParser()
+
+        parsed = self._parser.parse(text)
+        return sum(getattr(parsed, field) is not None for field in COVERAGE_FIELDS)
+
+    def _escalation_reasons(self, result: OCRResult) -> List[str]:
+        if not isinstance(result, OCRResult) or result.error:
+            return ["error"]
+
+        reasons = []
+        confidence = self._confidence(result)
+        if confidence is not None and confidence < self.min_confidence:
+            reasons.append("confidence")
+
+        text = self._text(result)
+        if sum(not c.isspace() for c in text) < self.min_chars:
+            reasons.append("density")
+
+        # Most expensive check last, and only if the others passed
+        if not reasons and self.min_fields and self._field_coverage(text) < self.min_fields:
+            reasons.append("coverage")
+
+        return reasons
+
+
+    def extract_data(self, source: Any) -> OCRResult:
+        """
+        Returns the first tier's result that passes the thresholds.
+        raw is the accepting engine's raw output; which tier resolved the
+        document is tracked in `cascade_stats`.
+        """
+        from ..factory import InvoiceExtractorFactory
+
+        reasons: Dict[str, List[str]] = {}
+        result: Any = None
+
+        for i, name in enumerate(self.engines):
+            try:
+                engine = self._engine(InvoiceExtractorFactory, name)
+                result = InvoiceExtractorFactory.extract(engine, source)
+            except Exception as e:
+                logger.warning(f"[Cascade] {name} failed: {e}")
+                result = OCRResult(error=f"{name} failed: {str(e)}")
+
+            if i == len(self.engines) - 1:
+                break
+
+            reasons[name] = self._escalation_reasons(result)
+            if not reasons[name]:
+                break
+            logger.debug(f"[Cascade] {name} escalated: {', '.join(reasons[name])}")
+
+        cascade_stats.record(name, reasons)
+        return result
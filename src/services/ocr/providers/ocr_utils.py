@@ -1,5 +1,13 @@
+import threading
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                wait)
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
 import numpy as np
 import pandas as pd
+from PIL import Image
+
+from src.models.models import OCRResult
 
 
 def paddleocr_to_df(predict_result: dict) -> pd.DataFrame:
@@ -20,3 +28,253 @@ def paddleocr_to_df(predict_result: dict) -> pd.DataFrame:
     })
 
     return df
+
+
+TABLE_COLUMNS = ["text", "x_min", "y_min", "x_max", "y_max", "score"]
+
+
+def pdfplumber_words_to_df(words: list, score: float = 1.0) -> pd.DataFrame:
+    """
+    Converts pdfplumber word objects to the same DataFrame as paddleocr_to_df.
+    y uses `doctop` (distance from the top of the document), so the words of
+    consecutive pages stack vertically like one long page.
+    Coordinates are PDF points; native text layer words get a fixed score.
+    """
+    if not words:
+        return pd.DataFrame(columns=TABLE_COLUMNS)
+
+    # One pass into a float matrix: x0, doctop, x1, height
+    coords = np.array(
+        [(w["x0"], w["doctop"], w["x1"], w["bottom"] - w["top"]) for w in words],
+        dtype=np.float64,
+    )
+
+    df = pd.DataFrame({
+        "text": [w["text"] for w in words],
+        "x_min": coords[:, 0],
+        "y_min": coords[:, 1],
+        "x_max": coords[:, 2],
+        "y_max": coords[:, 1] + coords[:, 3],
+        "score": np.full(len(words), score),
+    })
+
+    return df
+
+
+# Tiling
+def tile_grid(height: int, width: int, tile_size: int, overlap: int) -> list:
+    """
+    Splits an image into overlapping tiles covering it completely.
+    Returns (y0, y1, x0, x1, core) per tile, where `core` = (cy0, cy1, cx0, cx1)
+    is the region the tile is responsible for: the tile minus half the
+    overlap on every side that borders another tile. Cores partition the image.
+    """
+    overlap = min(max(overlap, 0), tile_size // 2)
+    step = tile_size - overlap
+
+    def starts(length: int) -> list:
+        if length <= tile_size:
+            return [0]
+        out = list(range(0, length - tile_size, step))
+        out.append(length - tile_size)  # last tile flush with the edge
+        return out
+
+    def cores(origins: list, length: int) -> list:
+        spans = []
+        for i, start in enumerate(origins):
+            end = min(start + tile_size, length)
+            lo = 0 if i == 0 else (start + min(origins[i - 1] + tile_size, length)) // 2
+            hi = length if i == len(origins) - 1 else (end + origins[i + 1]) // 2
+            spans.append((start, end, lo, hi))
+        return spans
+
+    tiles = []
+    for y0, y1, cy0, cy1 in cores(starts(height), height):
+        for x0, x1, cx0, cx1 in cores(starts(width), width):
+            tiles.append((y0, y1, x0, x1, (cy0, cy1, cx0, cx1)))
+    return tiles
+
+
+def merge_tile_predictions(predictions: list, tiles: list, iou_threshold: float = 0.5) -> dict:
+    """
+    Maps per-tile PaddleOCR results back to page coordinates and removes
+    duplicates from the overlaps:
+    - a box is kept only by the tile whose core contains its center
+    - boxes still overlapping a higher-scored box by more than
+      `iou_threshold` of the smaller area are dropped
+    Returns a predict-style dict (rec_texts, rec_boxes, rec_scores) in
+    reading order.
+    """
+    texts, boxes, scores = [], [], []
+
+    for prediction, (y0, _, x0, _, (cy0, cy1, cx0, cx1)) in zip(predictions, tiles):
+        tile_boxes = np.asarray(prediction["rec_boxes"], dtype=np.float64).reshape(-1, 4)
+        if not len(tile_boxes):
+            continue
+        tile_boxes = tile_boxes + np.array([x0, y0, x0, y0])
+
+        centers_x = (tile_boxes[:, 0] + tile_boxes[:, 2]) / 2
+        centers_y = (tile_boxes[:, 1] + tile_boxes[:, 3]) / 2
+        in_core = (centers_x >= cx0) & (centers_x < cx1) & (centers_y >= cy0) & (centers_y < cy1)
+
+        tile_scores = prediction.get("rec_scores")
+        if tile_scores is None:
+            tile_scores = [1.0] * len(tile_boxes)
+
+        for i in np.flatnonzero(in_core):
+            texts.append(prediction["rec_texts"][i])
+            boxes.append(tile_boxes[i])
+            scores.append(float(tile_scores[i]))
+
+    if not boxes:
+        return {"rec_texts": [], "rec_boxes": np.zeros((0, 4)), "rec_scores": []}
+
+    boxes = np.vstack(boxes)
+    scores = np.asarray(scores)
+
+    # Suppress remaining duplicates, best score first
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+    keep = []
+    for i in np.argsort(-scores, kind="stable"):
+        if keep:
+            kept = boxes[keep]
+            iw = np.minimum(kept[:, 2], boxes[i, 2]) - np.maximum(kept[:, 0], boxes[i, 0])
+            ih = np.minimum(kept[:, 3], boxes[i, 3]) - np.maximum(kept[:, 1], boxes[i, 1])
+            inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+            smaller = np.minimum(areas[keep], areas[i])
+            if np.any(inter > iou_threshold * np.maximum(smaller, 1e-9)):
+                continue
+        keep.append(i)
+
+    # Reading order: rows (by half the median line height), then left to right
+    keep = np.asarray(keep)
+    heights = boxes[keep, 3] - boxes[keep, 1]
+    row_height = max(float(np.median(heights)) / 2, 1.0)
+    order = keep[np.lexsort((boxes[keep, 0], np.floor(boxes[keep, 1] / row_height)))]
+
+    return {
+        "rec_texts": [texts[i] for i in order],
+        "rec_boxes": boxes[order],
+        "rec_scores": scores[order].tolist(),
+    }
+
+
+# Multi-page images (TIFF)
+def frame_count(source: Any) -> int:
+    """
+    Number of frames (pages) in an image file or PIL image; header only.
+    """
+    if isinstance(source, Image.Image):
+        return getattr(source, "n_frames", 1)
+    with Image.open(source) as img:
+        return getattr(img, "n_frames", 1)
+
+
+def iter_frames(source: Any, max_frames: int) -> Iterator[Image.Image]:
+    """
+    Yields frames one at a time, each decoded into its own image, so only
+    the current frame (plus whatever the caller keeps) is in memory.
+    """
+    img = source if isinstance(source, Image.Image) else Image.open(source)
+    try:
+        for i in range(min(getattr(img, "n_frames", 1), max_frames)):
+            img.seek(i)
+            yield img.copy()
+    finally:
+        if img is not source:
+            img.close()
+
+
+class FramePool:
+    """
+    Thread pool for ocr_frames, created on first use and kept for the
+    extractor's lifetime: its threads, and the per-thread engines they
+    hold (tesserocr), are reused across documents. Documents OCR'd at
+    the same time share its workers.
+    """
+
+    def __init__(self, workers: int, name: str = "ocr-frame"):
+        self.workers = max(1, workers)
+        self.name = name
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+            return self._pool
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def ocr_frames(source: Any, ocr_frame: Callable[[Image.Image], OCRResult],
+    frame_pool: FramePool, max_frames: int,
+    page_height: Optional[Callable[[Image.Image], float]] = None) -> Tuple[List[OCRResult], List[float]]:
+    """
+    OCRs the frames of a multi-page image on `frame_pool` while later
+    frames are decoded. At most 2x the pool's workers frames are in flight.
+    Returns per-frame results and page heights in the results' box
+    coordinates (default: the frame height), in page order.
+    """
+    pool = frame_pool.get()
+    futures: List[Future] = []
+    heights: List[float] = []
+
+    try:
+        for frame in iter_frames(source, max_frames):
+            in_flight = [f for f in futures if not f.done()]
+            if len(in_flight) >= frame_pool.workers * 2:
+                wait(in_flight, return_when=FIRST_COMPLETED)
+
+            heights.append(page_height(frame) if page_height else frame.height)
+            futures.append(pool.submit(ocr_frame, frame))
+            del frame
+
+        return [f.result() for f in futures], heights
+    finally:
+        # Decoding failed part-way: drop this document's queued frames
+        for future in futures:
+            future.cancel()
+
+
+def merge_page_results(results: List[OCRResult], heights: List[float], table_mode: bool) -> OCRResult:
+    """
+    Assembles per-page results into one: text joined in page order, tables
+    concatenated with each page's y shifted below the previous pages.
+    The first failed page fails the document.
+    """
+    for page, result in enumerate(results, start=1):
+        if result.error:
+            return OCRResult(error=f"Page {page}: {result.error}")
+
+    raw = {"pages_read": len(results), "pages": [result.raw for result in results]}
+
+    # Word-weighted confidence across pages, where engines report one
+    confidences = [
+        (result.raw["mean_confidence"], result.raw.get("word_count", 1))
+        for result in results
+        if isinstance(result.raw, dict) and result.raw.get("mean_confidence") is not None
+    ]
+    total_words = sum(n for _, n in confidences)
+    if total_words:
+        raw["mean_confidence"] = round(sum(c * n for c, n in confidences) / total_words, 2)
+
+    if table_mode:
+        offsets = np.concatenate([[0], np.cumsum(heights)[:-1]]) if heights else []
+        tables = []
+        for result, offset in zip(results, offsets):
+            if result.tables is None or not len(result.tables):
+                continue
+            df = pd.DataFrame(result.tables)[TABLE_COLUMNS].copy()
+            df[["y_min", "y_max"]] = df[["y_min", "y_max"]].astype(float) + float(offset)
+            tables.append(df)
+        merged = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=TABLE_COLUMNS)
+        return OCRResult(tables=merged, raw=raw)
+
+    text = "\n".join(result.text for result in results if result.text)
+    return OCRResult(text=text, raw=raw)
@@ -0,0 +1,263 @@
+import math
+import os
+from typing import Any, Dict, List, Tuple
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+from PIL import Image
+
+from src.config import get_settings
+from src.models.models import OCRResult
+
+from ..interface import BaseInvoiceExtractor
+from .ocr_utils import paddleocr_to_df
+
+
+def quantized_path(model_path: str) -> str:
+    """det.onnx -> det_int8.onnx"""
+    stem, ext = os.path.splitext(model_path)
+    return f"{stem}_int8{ext}"
+
+
+class ONNXOCRExtractor(BaseInvoiceExtractor):
+    """
+    Extractor for image invoices running PaddleOCR's detection (DB) and
+    recognition (CTC) models exported to ONNX, on ONNX Runtime's CPU provider.
+    Output matches PaddleOCRExtractor (rec_texts / rec_boxes / rec_scores,
+    paddleocr_to_df in table mode) without importing paddlepaddle.
+    """
+
+    # ONNX Runtime sessions may be run from several threads
+    thread_safe = True
+    memory_hint_bytes = 150 * 1024 ** 2
+
+    # Detection (DB) post-processing, PaddleOCR defaults
+    DET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+    DET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+    DET_THRESH = 0.3
+    DET_BOX_THRESH = 0.6
+    DET_UNCLIP_RATIO = 1.5
+    DET_MIN_SIDE = 3
+
+    # Recognition
+    REC_HEIGHT = 48
+    REC_BATCH_SIZE = 8
+
+    def __init__(self):
+        settings = get_settings()
+        self.output_mode = settings.ocr.ocr_output_mode.lower()  # 'text' or 'table'
+        self.quantized = settings.ocr.onnx_quantized
+        self.det_limit_side = settings.ocr.onnx_det_limit_side
+
+        det_model, rec_model = settings.ocr.onnx_det_model, settings.ocr.onnx_rec_model
+        if self.quantized:
+            det_model, rec_model = quantized_path(det_model), quantized_path(rec_model)
+        self.det_model, self.rec_model = det_model, rec_model
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.ocr.onnx_intra_op_threads > 0:
+            options.intra_op_num_threads = settings.ocr.onnx_intra_op_threads
+        providers = ["CPUExecutionProvider"]
+
+        self.det_session = ort.InferenceSession(det_model, options, providers=providers)
+        self.rec_session = ort.InferenceSession(rec_model, options, providers=providers)
+        self.det_input = self.det_session.get_inputs()[0].name
+        self.rec_input = self.rec_session.get_inputs()[0].name
+
+        # CTC labels: blank, dictionary, space
+        with open(settings.ocr.onnx_rec_dict, "r", encoding="utf-8") as f:
+            self.characters = [""] + [line.rstrip("\n") for line in f] + [" "]
+
+    def cache_key_params(self) -> Dict[str, Any]:
+        return self.cache_key_params_for()
+
+    @classmethod
+    def cache_key_params_for(cls) -> Dict[str, Any]:
+        settings = get_settings()
+        det_model, rec_model = settings.ocr.onnx_det_model, settings.ocr.onnx_rec_model
+        if settings.ocr.onnx_quantized:
+            det_model, rec_model = quantized_path(det_model), quantized_path(rec_model)
+        return {
+            "det_model": det_model,
+            "rec_model": rec_model,
+            "det_limit_side": settings.ocr.onnx_det_limit_side,
+        }
+
+
+    # Helper
+    @staticmethod
+    def _read_image(source: Any) -> np.ndarray:
+        """
+        Loads one image as a BGR array (the models' training layout).
+        """
+        if isinstance(source, Image.Image):
+            return cv2.cvtColor(np.array(source.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+        if isinstance(source, str):
+            img = cv2.imread(source, cv2.IMREAD_COLOR)
+            if img is None:
+                raise FileNotFoundError(f"OpenCV failed to load image from path: {source}")
+            return img
+
+        raise TypeError("Source must be a file path (str) or a PIL Image object.")
+
+
+    # Detection
+    def _detect(self, img: np.ndarray) -> List[np.ndarray]:
+        """
+        Returns text quads (4x2, clockwise from top-left) in image coordinates.
+        """
+        h, w = img.shape[:2]
+        scale = min(1.0, self.det_limit_side / max(h, w))
+        rh = max(32, int(round(h * scale / 32)) * 32)
+        rw = max(32, int(round(w * scale / 32)) * 32)
+
+        resized = cv2.resize(img, (rw, rh))
+        tensor = (resized.astype(np.float32) / 255 - self.DET_MEAN) / self.DET_STD
+        tensor = tensor.transpose(2, 0, 1)[np.newaxis]
+
+        prob = self.det_session.run(None, {self.det_input: tensor})[0][0, 0]
+        bitmap = (prob > self.DET_THRESH).astype(np.uint8)
+
+        contours, _ = cv2.findContours(bitmap, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        ratio_x, ratio_y = w / rw, h / rh
+
+        quads = []
+        for contour in contours:
+            rect = cv2.minAreaRect(contour)
+            if min(rect[1]) < self.DET_MIN_SIDE:
+                continue
+            if self._box_score(prob, contour) < self.DET_BOX_THRESH:
+                continue
+
+            rect = self._unclip(rect)
+            if min(rect[1]) < self.DET_MIN_SIDE + 2:
+                continue
+
+            quad = self._order_points(cv2.boxPoints(rect))
+            quad[:, 0] = np.clip(quad[:, 0] * ratio_x, 0, w - 1)
+            quad[:, 1] = np.clip(quad[:, 1] * ratio_y, 0, h - 1)
+            quads.append(quad)
+
+        # Reading order: top to bottom, then left to right within a line
+        # (same rule as PaddleOCR's sorted_boxes)
+        quads.sort(key=lambda q: (q[0, 1], q[0, 0]))
+        for i in range(len(quads) - 1):
+            for j in range(i, -1, -1):
+                if abs(quads[j + 1][0, 1] - quads[j][0, 1]) < 10 and quads[j + 1][0, 0] < quads[j][0, 0]:
+                    quads[j], quads[j + 1] = quads[j + 1], quads[j]
+                else:
+                    break
+        return quads
+
+    @staticmethod
+    def _box_score(prob: np.ndarray, contour: np.ndarray) -> float:
+        x, y, bw, bh = cv2.boundingRect(contour)
+        mask = np.zeros((bh, bw), dtype=np.uint8)
+        cv2.fillPoly(mask, [contour.reshape(-1, 2) - (x, y)], 1)
+        return float(cv2.mean(prob[y:y + bh, x:x + bw], mask)[0])
+
+    def _unclip(self, rect) -> Tuple:
+        # Grows the shrunk DB region back by area * ratio / perimeter
+        (cx, cy), (rw, rh), angle = rect
+        distance = rw * rh * self.DET_UNCLIP_RATIO / max(2 * (rw + rh), 1e-6)
+        return (cx, cy), (rw + 2 * distance, rh + 2 * distance), angle
+
+    @staticmethod
+    def _order_points(points: np.ndarray) -> np.ndarray:
+        s, d = points.sum(axis=1), np.diff(points, axis=1).ravel()
+        return np.array([
+            points[np.argmin(s)],  # top-left
+            points[np.argmin(d)],  # top-right
+            points[np.argmax(s)],  # bottom-right
+            points[np.argmax(d)],  # bottom-left
+        ], dtype=np.float32)
+
+
+    # Recognition
+    @staticmethod
+    def _crop(img: np.ndarray, quad: np.ndarray) -> np.ndarray:
+        width = int(max(np.linalg.norm(quad[0] - quad[1]), np.linalg.norm(quad[2] - quad[3])))
+        height = int(max(np.linalg.norm(quad[0] - quad[3]), np.linalg.norm(quad[1] - quad[2])))
+        width, height = max(width, 1), max(height, 1)
+
+        target = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.float32)
+        crop = cv2.warpPerspective(
+            img, cv2.getPerspectiveTransform(quad, target), (width, height),
+            borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC,
+        )
+        # Vertical text
+        if height / width >= 1.5:
+            crop = np.ascontiguousarray(np.rot90(crop))
+        return crop
+
+    def _recognize(self, crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+        results: List[Tuple[str, float]] = [("", 0.0)] * len(crops)
+
+        # Similar aspect ratios per batch keep padding small
+        order = np.argsort([c.shape[1] / c.shape[0] for c in crops])
+        for start in range(0, len(order), self.REC_BATCH_SIZE):
+            batch = order[start:start + self.REC_BATCH_SIZE]
+            max_ratio = max(crops[i].shape[1] / crops[i].shape[0] for i in batch)
+            width = max(int(math.ceil(self.REC_HEIGHT * max_ratio)), self.REC_HEIGHT)
+
+            tensor = np.zeros((len(batch), 3, self.REC_HEIGHT, width), dtype=np.float32)
+            for row, i in enumerate(batch):
+                crop = crops[i]
+                w = min(width, int(math.ceil(self.REC_HEIGHT * crop.shape[1] / crop.shape[0])))
+                resized = cv2.resize(crop, (w, self.REC_HEIGHT)).astype(np.float32)
+                tensor[row, :, :, :w] = ((resized / 255 - 0.5) / 0.5).transpose(2, 0, 1)
+
+            probs = self.rec_session.run(None, {self.rec_input: tensor})[0]
+            for row, i in enumerate(batch):
+                results[i] = self._ctc_decode(probs[row])
+
+        return results
+
+    def _ctc_decode(self, probs: np.ndarray) -> Tuple[str, float]:
+        indices = probs.argmax(axis=1)
+        scores = probs.max(axis=1)
+
+        # Drop repeats and blanks
+        keep = np.ones(len(indices), dtype=bool)
+        keep[1:] = indices[1:] != indices[:-1]
+        keep &= indices != 0
+
+        text = "".join(self.characters[i] for i in indices[keep] if i < len(self.characters))
+        score = float(scores[keep].mean()) if keep.any() else 0.0
+        return text, score
+
+
+    def extract_data(self, source: Any) -> OCRResult:
+        """
+        Performs OCR on the image source and returns the extracted text.
+        """
+        try:
+            img = self._read_image(source)
+            quads = self._detect(img)
+            recognized = self._recognize([self._crop(img, q) for q in quads]) if quads else []
+
+        except Exception as e:
+            print(f"Error during ONNX OCR execution: {e}")
+            return OCRResult(error=f"ONNX OCR failed: {str(e)}")
+
+        texts, boxes, scores = [], [], []
+        for quad, (text, score) in zip(quads, recognized):
+            if not text.strip():
+                continue
+            texts.append(text)
+            boxes.append([quad[:, 0].min(), quad[:, 1].min(), quad[:, 0].max(), quad[:, 1].max()])
+            scores.append(score)
+
+        result = {
+            "rec_texts": texts,
+            "rec_boxes": np.array(boxes, dtype=np.int32).reshape(-1, 4),
+            "rec_scores": scores,
+        }
+
+        # Return based on toggle
+        if self.output_mode == "table":
+            return OCRResult(tables=paddleocr_to_df(result), raw=result)
+        return OCRResult(text="\n".join(texts), raw=result)
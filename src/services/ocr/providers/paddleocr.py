@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
@@ -9,75 +9,181 @@ from src.config import get_settings
 from src.models.models import OCRResult
 
 from ..interface import BaseInvoiceExtractor
-from .ocr_utils import paddleocr_to_df
+from .ocr_utils import (FramePool, frame_count, merge_page_results,
+                        merge_tile_predictions, ocr_frames, paddleocr_to_df,
+                        tile_grid)
+
+
+# JPEG DCT-scaled decoding, largest reduction first
+_REDUCED_READ_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
 
-settings = get_settings()
 
 class PaddleOCRExtractor(BaseInvoiceExtractor):
     """Extractor for image invoices using PaddleOCR (robust to layout variations)."""
 
+    # Detection + recognition models
+    memory_hint_bytes = 500 * 1024 ** 2
+    supports_batching = True
+
+    # Preprocessing
+    MAX_SIZE = 960
+    MEDIAN_BLUR_KSIZE = 5
+    PREPROCESS_VERSION = 2  # bump when preprocessing changes OCR output
+
     def __init__(self, lang='en'):
+        self.lang = lang
         self.ocr_model = PaddleOCR(use_textline_orientation=True, lang=lang)
+
+        settings = get_settings()
         self.output_mode = settings.ocr.ocr_output_mode.lower()  # 'text' or 'table'
+        self.max_pages = settings.ocr.max_pages
+
+        # Tiling: OCR large images at full resolution in overlapping tiles
+        self.tiling_enabled = settings.ocr.tiling_enabled
+        self.tile_size = settings.ocr.tile_size
+        self.tile_overlap = settings.ocr.tile_overlap
+        self.tile_min_side = settings.ocr.tile_min_side
+
+        # Multi-page images: frames are decoded while the model runs one at a time
+        self._frame_pool = FramePool(1, name="paddle-frame")
 
-    def extract_data(self, source: Any) -> str:
+    def cache_key_params(self) -> Dict[str, Any]:
+        return self.cache_key_params_for(lang=self.lang)
+
+    @classmethod
+    def cache_key_params_for(cls, lang: str = 'en') -> Dict[str, Any]:
+        settings = get_settings()
+        params = {
+            "lang": lang,
+            "max_size": cls.MAX_SIZE,
+            "median_blur_ksize": cls.MEDIAN_BLUR_KSIZE,
+            "preprocess_version": cls.PREPROCESS_VERSION,
+            "max_pages": settings.ocr.max_pages,
+        }
+        if settings.ocr.tiling_enabled:
+            params.update(
+                tile_size=settings.ocr.tile_size,
+                tile_overlap=settings.ocr.tile_overlap,
+                tile_min_side=settings.ocr.tile_min_side,
+            )
+        return params
+
+    # Helper
+    def _load(self, source: Any) -> Tuple[np.ndarray, bool]:
         """
-        Performs OCR on the image source and returns the extracted text.
+        Loads one image ready for OCR. Returns (array, tiled):
+        - tiled: full resolution, for _predict_tiled
+        - otherwise: decoded at reduced scale where the format allows it,
+          then resized to MAX_SIZE and denoised
         """
-        img_array = None
+        tiled = self.tiling_enabled and self._long_side(source) >= self.tile_min_side
+        if tiled:
+            return self._read_image(source), True
+        return self._preprocess(self._read_image(source, self.MAX_SIZE)), False
 
+    @staticmethod
+    def _long_side(source: Any) -> int:
+        # Header only: no pixel data is decoded
+        if isinstance(source, Image.Image):
+            return max(source.size)
         try:
-            # Handle PIL Images
-            if isinstance(source, Image.Image):
-                if source.mode != "RGB":
-                    source = source.convert("RGB")
-                img_array = np.array(source)
-
-
-            # Handle file paths
-            elif isinstance(source, str):
-                img_array = cv2.imread(source)
-                if img_array is None:
-                    raise FileNotFoundError(f"OpenCV failed to load image from path: {source}")
-
-                # Convert to RGB
-                if len(img_array.shape) == 2:
-                    img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2RGB)
-                elif img_array.shape[2] == 4:
-                    img_array = cv2.cvtColor(img_array, cv2.COLOR_BGRA2RGB)
-                elif img_array.shape[2] == 3:
-                    img_array = cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB)
-                else:
-                    raise ValueError(f"Unsupported number of channels: {img_array.shape}")
+            with Image.open(source) as img:
+                return max(img.size)
+        except Exception:
+            return 0  # unreadable here; _read_image reports the error
+
+    @staticmethod
+    def _reduced_read_flag(source: str, target_size: int) -> int:
+        """
+        Picks the largest JPEG DCT scale (1/2, 1/4, 1/8) that still decodes
+        at least target_size pixels on the long side.
+        """
+        try:
+            with Image.open(source) as img:
+                if img.format != "JPEG":
+                    return cv2.IMREAD_COLOR
+                long_side = max(img.size)
+        except Exception:
+            return cv2.IMREAD_COLOR
+
+        for factor, flag in _REDUCED_READ_FLAGS:
+            if long_side // factor >= target_size:
+                return flag
+        return cv2.IMREAD_COLOR
+
+    def _read_image(self, source: Any, target_size: Optional[int] = None) -> np.ndarray:
+        """
+        Loads one image as an RGB array. With target_size, JPEG files are
+        decoded directly at a reduced scale that still covers it. PIL images
+        are read as given: they belong to the caller, and draft() would
+        change them in place.
+        """
+        # Handle PIL Images
+        if isinstance(source, Image.Image):
+            if source.mode != "RGB":
+                source = source.convert("RGB")
+            img_array = np.array(source)
+
+
+        # Handle file paths
+        elif isinstance(source, str):
+            flag = self._reduced_read_flag(source, target_size) if target_size else cv2.IMREAD_COLOR
+            img_array = cv2.imread(source, flag)
+            if img_array is None:
+                raise FileNotFoundError(f"OpenCV failed to load image from path: {source}")
 
+            # Convert to RGB
+            if len(img_array.shape) == 2:
+                img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2RGB)
+            elif img_array.shape[2] == 4:
+                img_array = cv2.cvtColor(img_array, cv2.COLOR_BGRA2RGB)
+            elif img_array.shape[2] == 3:
+                img_array = cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB)
             else:
-                raise TypeError("Source must be a file path (str) or a PIL Image object.")
+                raise ValueError(f"Unsupported number of channels: {img_array.shape}")
 
+        else:
+            raise TypeError("Source must be a file path (str) or a PIL Image object.")
 
-            # Reduce noise
-            img_array = cv2.medianBlur(img_array, 5)
+        return img_array
 
+    def _preprocess(self, img_array: np.ndarray) -> np.ndarray:
+        # Resize large images first, so denoising runs on the small array
+        h, w = img_array.shape[:2]
+        if max(h, w) > self.MAX_SIZE:
+            scale = self.MAX_SIZE / max(h, w)
+            img_array = cv2.resize(img_array, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
 
-            # Resize large images
-            MAX_SIZE = 960
-            h, w = img_array.shape[:2]
-            if max(h, w) > MAX_SIZE:
-                scale = MAX_SIZE / max(h, w)
-                img_array = cv2.resize(img_array, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
 
+        # Reduce noise
+        img_array = cv2.medianBlur(img_array, self.MEDIAN_BLUR_KSIZE)
 
-            # Run OCR
-            result = self.ocr_model.predict(img_array)[0]
+        return img_array
 
-        except Exception as e:
-            print(f"Error during PaddleOCR execution: {e}")
-            return {"error": f"PaddleOCR failed: {str(e)}",
-                    "total_amount": None,
-                    "invoice_id": None,
-                    "invoice_date": None,
-                    "vendor_name": None,
-                    "raw_text_length": 0}
+    def _predict_tiled(self, img_array: np.ndarray) -> dict:
+        """
+        OCRs a large image at full resolution: overlapping tiles go through
+        one batched predict call, and their boxes are mapped back to image
+        coordinates with the overlaps de-duplicated.
+        """
+        img_array = cv2.medianBlur(img_array, self.MEDIAN_BLUR_KSIZE)
+
+        h, w = img_array.shape[:2]
+        tiles = tile_grid(h, w, self.tile_size, self.tile_overlap)
+        crops = [img_array[y0:y1, x0:x1] for y0, y1, x0, x1, _ in tiles]
 
+        predictions = self.ocr_model.predict(crops)
+        return merge_tile_predictions(predictions, tiles)
+
+    def _to_result(self, result: dict, img_array: np.ndarray) -> OCRResult:
+        # Boxes are in the coordinates of the array the model saw, which
+        # _preprocess may have shrunk: report its (width, height)
+        h, w = img_array.shape[:2]
+        result["image_size"] = (w, h)
 
         # Return based on toggle
         if self.output_mode == "table":
@@ -88,6 +194,95 @@ class PaddleOCRExtractor(BaseInvoiceExtractor):
             return OCRResult(text=text, raw=result)
 
 
+    @staticmethod
+    def _is_multipage(source: Any) -> bool:
+        try:
+            return frame_count(source) > 1
+        except Exception:
+            return False  # unreadable here; _read_image reports the error
+
+    def _page_height(self, frame: Image.Image) -> float:
+        # Boxes are in the coordinates of the image the model saw
+        if self.tiling_enabled and max(frame.size) >= self.tile_min_side:
+            return frame.height
+        return frame.height * min(1.0, self.MAX_SIZE / max(frame.size))
+
+    def extract_data(self, source: Any) -> OCRResult:
+        """
+        Performs OCR on the image source and returns the extracted text.
+        Multi-page images (TIFF) are streamed frame by frame, up to
+        OCRSettings.max_pages; decoding overlaps with OCR, while the model
+        itself runs one frame at a time.
+        """
+        if self._is_multipage(source):
+            try:
+                results, heights = ocr_frames(
+                    source, self._extract_one, self._frame_pool, self.max_pages, page_height=self._page_height
+                )
+            except Exception as e:
+                print(f"Error during PaddleOCR execution: {e}")
+                return OCRResult(error=f"PaddleOCR failed: {str(e)}")
+            return merge_page_results(results, heights, self.output_mode == "table")
+
+        return self._extract_one(source)
+
+    def _extract_one(self, source: Any) -> OCRResult:
+        try:
+            img_array, tiled = self._load(source)
+
+            # Run OCR
+            if tiled:
+                result = self._predict_tiled(img_array)
+            else:
+                result = self.ocr_model.predict(img_array)[0]
+
+        except Exception as e:
+            print(f"Error during PaddleOCR execution: {e}")
+            return OCRResult(error=f"PaddleOCR failed: {str(e)}")
+
+        return self._to_result(result, img_array)
+
+    def extract_batch(self, sources: List[Any]) -> List[OCRResult]:
+        """
+        Runs OCR on several images with a single predict call, which
+        amortizes per-call overhead on small images.
+        Images that fail to load get an error result; the rest still run.
+        Multi-page images and images large enough for tiling are OCR'd on
+        their own.
+        """
+        results: List[Optional[OCRResult]] = [None] * len(sources)
+        images, positions = [], []
+
+        for i, source in enumerate(sources):
+            if self._is_multipage(source):
+                results[i] = self.extract_data(source)
+                continue
+            try:
+                img_array, tiled = self._load(source)
+                if tiled:
+                    results[i] = self._to_result(self._predict_tiled(img_array), img_array)
+                else:
+                    images.append(img_array)
+                    positions.append(i)
+            except Exception as e:
+                print(f"Error during PaddleOCR execution: {e}")
+                results[i] = OCRResult(error=f"PaddleOCR failed: {str(e)}")
+
+        if images:
+            try:
+                predictions = self.ocr_model.predict(images)
+            except Exception as e:
+                print(f"Error during PaddleOCR execution: {e}")
+                for i in positions:
+                    results[i] = OCRResult(error=f"PaddleOCR failed: {str(e)}")
+                return results
+
+            for i, image, prediction in zip(positions, images, predictions):
+                results[i] = self._to_result(prediction, image)
+
+        return results
+
+
 # CLI for testing
 if __name__ == "__main__":
     import sys
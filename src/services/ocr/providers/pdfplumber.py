@@ -1,30 +1,335 @@
-from typing import Any, BinaryIO, TextIO, Union
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from dataclasses import dataclass, field
+from typing import (Any, BinaryIO, Dict, Iterator, List, Optional, TextIO,
+                    Tuple, Union)
 
+import pandas as pd
 import pdfplumber
+from PIL import Image
+
+from src.config import get_settings
+from src.models.models import OCRResult
 
 from ..interface import BaseInvoiceExtractor
+from .ocr_utils import TABLE_COLUMNS, pdfplumber_words_to_df
+
+logger = logging.getLogger(__name__)
 
 # Define a type hint for common PDF source inputs
 PDFSource = Union[str, BinaryIO, TextIO]
 
+
+@dataclass
+class PDFPageData:
+    page_number: int  # 1-based, like pdfplumber
+    width: float
+    height: float
+    text: str
+    words: List[Dict[str, Any]] = field(default_factory=list)
+    # Set when the page has no usable text layer and was rasterized for OCR
+    image: Optional[Image.Image] = None
+
+
+# Shared pool for page-parallel extraction of long PDFs (pdfplumber is pure
+# Python, so pages are spread over processes rather than threads)
+_POOL_LOCK = threading.Lock()
+_PAGE_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _get_page_pool(workers: int) -> ProcessPoolExecutor:
+    global _PAGE_POOL
+    with _POOL_LOCK:
+        if _PAGE_POOL is None:
+            _PAGE_POOL = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _PAGE_POOL
+
+
+def _read_page(page, with_words: bool, raster_dpi: Optional[int] = None,
+    min_text_chars: int = 0) -> PDFPageData:
+    """
+    Reads one page. With raster_dpi set, a page whose text layer has fewer
+    than min_text_chars characters is rendered to an image for OCR.
+    """
+    text = page.extract_text() or ""
+    data = PDFPageData(
+        page_number=page.page_number,
+        width=float(page.width),
+        height=float(page.height),
+        text=text,
+        words=page.extract_words() if with_words else [],
+    )
+
+    if raster_dpi and len(text.strip()) < min_text_chars:
+        data.image = page.to_image(resolution=raster_dpi).original.convert("RGB")
+
+    return data
+
+
+def _read_page_range(source: str, start: int, stop: int, with_words: bool,
+    raster_dpi: Optional[int] = None, min_text_chars: int = 0) -> List[PDFPageData]:
+    """
+    Worker entry point: reads pages [start, stop) of a PDF file.
+    """
+    out = []
+    with pdfplumber.open(source) as pdf:
+        for i in range(start, stop):
+            page = pdf.pages[i]
+            try:
+                out.append(_read_page(page, with_words, raster_dpi, min_text_chars))
+            finally:
+                page.close()
+    return out
+
+
 class PDFPlumberExtractor(BaseInvoiceExtractor):
     """Extractor for PDF invoices using the pdfplumber library."""
 
-    def extract_data(self, source: PDFSource) -> str:
+    thread_safe = True
+
+    # Page-parallel reads: pages per worker task, and tasks in flight per
+    # worker (bounds the pages, and rendered images, held at once)
+    RANGE_PAGES = 8
+    RANGES_PER_WORKER = 2
+
+    OCR_BOXES_VERSION = 2  # bump when mapping OCR boxes to points changes
+
+    def __init__(self):
+        settings = get_settings()
+        self.max_pages = settings.ocr.max_pages
+        self.page_workers = settings.ocr.pdf_page_workers
+        self.parallel_min_pages = settings.ocr.pdf_parallel_min_pages
+        self.output_mode = settings.ocr.ocr_output_mode.lower()  # 'text' or 'table'
+
+        # Scanned-page fallback
+        self.ocr_fallback = settings.ocr.pdf_ocr_fallback
+        self.raster_dpi = settings.ocr.pdf_raster_dpi
+        self.min_text_chars = settings.ocr.pdf_min_text_chars
+        self.ocr_extension = settings.ocr.pdf_ocr_extension
+        self.ocr_workers = max(1, settings.ocr.pdf_ocr_workers)
+
+    def cache_key_params(self) -> Dict[str, Any]:
+        return self.cache_key_params_for()
+
+    @classmethod
+    def cache_key_params_for(cls) -> Dict[str, Any]:
+        # Imported lazily: the factory maps extensions to this module too
+        from ..factory import InvoiceExtractorFactory
+
+        settings = get_settings()
+        output_mode = settings.ocr.ocr_output_mode.lower()
+        if not settings.ocr.pdf_ocr_fallback:
+            return {"output_mode": output_mode, "ocr_fallback": False}
+
+        params = {
+            "output_mode": output_mode,
+            "ocr_fallback": True,
+            "raster_dpi": settings.ocr.pdf_raster_dpi,
+            "min_text_chars": settings.ocr.pdf_min_text_chars,
+            "ocr_extension": settings.ocr.pdf_ocr_extension,
+            "ocr_boxes_version": cls.OCR_BOXES_VERSION,
+        }
+
+        # The image engine's own settings change the OCR'd pages
+        try:
+            OCRClass = InvoiceExtractorFactory.extractor_class(f"page{settings.ocr.pdf_ocr_extension}")
+        except ImportError:
+            # Not installed: scanned pages fail, and the key changes once it is
+            params["ocr_engine"] = None
+            return params
+
+        params["ocr_engine"] = f"{OCRClass.__module__}.{OCRClass.__qualname__}"
+        params["ocr_engine_params"] = OCRClass.cache_key_params_for()
+        return params
+
+    def iter_pages(self, source: PDFSource, max_pages: Optional[int] = None,
+        with_words: bool = True, rasterize: bool = False) -> Iterator[PDFPageData]:
         """
-        Extracts raw text from PDF and then parses it into structured data.
+        Yields pages one at a time, stopping at max_pages (default:
+        OCRSettings.max_pages). Each page's cached layout objects are released
+        as soon as it has been read, so memory stays flat on long PDFs.
+        With rasterize=True, pages without a text layer carry an `image`
+        rendered at OCRSettings.pdf_raster_dpi.
         """
-        all_text = []
+        max_pages = self.max_pages if max_pages is None else max_pages
+        raster_dpi = self.raster_dpi if rasterize else None
+
+        with pdfplumber.open(source) as pdf:
+            n_pages = min(len(pdf.pages), max_pages)
+
+            # Long PDFs on disk: read page ranges in parallel, yield in order
+            if (
+                isinstance(source, str)
+                and self.page_workers > 1
+                and n_pages >= self.parallel_min_pages
+            ):
+                yield from self._iter_pages_parallel(source, n_pages, with_words, raster_dpi)
+                return
+
+            for i in range(n_pages):
+                page = pdf.pages[i]
+                try:
+                    yield _read_page(page, with_words, raster_dpi, self.min_text_chars)
+                finally:
+                    page.close()
+
+    def _iter_pages_parallel(self, source: str, n_pages: int, with_words: bool,
+        raster_dpi: Optional[int]) -> Iterator[PDFPageData]:
+        pool = _get_page_pool(self.page_workers)
+        chunk = min(-(-n_pages // self.page_workers), self.RANGE_PAGES)  # ceil division
+        max_in_flight = self.page_workers * self.RANGES_PER_WORKER
+
+        # Ranges are submitted as earlier ones are consumed, in order
+        in_flight: "deque[Future]" = deque()
         try:
-            with pdfplumber.open(source) as pdf:
-                for page in pdf.pages:
-                    # Extract text from the current page
-                    page_text = page.extract_text()
-                    if page_text:
-                        all_text.append(page_text)
+            for start in range(0, n_pages, chunk):
+                if len(in_flight) >= max_in_flight:
+                    yield from in_flight.popleft().result()
+                in_flight.append(pool.submit(
+                    _read_page_range, source, start, min(start + chunk, n_pages),
+                    with_words, raster_dpi, self.min_text_chars
+                ))
+            while in_flight:
+                yield from in_flight.popleft().result()
+        finally:
+            # Consumer stopped early: drop ranges that haven't started
+            for future in in_flight:
+                future.cancel()
+
+
+    # Scanned-page OCR
+    def _ocr_image(self, image: Image.Image) -> OCRResult:
+        # Imported lazily: the factory maps extensions to this module too
+        from ..factory import InvoiceExtractorFactory
+
+        extractor = InvoiceExtractorFactory.get_extractor(f"page{self.ocr_extension}")
+        result = InvoiceExtractorFactory.extract(extractor, image)
+
+        if not isinstance(result, OCRResult) or result.error:
+            error = result.error if isinstance(result, OCRResult) else result
+            raise RuntimeError(f"OCR of rasterized page failed: {error}")
+        return result
+
+    @staticmethod
+    def _ocr_text(result: OCRResult) -> str:
+        if result.text:
+            return result.text
+        if result.tables is not None and len(result.tables):
+            return "\n".join(result.tables["text"])
+        return ""
+
+    @staticmethod
+    def _ocr_table(result: OCRResult, y_offset: float, page_size: Tuple[float, float],
+        image_size: Tuple[int, int]) -> pd.DataFrame:
+        """
+        Brings OCR boxes into the PDF's point/doctop space so they line up
+        with native words. Boxes are in pixels of the image the engine
+        processed: raw["image_size"] when the engine reports it (PaddleOCR
+        shrinks large pages), else the rasterized page (`image_size`).
+        """
+        if result.tables is None or not len(result.tables):
+            return pd.DataFrame(columns=TABLE_COLUMNS)
+
+        raw = result.raw if isinstance(result.raw, dict) else {}
+        width, height = raw.get("image_size") or image_size
+        scale_x, scale_y = page_size[0] / width, page_size[1] / height
+
+        df = pd.DataFrame(result.tables)[TABLE_COLUMNS].copy()
+        df[["x_min", "x_max"]] = df[["x_min", "x_max"]].astype(float) * scale_x
+        df[["y_min", "y_max"]] = df[["y_min", "y_max"]].astype(float) * scale_y + y_offset
+        return df
+
+
+    def extract_data(self, source: PDFSource) -> OCRResult:
+        """
+        Extracts the PDF's text layer page by page.
+        - text mode: raw text
+        - table mode: word boxes (text, x_min, y_min, x_max, y_max, score)
+          straight from pdfplumber's word objects, no rendering involved
+        Pages without a text layer (scans) are rasterized and sent to the
+        image OCR provider on a small thread pool while the remaining pages
+        are read; results are merged back in page order. A page whose OCR
+        fails is left empty and listed in raw["ocr_failed_pages"]; the
+        document only fails if no page could be read at all.
+        """
+        table_mode = self.output_mode == "table"
+
+        # Per page: text or word table from the text layer, or an OCR future
+        pages: List[Union[str, pd.DataFrame, Future]] = []
+        y_offsets: List[float] = []
+        ocr_pages: List[int] = []
+        # Per OCR'd page: (page size in points, rasterized image size)
+        ocr_sizes: Dict[int, Tuple[Tuple[float, float], Tuple[int, int]]] = {}
+        ocr_failed: List[int] = []
+        pool: Optional[ThreadPoolExecutor] = None
+        y_offset = 0.0
+
+        try:
+            page_iter = self.iter_pages(source, with_words=table_mode, rasterize=self.ocr_fallback)
+            for index, page in enumerate(page_iter):
+                y_offsets.append(y_offset)
+                y_offset += page.height
+
+                if page.image is None:
+                    pages.append(pdfplumber_words_to_df(page.words) if table_mode else page.text)
+                    continue
+
+                if pool is None:
+                    pool = ThreadPoolExecutor(max_workers=self.ocr_workers, thread_name_prefix="pdf-ocr")
+
+                # Bound rendered pages held in memory
+                in_flight = [pages[i] for i in ocr_pages if not pages[i].done()]
+                if len(in_flight) >= self.ocr_workers * 2:
+                    wait(in_flight, return_when=FIRST_COMPLETED)
+
+                pages.append(pool.submit(self._ocr_image, page.image))
+                ocr_pages.append(index)
+                ocr_sizes[index] = ((page.width, page.height), page.image.size)
+                page.image = None
+
+            for index in ocr_pages:
+                try:
+                    result = pages[index].result()
+                except Exception as e:
+                    logger.warning(f"[PDFPlumber] OCR of page {index + 1} failed: {e}")
+                    ocr_failed.append(index + 1)
+                    result = OCRResult()
+                pages[index] = (
+                    self._ocr_table(result, y_offsets[index], *ocr_sizes[index]) if table_mode
+                    else self._ocr_text(result)
+                )
+
         except Exception as e:
             print(f"Error extracting text with PDFPlumber: {e}")
-            return {"error": f"PDFPlumber failed: {str(e)}", "total_amount": None, "invoice_id": None, "invoice_date": None, "vendor_name": None, "raw_text_length": 0}
+            return OCRResult(error=f"PDFPlumber failed: {str(e)}")
+
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        raw = {
+            "pages_read": len(pages),
+            "ocr_pages": [index + 1 for index in ocr_pages],
+            "ocr_failed_pages": ocr_failed,
+        }
+
+        if pages and len(ocr_failed) == len(pages):
+            return OCRResult(error=f"OCR failed on every page ({len(pages)})", raw=raw)
+
+        if table_mode:
+            non_empty = [df for df in pages if len(df)]
+            tables = (
+                pd.concat(non_empty, ignore_index=True) if non_empty
+                else pd.DataFrame(columns=TABLE_COLUMNS)
+            )
+            return OCRResult(tables=tables, raw=raw)
 
-        raw_text = "\n".join(all_text)
-        return raw_text
+        raw_text = "\n".join(text for text in pages if text)
+        return OCRResult(text=raw_text, raw=raw)
@@ -1,18 +1,169 @@
-from typing import Any
+import logging
+import threading
+from typing import Any, Dict
 
+import pandas as pd
 import pytesseract
 from PIL import Image
 
+from src.config import get_settings
+from src.models.models import OCRResult
+
 from ..interface import BaseInvoiceExtractor
+from .ocr_utils import (TABLE_COLUMNS, FramePool, frame_count,
+                        merge_page_results, ocr_frames)
+
+try:
+    # Optional: in-process engine through the Tesseract C API
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
 
 
 class TesseractExtractor(BaseInvoiceExtractor):
-    """Extractor for image invoices using Tesseract OCR."""
+    """
+    Extractor for image invoices using Tesseract OCR.
+    Backends:
+    - tesserocr: one persistent engine per thread (no process spawn or
+      traineddata reload per image)
+    - subprocess: pytesseract, one `tesseract` process per image; used
+      when tesserocr isn't installed or its engine can't start
+    """
+
+    thread_safe = True
+
+    def __init__(self):
+        settings = get_settings()
+        self.output_mode = settings.ocr.ocr_output_mode.lower()  # 'text' or 'table'
+        self.lang = settings.ocr.tesseract_lang
+        self.max_pages = settings.ocr.max_pages
+        self.page_workers = settings.ocr.image_page_workers
+        self._frame_pool = FramePool(self.page_workers, name="tesseract-frame")
+
+        if settings.ocr.tesseract_backend == "tesserocr" and tesserocr is None:
+            raise RuntimeError("tesseract_backend='tesserocr' but tesserocr is not installed")
+        self.use_engine = self._backend(settings.ocr.tesseract_backend) == "tesserocr"
+
+        # Engines are not thread-safe: one per thread
+        self._local = threading.local()
+
+    def cache_key_params(self) -> Dict[str, Any]:
+        return self.cache_key_params_for()
+
+    @classmethod
+    def cache_key_params_for(cls) -> Dict[str, Any]:
+        settings = get_settings()
+        return {
+            "output_mode": settings.ocr.ocr_output_mode.lower(),
+            "lang": settings.ocr.tesseract_lang,
+            "max_pages": settings.ocr.max_pages,
+            # The backends can recognize slightly different text
+            "backend": cls._backend(settings.ocr.tesseract_backend),
+        }
+
+    @staticmethod
+    def _backend(setting: str) -> str:
+        """The backend a setting resolves to ("auto": tesserocr when installed)."""
+        return "tesserocr" if setting != "subprocess" and tesserocr is not None else "subprocess"
+
+    # Helper
+    def _engine(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            try:
+                api = tesserocr.PyTessBaseAPI(lang=self.lang)
+            except RuntimeError:
+                # e.g. missing traineddata: don't retry on every image
+                self.use_engine = False
+                raise
+            self._local.api = api
+        return api
+
+    def _engine_words(self, image: Image.Image) -> pd.DataFrame:
+        """
+        Recognizes words with this thread's engine, in the same schema as
+        _words_to_df.
+        """
+        api = self._engine()
+        level = tesserocr.RIL.WORD
+        rows = []
+        para = line = 0
+
+        try:
+            api.SetImage(image)
+            api.Recognize()
+
+            iterator = api.GetIterator()
+            for word in tesserocr.iterate_level(iterator, level):
+                # A block starts with a paragraph, a paragraph with a line
+                if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+                    para += 1
+                if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+
+                text = (word.GetUTF8Text(level) or "").strip()
+                box = word.BoundingBox(level)
+                if not text or box is None:
+                    continue
 
-    def extract_data(self, source: Any) -> str:
+                x_min, y_min, x_max, y_max = box
+                rows.append((text, x_min, y_min, x_max, y_max, word.Confidence(level) / 100, para, line))
+        finally:
+            # Drop the image and results, keep the loaded model
+            api.Clear()
+
+        return pd.DataFrame(rows, columns=TABLE_COLUMNS + ["para", "line"])
+
+    def _subprocess_words(self, image: Image.Image) -> pd.DataFrame:
+        data = pytesseract.image_to_data(image, lang=self.lang, output_type=pytesseract.Output.DICT)
+        return self._words_to_df(data)
+
+    @staticmethod
+    def _words_to_df(data: Dict[str, list]) -> pd.DataFrame:
+        """
+        Converts pytesseract.image_to_data output to the OCR table schema,
+        keeping recognized words only (conf -1 marks layout rows).
+        """
+        df = pd.DataFrame(data)
+        df["conf"] = pd.to_numeric(df["conf"], errors="coerce")
+        df["text"] = df["text"].astype(str).str.strip()
+        df = df[(df["conf"] >= 0) & (df["text"] != "")]
+
+        words = pd.DataFrame({
+            "text": df["text"],
+            "x_min": df["left"],
+            "y_min": df["top"],
+            "x_max": df["left"] + df["width"],
+            "y_max": df["top"] + df["height"],
+            "score": df["conf"] / 100,
+            # Paragraph and line identity, for rebuilding text
+            "para": list(zip(df["block_num"], df["par_num"])),
+            "line": list(zip(df["block_num"], df["par_num"], df["line_num"])),
+        })
+        return words.reset_index(drop=True)
+
+    @staticmethod
+    def _words_to_text(words: pd.DataFrame) -> str:
+        """
+        Rebuilds the text like image_to_string: words joined by spaces,
+        lines by newlines, and a blank line between paragraphs (which
+        separate layout blocks, e.g. the vendor address from the items).
+        """
+        paragraphs = [
+            "\n".join(para.groupby("line", sort=False)["text"].agg(" ".join))
+            for _, para in words.groupby("para", sort=False)
+        ]
+        return "\n\n".join(paragraphs)
+
+    def extract_data(self, source: Any) -> OCRResult:
         """
-        Performs OCR on the image source and then parses the raw text.
-        Source can be a file path or a PIL Image object.
+        Performs OCR on the image source and returns the text (or word boxes
+        in table mode) with word confidences.
+        Source can be a file path or a PIL Image object. Multi-page images
+        (TIFF faxes) are streamed frame by frame and OCR'd on
+        OCRSettings.image_page_workers threads, up to max_pages.
         """
         try:
             # Tesseract usually requires a file path or an opened PIL Image
@@ -23,10 +174,38 @@ class TesseractExtractor(BaseInvoiceExtractor):
             else:
                 raise TypeError("Source must be a file path (str) or a PIL Image.")
 
-            # Perform OCR
-            raw_text = pytesseract.image_to_string(image)
+            if frame_count(image) > 1:
+                results, heights = ocr_frames(image, self._extract_image, self._frame_pool, self.max_pages)
+                return merge_page_results(results, heights, self.output_mode == "table")
+
         except Exception as e:
             print(f"Error extracting text with Tesseract: {e}")
-            return {"error": f"Tesseract failed: {str(e)}", "total_amount": None, "invoice_id": None, "invoice_date": None, "vendor_name": None, "raw_text_length": 0}
+            return OCRResult(error=f"Tesseract failed: {str(e)}")
+
+        return self._extract_image(image)
+
+    def _extract_image(self, image: Image.Image) -> OCRResult:
+        try:
+            # Perform OCR (one pass: words, boxes and confidences)
+            words, backend = None, "subprocess"
+            if self.use_engine:
+                try:
+                    words, backend = self._engine_words(image), "tesserocr"
+                except Exception as e:
+                    logger.warning(f"[Tesseract] In-process engine failed, using subprocess: {e}")
+            if words is None:
+                words = self._subprocess_words(image)
+        except Exception as e:
+            print(f"Error extracting text with Tesseract: {e}")
+            return OCRResult(error=f"Tesseract failed: {str(e)}")
+
+        raw = {
+            "mean_confidence": round(float(words["score"].mean() * 100), 2) if len(words) else 0.0,
+            "word_count": len(words),
+            "backend": backend,
+        }
+
+        if self.output_mode == "table":
+            return OCRResult(tables=words[TABLE_COLUMNS], raw=raw)
 
-        return raw_text
+        return OCRResult(text=self._words_to_text(words), raw=raw)
@@ -1 +1,6 @@
-from .providers.heuristic.heuristic_router import HeuristicRouterParser
+def __getattr__(name):
+    # Lazy re-export: importing the package must not load every provider
+    if name == "HeuristicRouterParser":
+        from .providers.heuristic.heuristic_router import HeuristicRouterParser
+        return HeuristicRouterParser
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
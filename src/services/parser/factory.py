@@ -22,4 +22,4 @@ class ParserFactory:
                 f"Parser '{parser_name}' requires OPENAI_API_KEY"
             )
 
-        return meta.cls()
+        return meta.load()()
@@ -2,16 +2,29 @@ import argparse
 import datetime
 import json
 import logging
+import multiprocessing
 import os
+import itertools
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                wait)
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
+import pandas as pd
 
+from src.models.models import OCRResult
+from src.services.ocr.cache import get_ocr_cache
+from src.services.ocr.factory import InvoiceExtractorFactory
 from src.services.ocr.main import process_invoice
+from src.utils.file_utils import file_digest
 from src.utils.logging_config import logger
 
 from .factory import ParserFactory
+from .interface import BaseParser
+from .manifest import BatchManifest
+from .pipeline import InvoicePipeline, PipelineConfig
+from .writers import JSONLResultWriter, RawMode
 
 # Project folders and timestamp
 ROOT_FOLDER = Path(__file__).resolve().parent.parent.parent
@@ -25,22 +38,48 @@ VALID_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".tiff"}
 
 
 # Single file parser
-def run_parser(file_path: str, parser_name: str = "heuristic") -> Dict[str, Any]:
+def run_parser(file_path: str, parser_name: str = "heuristic",
+    use_cache: bool = True) -> Dict[str, Any]:
     logger.info(f"Processing file: {file_path} with parser: {parser_name}")
 
-    ocr_output = process_invoice(file_path)
+    digest = _source_digest(file_path, use_cache)
+    ocr_output = process_invoice(file_path, use_cache=use_cache, digest=digest)
 
+    if ocr_output.error:
+        logger.warning(f"OCR error for {file_path}: {ocr_output.error}")
+        return {"error": ocr_output.error, "sha256": digest}
+
+    parser = ParserFactory.get_parser(parser_name)
+    return {**parse_ocr_output(ocr_output, parser, file_path), "sha256": digest}
+
+
+def _source_digest(file_path: str, use_cache: bool) -> Optional[str]:
+    """
+    The file's sha256 when the OCR cache will hash it anyway, else None.
+    Computed once and shared by the cache key and the batch manifest.
+    """
+    if not use_cache or not get_ocr_cache().enabled or not os.path.isfile(file_path):
+        return None
+    return file_digest(file_path)
+
+
+# Parse stage only
+def parse_ocr_output(ocr_output: OCRResult, parser: BaseParser, file_path: str) -> Dict[str, Any]:
+    """
+    Runs a parser over an OCRResult that has already been produced
+    (freshly, from the OCR cache or replayed from a saved batch).
+    """
     # Handle OCR errors
     if ocr_output.error:
         logger.warning(f"OCR error for {file_path}: {ocr_output.error}")
         return {"error": ocr_output.error}
 
     # Ensure there is content
-    if not ocr_output.text and not ocr_output.tables:
+    has_tables = ocr_output.tables is not None and len(ocr_output.tables) > 0
+    if not ocr_output.text and not has_tables:
         logger.warning(f"OCR returned no content for {file_path}")
         return {"error": "OCR returned no text or tables."}
 
-    parser = ParserFactory.get_parser(parser_name)
     structured = parser.parse(ocr_output)
 
     # Include raw OCR content length
@@ -61,13 +100,127 @@ def run_parser(file_path: str, parser_name: str = "heuristic") -> Dict[str, Any]
 # Helper for JSON serialization
 def _serialize(obj):
     if isinstance(obj, np.ndarray):
+        # NaN (missing line item numbers) isn't valid JSON
+        if obj.dtype.kind == "f":
+            return np.where(np.isnan(obj), None, obj).tolist()
         return obj.tolist()
+    # Keep OCR tables restorable (see reparse)
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient="records")
     return str(obj)
 
 
+# Batch record
+def _build_record(fp: str, parser_name: str, parsed: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "file": os.path.basename(fp),
+        "full_path": fp,
+        "parser_used": parser_name,
+        "error": parsed.get("error"),
+        "ocr_result": parsed.get("ocr_result"),
+        "structured_data": parsed.get("structured_data"),
+        "raw_text_length": parsed.get("raw_text_length", 0),
+        "sha256": parsed.get("sha256"),
+    }
+
+
+# Process-pool workers
+def _init_worker(extensions: List[str]):
+    """
+    Runs once per worker process: loads the OCR extractors needed by the batch
+    so every file afterwards hits the factory cache instead of reloading models.
+    A failed load is only logged: raising here would break the whole pool,
+    while the files of that type can still load the extractor lazily.
+    """
+    for ext in extensions:
+        try:
+            for extractor in InvoiceExtractorFactory.prewarm([ext]):
+                logger.info(f"[Worker {os.getpid()}] Warmed up {extractor.__class__.__name__}")
+        except Exception as e:
+            logger.warning(f"[Worker {os.getpid()}] Could not prewarm extractor for {ext}: {e}")
+
+
+def _run_indexed(index: int, file_path: str, parser_name: str, use_cache: bool):
+    return index, run_parser(file_path, parser_name, use_cache=use_cache)
+
+
+def _iter_parallel(file_paths: List[str], parser_name: str, workers: int,
+    use_cache: bool = True) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Fans files out to a process pool and yields (index, record) pairs
+    as files finish, i.e. out of input order. At most 2 * workers files are
+    submitted at once; more are submitted as they finish.
+    """
+    extensions = sorted({os.path.splitext(fp)[1].lower() for fp in file_paths})
+
+    # 'spawn' so workers don't inherit the parent's OCR runtime threads/locks
+    ctx = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(extensions,)
+    ) as pool:
+        pending = enumerate(file_paths)
+        futures: Dict[Future, int] = {}
+        max_in_flight = 2 * workers
+
+        def submit_more():
+            for i, fp in itertools.islice(pending, max_in_flight - len(futures)):
+                futures[pool.submit(_run_indexed, i, fp, parser_name, use_cache)] = i
+
+        submit_more()
+        done_count = 0
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            # Drop our references so finished results can be freed, and keep
+            # the pool busy while the records are consumed
+            finished = [(futures.pop(future), future) for future in finished]
+            submit_more()
+
+            for i, future in finished:
+                try:
+                    _, parsed = future.result()
+                except Exception as e:
+                    logger.error(f"Worker failed for {file_paths[i]}: {e}", exc_info=True)
+                    parsed = {"error": str(e)}
+
+                done_count += 1
+                logger.info(f"[{done_count}/{len(file_paths)}] Finished {file_paths[i]}")
+                yield i, _build_record(file_paths[i], parser_name, parsed)
+
+
+def _iter_sequential(file_paths: List[str], parser_name: str,
+    use_cache: bool = True) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    for i, fp in enumerate(file_paths):
+        parsed = run_parser(fp, parser_name, use_cache=use_cache)
+        yield i, _build_record(fp, parser_name, parsed)
+
+    # Worker processes keep their own counters
+    if use_cache:
+        logger.info(f"OCR cache stats: {get_ocr_cache().stats()}")
+
+
 # Batch parser
 def run_batch(path: str, parser_name: str = "heuristic", as_json: bool = True,
-    output_file: str = None, save_file: bool = True):
+    output_file: str = None, save_file: bool = True, workers: int = 1,
+    use_cache: bool = True, output_format: str = "json", raw_mode: RawMode = "keep",
+    resume: bool = False, pipeline: PipelineConfig = None):
+    """
+    Runs OCR + parsing over a file or folder.
+    - output_format="json":  results are collected and saved as one JSON list
+    - output_format="jsonl": each record is streamed to disk as soon as it
+      finishes; only a summary is kept in memory and returned. A checkpoint
+      manifest is kept next to the output, and resume=True skips files it
+      lists and appends only new results.
+    """
+    if resume and (output_format != "jsonl" or output_file is None or not save_file):
+        raise ValueError(
+            "resume requires output_format='jsonl', an explicit output_file and save_file=True"
+        )
+    if pipeline is not None and workers > 1:
+        raise ValueError("workers and pipeline are exclusive: size the pipeline with PipelineConfig")
 
     logger.info(f"Starting batch processing for path: {path}")
 
@@ -92,17 +245,41 @@ def run_batch(path: str, parser_name: str = "heuristic", as_json: bool = True,
         logger.error(error["error"])
         return json.dumps(error, indent=4) if as_json else error
 
-    results = []
-    for fp in file_paths:
-        parsed = run_parser(fp, parser_name)
-        results.append({
-            "file": os.path.basename(fp),
-            "full_path": fp,
-            "parser_used": parser_name,
-            "ocr_result": parsed["ocr_result"],
-            "structured_data": parsed["structured_data"],
-            "raw_text_length": parsed.get("raw_text_length", 0)
-        })
+    # Checkpointing (streaming mode only)
+    manifest = None
+    skipped = 0
+    if output_format == "jsonl" and save_file:
+        if output_file is None:
+            output_file = os.path.join(RESULT_FOLDER, f"results_{TIMESTAMP}.jsonl")
+        manifest = BatchManifest(BatchManifest.path_for(output_file), resume=resume)
+
+        if resume:
+            pending = [fp for fp in file_paths if not manifest.is_done(fp)]
+            skipped = len(file_paths) - len(pending)
+            file_paths = pending
+            logger.info(f"Resuming batch: {skipped} files already done, {len(file_paths)} left")
+
+    if pipeline is not None:
+        records = InvoicePipeline(parser_name, pipeline, use_cache).run(file_paths)
+    elif workers > 1 and len(file_paths) > 1:
+        logger.info(f"Running batch on {workers} worker processes")
+        records = _iter_parallel(file_paths, parser_name, workers, use_cache)
+    else:
+        records = _iter_sequential(file_paths, parser_name, use_cache)
+
+    if output_format == "jsonl":
+        # Files retried on resume (failed or unfinished) replace their old records
+        summary = _stream_batch(
+            records, output_file, save_file, raw_mode, manifest,
+            append=resume, supersede=file_paths if resume else None
+        )
+        summary["skipped"] = skipped
+        return summary
+
+    # Collect and restore input order
+    results: List[Dict[str, Any]] = [None] * len(file_paths)
+    for i, record in records:
+        results[i] = record
 
     # Save batch results to timestamped JSON
     if save_file:
@@ -116,7 +293,52 @@ def run_batch(path: str, parser_name: str = "heuristic", as_json: bool = True,
     return results
 
 
+def _stream_batch(records: Iterator[Tuple[int, Dict[str, Any]]], output_file: str,
+    save_file: bool, raw_mode: RawMode, manifest: BatchManifest = None,
+    append: bool = False, supersede: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Writes records to a JSONL file in completion order.
+    Manifest entries are flushed only after their records hit the output file.
+    When appending, earlier records of the `supersede` files are removed first.
+    """
+    if not save_file:
+        output_file = os.devnull
+
+    writer = JSONLResultWriter(
+        output_file,
+        default=_serialize,
+        raw_mode=raw_mode,
+        append=append,
+        on_flush=manifest.flush if manifest else None,
+        supersede=supersede,
+    )
+
+    try:
+        for _, record in records:
+            writer.write(record)
+            # Failed files stay out of the manifest so a resume retries them
+            if manifest and not record.get("error"):
+                manifest.add(record["full_path"], record.get("sha256"))
+    finally:
+        writer.close()
+        if manifest:
+            manifest.close()
+
+    return {
+        "output_file": output_file if save_file else None,
+        "processed": writer.count,
+        "errors": writer.errors,
+    }
+
+
 # CLI
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def cli():
     parser = argparse.ArgumentParser(description="Run invoice parser (single or batch mode).")
     parser.add_argument("path", help="Path to an invoice file or a folder of invoices.")
@@ -139,16 +361,102 @@ def cli():
         help="Do not save results to file (useful for debugging)"
     )
 
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes for batch mode (default: 1, sequential); "
+             "not combinable with --pipeline, which uses --ocr-workers/--parse-workers"
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the on-disk OCR result cache"
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=["json", "jsonl"],
+        default="json",
+        help="json: one list written at the end | jsonl: stream one line per invoice"
+    )
+
+    parser.add_argument(
+        "--raw",
+        choices=["keep", "drop", "external"],
+        default="keep",
+        help="How to store provider raw OCR output in JSONL mode"
+    )
+
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Output file (default: output/results_<timestamp>.<format>)"
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap OCR and parsing in a staged pipeline with bounded queues"
+    )
+
+    parser.add_argument(
+        "--ocr-workers",
+        type=_positive_int,
+        default=1,
+        help="OCR stage threads in pipeline mode"
+    )
+
+    parser.add_argument(
+        "--parse-workers",
+        type=_positive_int,
+        default=4,
+        help="Parse stage threads in pipeline mode"
+    )
+
+    parser.add_argument(
+        "--queue-size",
+        type=_positive_int,
+        default=16,
+        help="Capacity of each pipeline queue"
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip files recorded in the output's checkpoint manifest (implies --format jsonl, needs --output)"
+    )
+
     args = parser.parse_args()
 
     if not args.path:
         parser.error("You must provide a path to a file/folder")
 
+    if args.pipeline and args.workers != 1:
+        parser.error("--workers cannot be combined with --pipeline (use --ocr-workers/--parse-workers)")
+
+    if args.resume:
+        if not args.output or args.no_save:
+            parser.error("--resume needs --output and cannot be combined with --no-save")
+        args.format = "jsonl"
+
     result = run_batch(
         args.path,
         args.parser_name,
         as_json=args.json,
-        save_file=not args.no_save
+        output_file=args.output,
+        save_file=not args.no_save,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        output_format=args.format,
+        raw_mode=args.raw,
+        resume=args.resume,
+        pipeline=PipelineConfig(
+            ocr_workers=args.ocr_workers,
+            parse_workers=args.parse_workers,
+            queue_size=args.queue_size
+        ) if args.pipeline else None
     )
 
 
@@ -0,0 +1,99 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from src.utils.file_utils import file_digest, truncate_partial_line
+from src.utils.logging_config import logger
+
+
+class BatchManifest:
+    """
+    Checkpoint manifest of completed batch files, stored as JSON Lines next
+    to the batch output. Each entry is keyed by path and records size, mtime
+    and content hash:
+    - same size + mtime           -> done (no hashing needed)
+    - same size, different mtime  -> done only if the content hash matches
+    Entries are buffered and flushed by the caller right after the matching
+    results have been flushed, so the manifest never runs ahead of the output.
+    Only successful files are recorded: failed ones are retried on resume.
+    """
+
+    def __init__(self, manifest_file: str, resume: bool = False):
+        self.manifest_file = manifest_file
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._pending: List[str] = []
+
+        if resume:
+            self._load()
+            truncate_partial_line(manifest_file)
+
+        self._file = open(manifest_file, "a" if resume else "w", encoding="utf-8")
+
+    @staticmethod
+    def path_for(output_file: str) -> str:
+        return f"{os.path.splitext(output_file)[0]}.manifest.jsonl"
+
+
+    def _load(self):
+        if not os.path.exists(self.manifest_file):
+            return
+
+        with open(self.manifest_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partially written last line after a kill
+                    continue
+                self.entries[entry["path"]] = entry
+
+        logger.info(f"Loaded {len(self.entries)} completed entries from {self.manifest_file}")
+
+
+    # Fingerprints
+    @staticmethod
+    def fingerprint(file_path: str, digest: Optional[str] = None) -> Dict[str, Any]:
+        st = os.stat(file_path)
+        return {
+            "path": os.path.abspath(file_path),
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha256": digest or file_digest(file_path),
+        }
+
+    def is_done(self, file_path: str) -> bool:
+        entry = self.entries.get(os.path.abspath(file_path))
+        if entry is None:
+            return False
+
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            return False
+
+        if st.st_size != entry["size"]:
+            return False
+        if st.st_mtime == entry["mtime"]:
+            return True
+
+        # Touched but maybe unchanged: fall back to the content hash
+        return file_digest(file_path) == entry["sha256"]
+
+
+    # Recording
+    def add(self, file_path: str, digest: Optional[str] = None):
+        # digest: the file's sha256 when already computed (e.g. for the OCR cache key)
+        entry = self.fingerprint(file_path, digest)
+        self.entries[entry["path"]] = entry
+        self._pending.append(json.dumps(entry) + "\n")
+
+    def flush(self):
+        if self._pending:
+            self._file.write("".join(self._pending))
+            self._pending.clear()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
@@ -1,13 +1,32 @@
 from dataclasses import dataclass
-from typing import Dict, Type
+from typing import Dict, Optional, Type
+
+from src.config import get_settings
+from src.utils.lazy_import import import_string
 
 from .interface import BaseParser
 
 
 @dataclass(frozen=True)
 class ParserMeta:
-    cls: Type[BaseParser]
+    cls: Optional[Type[BaseParser]] = None
     requires_api_key: bool = False
+    path: Optional[str] = None  # "module:Class", imported on first use
+
+    def load(self) -> Type[BaseParser]:
+        if self.cls is not None:
+            return self.cls
+        return import_string(self.path)
+
+    @property
+    def reason(self) -> Optional[str]:
+        if self.requires_api_key and not get_settings().llm.openai_api_key:
+            return "OPENAI_API_KEY not set"
+        return None
+
+    @property
+    def available(self) -> bool:
+        return self.reason is None
 
 
 PARSER_REGISTRY: Dict[str, ParserMeta] = {}
@@ -25,3 +44,31 @@ def register_parser(
         )
         return cls
     return wrapper
+
+
+def register_lazy_parser(
+    name: str,
+    path: str,
+    *,
+    requires_api_key: bool = False
+):
+    """
+    Registers a parser by import path, so listing/selecting parsers
+    doesn't import every provider (and its dependencies) up front.
+    """
+    PARSER_REGISTRY[name.lower()] = ParserMeta(
+        requires_api_key=requires_api_key,
+        path=path
+    )
+
+
+# Built-in parsers
+register_lazy_parser(
+    "heuristic",
+    "src.services.parser.providers.heuristic.heuristic_router:HeuristicRouterParser"
+)
+register_lazy_parser(
+    "llm",
+    "src.services.parser.providers.llm.llm_parser:LLMParser",
+    requires_api_key=True
+)
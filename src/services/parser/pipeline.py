@@ -0,0 +1,212 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Tuple
+
+from src.services.ocr.main import process_invoice
+from src.utils.logging_config import logger
+
+from .factory import ParserFactory
+from .interface import BaseParser
+
+# Marks the end of a stage's input
+_DONE = object()
+
+# How often blocked stages re-check for shutdown (seconds)
+_POLL_INTERVAL = 0.1
+
+
+@dataclass
+class PipelineConfig:
+    ocr_workers: int = 1
+    parse_workers: int = 4
+    queue_size: int = 16
+
+    def __post_init__(self):
+        # A stage without workers never closes its queue: run() would hang
+        for name in ("ocr_workers", "parse_workers", "queue_size"):
+            if getattr(self, name) < 1:
+                raise ValueError(f"PipelineConfig.{name} must be at least 1, got {getattr(self, name)}")
+
+
+@dataclass
+class PipelineStats:
+    ocr_seconds: float = 0.0
+    parse_seconds: float = 0.0
+    ocr_wait_seconds: float = 0.0    # OCR blocked on a full parse queue
+    parse_idle_seconds: float = 0.0  # parsers waiting for OCR output
+    processed: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, name: str, value: float):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+
+class InvoicePipeline:
+    """
+    Staged batch pipeline:
+
+        files -> [OCR workers] -> parse queue -> [parse workers] -> result queue -> writer
+
+    - OCR workers load and OCR files (CPU-heavy)
+    - parse workers run the parser (I/O-bound for the LLM parser)
+    - the writer is the caller iterating over run()
+    Queues are bounded, so a slow stage applies backpressure upstream
+    instead of buffering the whole batch in memory.
+    """
+
+    def __init__(self, parser_name: str = "heuristic", config: PipelineConfig = None,
+        use_cache: bool = True):
+        self.parser_name = parser_name
+        self.config = config or PipelineConfig()
+        self.use_cache = use_cache
+        self.stats = PipelineStats()
+
+        self._stop = threading.Event()
+
+
+    def run(self, file_paths: List[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yields (index, record) pairs in completion order.
+        """
+        # Imported lazily: main imports this module
+        from .main import _build_record, _source_digest, parse_ocr_output
+
+        cfg = self.config
+        input_q: queue.Queue = queue.Queue(maxsize=cfg.queue_size)
+        parse_q: queue.Queue = queue.Queue(maxsize=cfg.queue_size)
+        result_q: queue.Queue = queue.Queue(maxsize=cfg.queue_size)
+
+        remaining = {"ocr": cfg.ocr_workers, "parse": cfg.parse_workers}
+        remaining_lock = threading.Lock()
+
+        def stage_finished(stage: str, downstream: queue.Queue, n_downstream: int):
+            # The last worker of a stage closes the next one
+            with remaining_lock:
+                remaining[stage] -= 1
+                last = remaining[stage] == 0
+            if last:
+                for _ in range(n_downstream):
+                    self._put(downstream, _DONE)
+
+        def feeder():
+            for item in enumerate(file_paths):
+                if not self._put(input_q, item):
+                    return
+            for _ in range(cfg.ocr_workers):
+                self._put(input_q, _DONE)
+
+        def ocr_worker():
+            try:
+                _ocr_loop()
+            finally:
+                stage_finished("ocr", parse_q, cfg.parse_workers)
+
+        def _ocr_loop():
+            while True:
+                item = self._get(input_q)
+                if item is _DONE or item is None:
+                    break
+                i, fp = item
+
+                start = time.perf_counter()
+                digest = None
+                try:
+                    digest = _source_digest(fp, self.use_cache)
+                    ocr_output = process_invoice(fp, use_cache=self.use_cache, digest=digest)
+                except Exception as e:
+                    logger.error(f"[Pipeline] OCR failed for {fp}: {e}", exc_info=True)
+                    ocr_output = e
+                self.stats.add("ocr_seconds", time.perf_counter() - start)
+
+                start = time.perf_counter()
+                if not self._put(parse_q, (i, fp, digest, ocr_output)):
+                    break
+                self.stats.add("ocr_wait_seconds", time.perf_counter() - start)
+
+        def parse_worker(parser: BaseParser):
+            try:
+                _parse_loop(parser)
+            finally:
+                stage_finished("parse", result_q, 1)
+
+        def _parse_loop(parser: BaseParser):
+            while True:
+                start = time.perf_counter()
+                item = self._get(parse_q)
+                self.stats.add("parse_idle_seconds", time.perf_counter() - start)
+                if item is _DONE or item is None:
+                    break
+                i, fp, digest, ocr_output = item
+
+                start = time.perf_counter()
+                if isinstance(ocr_output, Exception):
+                    parsed = {"error": str(ocr_output)}
+                else:
+                    try:
+                        parsed = parse_ocr_output(ocr_output, parser, fp)
+                    except Exception as e:
+                        logger.error(f"[Pipeline] Parser failed for {fp}: {e}", exc_info=True)
+                        parsed = {"error": str(e)}
+                self.stats.add("parse_seconds", time.perf_counter() - start)
+
+                parsed["sha256"] = digest
+                if not self._put(result_q, (i, _build_record(fp, self.parser_name, parsed))):
+                    break
+
+        # One parser per thread (LLM clients/chains aren't shared).
+        # Built up front so configuration errors surface before any work starts.
+        parsers = [ParserFactory.get_parser(self.parser_name) for _ in range(cfg.parse_workers)]
+
+        threads = [threading.Thread(target=feeder, name="pipeline-feeder", daemon=True)]
+        threads += [
+            threading.Thread(target=ocr_worker, name=f"pipeline-ocr-{n}", daemon=True)
+            for n in range(cfg.ocr_workers)
+        ]
+        threads += [
+            threading.Thread(target=parse_worker, args=(parser,), name=f"pipeline-parse-{n}", daemon=True)
+            for n, parser in enumerate(parsers)
+        ]
+
+        logger.info(
+            f"[Pipeline] Starting: {cfg.ocr_workers} OCR workers, "
+            f"{cfg.parse_workers} parse workers, queue size {cfg.queue_size}"
+        )
+        for t in threads:
+            t.start()
+
+        # Writer stage: the caller
+        try:
+            while True:
+                item = result_q.get()
+                if item is _DONE:
+                    break
+                self.stats.processed += 1
+                yield item
+        finally:
+            # Also reached when the caller stops iterating early
+            self._stop.set()
+            for t in threads:
+                t.join(timeout=_POLL_INTERVAL * 10)
+            logger.info(f"[Pipeline] Finished: {self.stats}")
+
+
+    # Queue helpers that give up once the pipeline is stopped
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return None
@@ -1,14 +1,98 @@
+import re
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
 import pandas as pd
 
 from src.models.models import InvoiceParseResult
 from src.services.parser.interface import BaseParser
 
+from .heuristic_text import (DATE_PATTERNS, DIGIT, NUMERIC_LINE,
+                             VENDOR_FORBIDDEN, VENDOR_ID_LINE,
+                             HeuristicTextParser, ScannedText)
+from .layout import Layout, build_layout, pair_values, text_mask
+from .line_items import table_line_items
+from .money import AMOUNT_LABEL, MONEY_TOKEN, normalize_money
+
+# Label segments; `rest` is whatever follows the label in the same segment
+# ("Invoice No: INV-7" -> "INV-7")
+_REST = r"[\s:#.]*+(?P<rest>.*)"
+ID_LABEL = re.compile(
+    r"(?P<label>\b(?:invoice|inv)\b(?![-/])\.?\s*+(?:no\b\.?|number|num|#|id\b)?|\bref(?:erence)?\b)" + _REST,
+    re.IGNORECASE,
+)
+DATE_LABEL = re.compile(
+    r"(?P<label>(?<!due )\b(?:invoice\s++|issue\s++)?date\b)" + _REST,
+    re.IGNORECASE,
+)
+VENDOR_LABEL = re.compile(
+    r"(?P<label>\b(?:seller|vendor|bill\s++from|from)\b)" + _REST,
+    re.IGNORECASE,
+)
+AMOUNT_LABELS = re.compile(AMOUNT_LABEL.pattern + _REST, re.IGNORECASE)
+
+# Segments that are a value and nothing else
+ID_VALUE = re.compile(r"[A-Z0-9][A-Z0-9\-/]{3,40}", re.IGNORECASE)
+AMOUNT_VALUE = re.compile(r"(?:[\$€£]|[A-Z]{3})?\s*+[0-9][0-9.,]*+(?:\s*+(?:[\$€£]|[A-Z]{3}))?")
+
+
+def _matches(pattern: re.Pattern, texts: np.ndarray) -> List[Optional[re.Match]]:
+    return [pattern.search(t) for t in texts]
+
+
+def _found(matches: List[Optional[re.Match]]) -> np.ndarray:
+    return np.fromiter((m is not None for m in matches), dtype=bool, count=len(matches))
+
+
+def _invoice_id(text: str) -> Optional[str]:
+    m = ID_VALUE.match(text)
+    return m.group() if m and DIGIT.search(m.group()) else None
+
+
+def _vendor(text: str) -> Optional[str]:
+    # Same rules as ScannedText.is_vendor_candidate
+    if NUMERIC_LINE.fullmatch(text) or VENDOR_ID_LINE.fullmatch(text) or VENDOR_FORBIDDEN.search(text):
+        return None
+    return text
+
+
+def _date(text: str) -> Optional[str]:
+    for p in DATE_PATTERNS:
+        m = p.search(text)
+        if m:
+            return m.group(0)
+    return None
+
+
+def _amount(text: str) -> Optional[float]:
+    # Last amount that isn't a rate: "Tax (10%) $2.00" -> 2.00
+    value = None
+    for m in MONEY_TOKEN.finditer(text):
+        if text.startswith("%", m.end()):
+            continue
+        normalized = normalize_money(m.group())
+        if normalized is not None:
+            value = normalized
+    return value
+
 
 class HeuristicTableParser(BaseParser):
     """
     Parses OCR table DataFrame (with bounding boxes).
+    Boxes are grouped into lines and segments (layout.build_layout); label
+    segments ("Invoice No", "Date", "Seller", "Subtotal", "Tax", "Total")
+    take the value in the same segment, else the value segment to their
+    right or below (layout.pair_values). Segment classification is
+    vectorized over the whole table. Fields without a spatial match come
+    from HeuristicTextParser over the layout's text.
     """
 
+    # Unlabelled vendor names are looked for in the first lines only
+    VENDOR_TOP_LINES = 20
+
+    def __init__(self):
+        self.text_parser = HeuristicTextParser()
+
     def parse(self, table_df: pd.DataFrame) -> InvoiceParseResult:
         if table_df is None or table_df.empty:
             return InvoiceParseResult(
@@ -16,18 +100,128 @@ class HeuristicTableParser(BaseParser):
                 raw_text_length=0
             )
 
-        # Placeholder logic
+        layout = build_layout(table_df)
+        text = layout.to_text()
+        if not text:
+            return InvoiceParseResult(
+                error="Empty OCR table",
+                raw_text_length=0
+            )
+
+        fields = self._spatial_fields(layout)
+
+        # Text heuristics (over the layout's text) only for what the layout
+        # didn't give
+        doc = ScannedText.scan(text)
+        tp = self.text_parser
+        if "total_amount" not in fields:
+            fields["total_amount"] = tp.extract_total_amount(doc)
+        total = fields["total_amount"]
+
+        parts = {"subtotal_amount": tp.extract_subtotal_amount, "tax_amount": tp.extract_tax_amount}
+        for name, extract in parts.items():
+            value = fields.get(name)
+            # A part can't exceed the whole
+            if value is not None and total is not None and value > total:
+                value = None
+            fields[name] = value if value is not None else extract(doc, total)
+
+        fallbacks = {
+            "invoice_id": tp.extract_invoice_id,
+            "vendor_name": tp.extract_vendor,
+            "invoice_date": tp.extract_invoice_date,
+        }
+        for name, extract in fallbacks.items():
+            if name not in fields:
+                fields[name] = extract(doc)
+
         return InvoiceParseResult(
             error=None,
-            invoice_id=None,
-            vendor_name=None,
-            invoice_date=None,
-            subtotal_amount=None,
-            tax_amount=None,
-            total_amount=None,
-            summary={
-                "num_cells": len(table_df),
-                "columns": list(table_df.columns),
-            },
-            raw_text_length=len(table_df)
+            line_items=table_line_items(layout),
+            summary=None,
+            raw_text_length=len(text),
+            **fields,
+        )
+
+
+    # Spatial key/value pairing
+    def _spatial_fields(self, layout: Layout) -> Dict[str, object]:
+        segments = layout.text
+        fields: Dict[str, object] = {}
+
+        date_values = np.zeros(len(segments), dtype=bool)
+        for p in DATE_PATTERNS:
+            date_values |= text_mask(p.search, segments)
+        dates = self._label_values(layout, _matches(DATE_LABEL, segments), date_values, _date)
+        if dates:
+            fields["invoice_date"] = dates[0]
+
+        id_values = text_mask(ID_VALUE.fullmatch, segments) & text_mask(DIGIT.search, segments) & ~date_values
+        ids = self._label_values(layout, _matches(ID_LABEL, segments), id_values, _invoice_id)
+        if ids:
+            fields["invoice_id"] = ids[0]
+
+        # One pass for all amount labels, split by kind
+        amount_labels = _matches(AMOUNT_LABELS, segments)
+        amount_values = text_mask(AMOUNT_VALUE.fullmatch, segments)
+        for kind in ("subtotal", "tax", "total"):
+            labelled = [m if m is not None and m.group(kind) else None for m in amount_labels]
+            values = self._label_values(layout, labelled, amount_values, _amount)
+            if values:
+                # Several total labels (Total, Amount Due, Grand Total): the
+                # largest, as in the text parser's summary block
+                fields[f"{kind}_amount"] = max(values) if kind == "total" else values[0]
+
+        # Vendor: labelled (Seller/Vendor/From), else the first plausible
+        # segment near the top that isn't a label, amount, date or ID
+        vendor_labels = _matches(VENDOR_LABEL, segments)
+        candidates = ~(
+            text_mask(NUMERIC_LINE.fullmatch, segments)
+            | text_mask(VENDOR_ID_LINE.fullmatch, segments)
+            | text_mask(VENDOR_FORBIDDEN.search, segments)
+            | amount_values | date_values | id_values
         )
+        candidates &= ~_found(vendor_labels)
+        candidates &= layout.line < self.VENDOR_TOP_LINES
+
+        vendors = self._label_values(layout, vendor_labels, candidates, _vendor)
+        if vendors:
+            fields["vendor_name"] = vendors[0]
+        elif candidates.any():
+            fields["vendor_name"] = segments[np.argmax(candidates)]
+
+        return fields
+
+    @staticmethod
+    def _label_values(
+        layout: Layout,
+        labelled: List[Optional[re.Match]],
+        value_mask: np.ndarray,
+        convert: Callable[[str], Optional[object]],
+    ) -> list:
+        """
+        Converted values for the label segments (a match in `labelled`), in
+        reading order: the rest of the label segment when it holds a value,
+        else the paired value segment.
+        """
+        label_mask = _found(labelled)
+        if not label_mask.any():
+            return []
+
+        labels = np.flatnonzero(label_mask)
+        rest = [labelled[i].group("rest") for i in labels]
+        inline = [convert(r) if r else None for r in rest]
+
+        # Pair only the labels without an inline value
+        unpaired = np.array([v is None for v in inline])
+        values = np.flatnonzero(value_mask & ~label_mask)
+        paired = np.full(len(labels), -1, dtype=np.int64)
+        paired[unpaired] = pair_values(layout, labels[unpaired], values)
+
+        out = []
+        for value, target in zip(inline, paired):
+            if value is None and target >= 0:
+                value = convert(layout.text[target])
+            if value is not None:
+                out.append(value)
+        return out
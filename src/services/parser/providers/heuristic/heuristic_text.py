@@ -1,9 +1,139 @@
+import logging
 import re
-from typing import Dict, Optional
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
+from src.config import get_settings
 from src.models.models import InvoiceParseResult
 from src.services.parser.interface import BaseParser
 
+from .line_items import text_line_items
+from .money import AmountToken, labelled_amount, lex_amounts, normalize_money
+
+logger = logging.getLogger(__name__)
+
+# Patterns (compiled once at import)
+# Every pattern runs in linear time: runs of separators are matched
+# possessively (*+) where the next token can't start with one, and no two
+# adjacent quantifiers can match the same characters. Vendor blocks are
+# not single patterns for the same reason (see VENDOR_BLOCKS).
+_ID_TOKEN = r"([A-Z0-9][A-Z0-9\-/]{3,40})"
+_MONTHS = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)"
+
+# "invoice" then an optional "no/number/#": the ID may also follow the
+# keyword directly when whitespace separates them ("Invoice   Number")
+_INVOICE_KEYWORD = r"(?:invoice|inv)(?:(?=\s)|\s*+(?:no\.?|number|num|#)?)"
+# Line break or colon(s) between label and value: "\s*[:\n]+\s*"
+_LABEL_BREAK = r"(?:\s*+:[:\n]*+|[^\S\n]*+\n)\s*+"
+
+INVOICE_ID_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        # Same line:ABC-123
+        rf"{_INVOICE_KEYWORD}[\s:]*+{_ID_TOKEN}",
+
+        # Multi-line:ABC-123
+        rf"{_INVOICE_KEYWORD}{_LABEL_BREAK}{_ID_TOKEN}",
+
+        # Same line Ref
+        rf"(?:ref|reference)[\s#:.]*+{_ID_TOKEN}",
+
+        # Multi-line Ref
+        rf"(?:ref|reference)(?:\s*+[#:.])*+[^\S\n]*+\n\s*+{_ID_TOKEN}",
+
+        # ID
+        rf"\bid[\s#:.]++{_ID_TOKEN}",
+        rf"\bid{_LABEL_BREAK}{_ID_TOKEN}",
+    )
+]
+INVOICE_LABEL = re.compile(r"invoice\s*+(number|no|#)?", re.IGNORECASE)
+DATE_LIKE = re.compile(rf"\b{_MONTHS}\b|\d{{1,2}}/\d{{1,2}}/\d{{4}}", re.IGNORECASE)
+DIGIT = re.compile(r"\d")
+MONEY_SIGN = re.compile(r"[$€£]")
+SHORT_NUMBER = re.compile(r"\d{1,3}")
+ID_LINE = re.compile(r"[A-Z0-9\-/]{3,40}")
+
+TOTAL_CLUSTER = re.compile(
+    r"((?:subtotal|total|amount\s*+due|grand\s*+total|balance|summary|TOTAL\s*+DUE).*)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+DATE_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r"\b\d{4}[-/]\d{2}[-/]\d{2}\b",
+        r"\b\d{1,2}[-/]\d{1,2}[-/]\d{4}\b",
+        rf"\b{_MONTHS}[a-z]*+\s++\d{{1,2}},?\s*+\d{{4}}\b",
+    )
+]
+
+# Vendor blocks: (label, block end). A block runs from the end of its
+# label and separators to the first block end after it (or the end of the
+# text); the end is found by a separate forward search, so a block is
+# scanned once instead of through a lazy DOTALL capture.
+_BLOCK_END = r"Client:|Tax|IBAN|Items|\n\n"
+VENDOR_BLOCKS = [
+    (re.compile(label, re.IGNORECASE), re.compile(end, re.IGNORECASE)) for label, end in (
+        (r"Seller:[\s:]*+", _BLOCK_END),
+        (r"Vendor:[\s:]*+", _BLOCK_END),
+        (r"From:[\s:]*+", _BLOCK_END),
+        (r"Client:[\s:]*+", r"Tax|IBAN|Items|\n\n"),
+        # BILL FROM / FROM
+        (r"BILL FROM[\s:]*+", rf"BILL TO|{_BLOCK_END}"),
+        (r"FROM[\s:]*+", _BLOCK_END),
+    )
+]
+NUMERIC_LINE = re.compile(r"\d+")
+VENDOR_ID_LINE = re.compile(r"[A-Z0-9\-]{4,30}")
+# Any of these in a line rules it out as a vendor name
+VENDOR_FORBIDDEN = re.compile(
+    r"invoice|date|total|amount|due|balance|id|ref|item|qty|net|vat|bill\s*to|bill\s*from",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class ScannedText:
+    """
+    A document split once into the line structures every field extractor
+    reads, plus per-line verdicts shared between extractors.
+    """
+    text: str
+    lines: List[str]           # every line, stripped
+    content_lines: List[str]   # non-empty lines, stripped
+    label_lines: List[int]     # indexes (into lines) of "invoice ..." labels
+    _vendor_verdicts: Dict[str, bool] = field(default_factory=dict, repr=False)
+    _amounts: Optional[List[AmountToken]] = field(default=None, repr=False)
+
+    @classmethod
+    def scan(cls, text: str) -> "ScannedText":
+        lines, content_lines, label_lines = [], [], []
+        for i, raw_line in enumerate(text.splitlines()):
+            line = raw_line.strip()
+            lines.append(line)
+            if line:
+                content_lines.append(line)
+                if INVOICE_LABEL.search(line):
+                    label_lines.append(i)
+        return cls(text, lines, content_lines, label_lines)
+
+    @property
+    def amounts(self) -> List[AmountToken]:
+        # Lexed on first use, then shared by total/subtotal/tax
+        if self._amounts is None:
+            self._amounts = lex_amounts(self.text)
+        return self._amounts
+
+    def is_vendor_candidate(self, line: str) -> bool:
+        verdict = self._vendor_verdicts.get(line)
+        if verdict is None:
+            verdict = not (
+                NUMERIC_LINE.fullmatch(line)
+                or VENDOR_ID_LINE.fullmatch(line)
+                or VENDOR_FORBIDDEN.search(line)
+            )
+            self._vendor_verdicts[line] = verdict
+        return verdict
+
 
 class HeuristicTextParser(BaseParser):
     """
@@ -12,10 +142,25 @@ class HeuristicTextParser(BaseParser):
     - Total amount
     - Vendor block extraction
     - Date
+    - Subtotal and tax
+    - Line items (columnar, see line_items)
+    The text is scanned once (ScannedText) and shared by all extractors;
+    each extractor also accepts a plain string.
+    Parse time is linear in the text length, and bounded per document by
+    HeuristicParserSettings (max_chars, time_budget_ms).
     """
 
     MIN_AMOUNT = 5
 
+    # Share of a truncated text kept from the top (header fields); the rest
+    # comes from the bottom (totals)
+    HEAD_SHARE = 0.75
+
+    def __init__(self):
+        settings = get_settings()
+        self.max_chars = settings.heuristic.max_chars
+        self.time_budget_ms = settings.heuristic.time_budget_ms
+
     # Main Parse
     def parse(self, raw_text: str) -> InvoiceParseResult:
 
@@ -25,52 +170,84 @@ class HeuristicTextParser(BaseParser):
                 raw_text_length=0,
             )
 
+        # CPU time of this thread: parses running on other threads, or a
+        # loaded machine, don't eat into the budget
+        deadline = time.thread_time() + self.time_budget_ms / 1000
+        doc = ScannedText.scan(self._truncate(raw_text))
+
+        # Cheapest and most useful first; whatever is left when the budget
+        # runs out stays empty
+        fields = {}
+        steps = (
+            ("invoice_id", lambda: self.extract_invoice_id(doc)),
+            ("total_amount", lambda: self.extract_total_amount(doc)),
+            ("invoice_date", lambda: self.extract_invoice_date(doc)),
+            ("vendor_name", lambda: self.extract_vendor(doc)),
+            ("subtotal_amount", lambda: self.extract_subtotal_amount(doc, fields["total_amount"])),
+            ("tax_amount", lambda: self.extract_tax_amount(doc, fields["total_amount"])),
+            ("line_items", lambda: text_line_items(doc.lines)),
+        )
+        for name, extract in steps:
+            if time.thread_time() > deadline:
+                logger.warning(
+                    f"[HeuristicTextParser] CPU time budget ({self.time_budget_ms:.0f}ms) exceeded "
+                    f"on {len(raw_text)} characters, skipped: "
+                    f"{', '.join(n for n, _ in steps if n not in fields)}"
+                )
+                break
+            fields[name] = extract()
 
         return InvoiceParseResult(
             error=None,
-            invoice_id=self.extract_invoice_id(raw_text),
-            vendor_name=self.extract_vendor(raw_text),
-            invoice_date=self.extract_invoice_date(raw_text),
-            subtotal_amount=None,
-            tax_amount=None,
-            total_amount=self.extract_total_amount(raw_text),
             summary=None,
             raw_text_length=len(raw_text),
+            **fields,
+        )
+
+    def _truncate(self, text: str) -> str:
+        """
+        Texts over max_chars keep their first and last lines, up to
+        max_chars in total.
+        """
+        if len(text) <= self.max_chars:
+            return text
+
+        head_chars = int(self.max_chars * self.HEAD_SHARE)
+        tail_chars = self.max_chars - head_chars
+
+        # Cut at line breaks when there are any
+        head_end = text.rfind("\n", 0, head_chars)
+        tail_start = text.find("\n", len(text) - tail_chars)
+        head = text[:head_end] if head_end > 0 else text[:head_chars]
+        tail = text[tail_start + 1:] if tail_start >= 0 else text[-tail_chars:]
+
+        logger.warning(
+            f"[HeuristicTextParser] Text truncated from {len(text)} to "
+            f"{len(head) + len(tail)} characters"
         )
+        return f"{head}\n{tail}"
+
+    @staticmethod
+    def _doc(text) -> ScannedText:
+        return text if isinstance(text, ScannedText) else ScannedText.scan(text)
 
 
 
     # Invoice ID
-    def extract_invoice_id(self, text: str) -> Optional[str]:
+    def extract_invoice_id(self, text) -> Optional[str]:
         """
         Avoid false positives like "Invoice" -> "oice".
         Extracts IDs following: Invoice No:, Invoice #, INV:, Ref:, ID:
         """
+        doc = self._doc(text)
+
         forbidden = {
             "invoice", "invoice number", "invoice no", "inv",
             "number", "no", "id"
         }
 
-        patterns = [
-            # Same line:ABC-123
-            r"(?:invoice|inv)[\s]*?(?:no\.?|number|num|#)?[\s:]*([A-Z0-9][A-Z0-9\-/]{3,40})",
-
-            # Multi-line:ABC-123
-            r"(?:invoice|inv)[\s]*?(?:no\.?|number|num|#)?\s*[:\n]+\s*([A-Z0-9][A-Z0-9\-/]{3,40})",
-
-            # Same line Ref
-            r"(?:ref|reference)[\s#:.]*([A-Z0-9][A-Z0-9\-/]{3,40})",
-
-            # Multi-line Ref
-            r"(?:ref|reference)[\s#:.]*\n\s*([A-Z0-9][A-Z0-9\-/]{3,40})",
-
-            # ID
-            r"\bid[\s#:.]+([A-Z0-9][A-Z0-9\-/]{3,40})",
-            r"\bid\s*[:\n]+\s*([A-Z0-9][A-Z0-9\-/]{3,40})",
-        ]
-
-        for p in patterns:
-            m = re.search(p, text, flags=re.IGNORECASE)
+        for p in INVOICE_ID_PATTERNS:
+            m = p.search(doc.text)
             if m:
                 candidate = m.group(1).strip()
 
@@ -83,195 +260,111 @@ class HeuristicTextParser(BaseParser):
                     continue
 
                 # Must contain at least one digit to be an invoice number
-                if not re.search(r"\d", candidate):
+                if not DIGIT.search(candidate):
                     continue
 
                 return candidate
 
         # Detect stand-alone invoice numbers on the next line after a label
-        lines = [ln.strip() for ln in text.splitlines()]
-
-        for i, line in enumerate(lines):
-            if re.search(r"invoice\s*(number|no|#)?", line, re.IGNORECASE):
-                # search forward only a few lines (avoid totals, items)
-                for j in range(i+1, min(i+5, len(lines))):
-                    candidate = lines[j]
-                    # skip empty
-                    if not candidate:
-                        continue
-                    # skip dates
-                    if re.search(r"\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\b|\d{1,2}/\d{1,2}/\d{4}", candidate, re.IGNORECASE):
-                        continue
-                    # must contain a digit
-                    if not re.search(r"\d", candidate):
-                        continue
-                    # skip money
-                    if re.search(r"[$€£]", candidate):
-                        continue
-                    # avoid pure 2–3 digit numbers (likely item IDs)
-                    if re.fullmatch(r"\d{1,3}", candidate):
-                        continue
-                    # allow typical invoice ID patterns
-                    if re.fullmatch(r"[A-Z0-9\-/]{3,40}", candidate):
-                        return candidate
+        lines = doc.lines
+
+        for i in doc.label_lines:
+            # search forward only a few lines (avoid totals, items)
+            for j in range(i+1, min(i+5, len(lines))):
+                candidate = lines[j]
+                # skip empty
+                if not candidate:
+                    continue
+                # skip dates
+                if DATE_LIKE.search(candidate):
+                    continue
+                # must contain a digit
+                if not DIGIT.search(candidate):
+                    continue
+                # skip money
+                if MONEY_SIGN.search(candidate):
+                    continue
+                # avoid pure 2–3 digit numbers (likely item IDs)
+                if SHORT_NUMBER.fullmatch(candidate):
+                    continue
+                # allow typical invoice ID patterns
+                if ID_LINE.fullmatch(candidate):
+                    return candidate
 
         return None
 
 
 
-    # Total Amount
-    def extract_total_amount(self, text: str) -> Optional[float]:
+    # Amounts
+    def extract_total_amount(self, text) -> Optional[float]:
         """
         Extract the single grand total amount by capturing the entire numerical summary block
         (Subtotal, Tax, Shipping, Grand Total) and returning the maximum valid amount found.
         """
-        amounts: List[float] = []
-
-        # Keywords to anchor the start of the total section (Subtotal is often the first)
-        keywords = r"(?:subtotal|total|amount\s*due|grand\s*total|balance|summary|TOTAL\s*DUE)"
-
-        # Find the first relevant keyword and capture everything that follows
-        total_cluster_pattern = rf"({keywords}.*)"
+        doc = self._doc(text)
 
-        # Find the entire rest of the document after the first keyword
-        match = re.search(total_cluster_pattern, text, re.IGNORECASE | re.DOTALL)
-
-        if match:
-            # group 1 contains the raw text of the entire summary block
-            summary_block = match.group(1)
-
-            # Extract and Normalize: Find all money-like numbers within the captured block
-            numbers = re.findall(r"[\$€£]?\s*[0-9][0-9.,]*", summary_block)
-
-            for raw in numbers:
-                normalized = self._normalize_money(raw)
+        # The summary block starts at the first relevant keyword (Subtotal is
+        # often the first) and runs to the end of the document
+        match = TOTAL_CLUSTER.search(doc.text)
+        if not match:
+            return None
 
-                if normalized is not None:
-                    amounts.append(normalized)
+        start = match.start(1)
+        amounts = [t.value for t in doc.amounts if t.start >= start and t.value is not None]
 
         # Return the largest amount found
-        if amounts:
-            return max(amounts)
+        return max(amounts) if amounts else None
 
-        return None
+    def extract_subtotal_amount(self, text, total: Optional[float] = None) -> Optional[float]:
+        return self._labelled(text, "subtotal", total)
 
-    def _normalize_money(self, raw: str) -> Optional[float]:
-        """
-        Normalize money strings into float, applying cleanup, conversion, and rejection logic.
-        """
-        # Remove all characters that are NOT a digit, comma, or period.
-        cleaned = re.sub(r"[^\d,\.]", "", raw)
+    def extract_tax_amount(self, text, total: Optional[float] = None) -> Optional[float]:
+        return self._labelled(text, "tax", total)
 
-        # Reject if three or more commas or periods are used
-        if cleaned.count(",") >= 3 or cleaned.count(".") >= 3:
+    def _labelled(self, text, label: str, total: Optional[float]) -> Optional[float]:
+        value = labelled_amount(self._doc(text).amounts, label)
+        # A part can't exceed the whole
+        if value is not None and total is not None and value > total:
             return None
+        return value
 
-        # Reject ambiguous US/EU mix: multiple commas/periods
-        if cleaned.count(",") >= 1 and cleaned.count(".") > 1:
-            if cleaned.rfind('.') > cleaned.rfind(','):
-                return None
-
-
-        # European Thousands Conversion: "1.234.567,89" -> "1234567.89"
-        if cleaned.count(".") > 1 and cleaned.count(",") == 1:
-            # Ensure comma appears AFTER the rightmost period
-            if cleaned.rfind(',') > cleaned.rfind('.'):
-                cleaned = cleaned.replace(".", "").replace(",", ".")
-
-        # US Thousands Removal: "1,234.56" -> "1234.56"
-        if cleaned.count(",") > 1:
-            cleaned = cleaned.replace(",", "")
-
-        # Only if there is exactly one comma and no periods: "194,82" -> "194.82"
-        if cleaned.count(",") == 1 and cleaned.count(".") == 0:
-            cleaned = cleaned.replace(",", ".")
-
-        # Cast to Float
-        try:
-            return float(cleaned)
-        except ValueError:
-            return None
+    def _normalize_money(self, raw: str) -> Optional[float]:
+        return normalize_money(raw)
 
     # Invoice Date
-    def extract_invoice_date(self, text: str) -> Optional[str]:
-        patterns = [
-            r"\b\d{4}[-/]\d{2}[-/]\d{2}\b",
-            r"\b\d{1,2}[-/]\d{1,2}[-/]\d{4}\b",
-            r"\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s*\d{4}\b",
-        ]
-        for p in patterns:
-            m = re.search(p, text, flags=re.IGNORECASE)
+    def extract_invoice_date(self, text) -> Optional[str]:
+        text = text.text if isinstance(text, ScannedText) else text
+        for p in DATE_PATTERNS:
+            m = p.search(text)
             if m:
                 return m.group(0)
         return None
 
 
     # Vendor Extraction
-    def extract_vendor(self, text: str) -> Optional[str]:
+    def extract_vendor(self, text) -> Optional[str]:
         """
         Extracts the vendor name from invoice text.
+        Labelled blocks first (Seller/Vendor/From/Client, then BILL FROM/FROM),
+        then the first plausible line near the top.
         """
+        doc = self._doc(text)
 
-        forbidden_keywords = [
-            r"invoice", r"date", r"total", r"amount", r"due", r"balance",
-            r"id", r"ref", r"item", r"qty", r"net", r"vat",
-            r"bill\s*to", r"bill\s*from"
-        ]
-
-        block_patterns = [
-            r"Seller:\s*(.*?)(?:Client:|Tax|IBAN|Items|ITEMS|\n\n|$)",
-            r"Vendor:\s*(.*?)(?:Client:|Tax|IBAN|Items|ITEMS|\n\n|$)",
-            r"From:\s*(.*?)(?:Client:|Tax|IBAN|Items|ITEMS|\n\n|$)",
-            r"Client:\s*(.*?)(?:Tax|IBAN|Items|ITEMS|\n\n|$)",
-        ]
-
-        for p in block_patterns:
-            m = re.search(p, text, flags=re.IGNORECASE | re.DOTALL)
-            if m:
-                block = m.group(1)
-                lines = [l.strip() for l in block.splitlines() if l.strip()]
-                for line in lines:
-                    # Skip numeric-only lines
-                    if re.fullmatch(r"\d+", line):
-                        continue
-                    # Skip invoice ID patterns
-                    if re.fullmatch(r"[A-Z0-9\-]{4,30}", line):
-                        continue
-
-                    if any(re.search(k, line, re.I) for k in forbidden_keywords):
-                        continue
-                    return line
-
-        # Check for BILL FROM / FROM patterns
-        bill_patterns = [
-            r"BILL FROM\s*[:\n]*\s*(.*?)(?:BILL TO|Client:|Tax|IBAN|Items|ITEMS|\n\n|$)",
-            r"FROM\s*[:\n]*\s*(.*?)(?:Client:|Tax|IBAN|Items|ITEMS|\n\n|$)",
-        ]
-
-        for p in bill_patterns:
-            m = re.search(p, text, flags=re.IGNORECASE | re.DOTALL)
+        for label, block_end in VENDOR_BLOCKS:
+            m = label.search(doc.text)
             if m:
-                block = m.group(1)
-                lines = [l.strip() for l in block.splitlines() if l.strip()]
-                for line in lines:
-                    if re.fullmatch(r"\d+", line):
-                        continue
-                    if re.fullmatch(r"[A-Z0-9\-]{4,30}", line):
-                        continue
-                    if any(re.search(k, line, re.I) for k in forbidden_keywords):
-                        continue
-                    return line
+                end = block_end.search(doc.text, m.end())
+                block = doc.text[m.end():end.start() if end else len(doc.text)]
+                for line in block.splitlines():
+                    line = line.strip()
+                    if line and doc.is_vendor_candidate(line):
+                        return line
 
         # Fallback: scan first 20 lines
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        lines = doc.content_lines
         for line in lines[:20]:
-            if re.fullmatch(r"\d+", line):
-                continue
-            if re.fullmatch(r"[A-Z0-9\-]{4,30}", line):
-                continue
-            if any(re.search(k, line, re.I) for k in forbidden_keywords):
-                continue
-            return line
+            if doc.is_vendor_candidate(line):
+                return line
 
 
         return lines[0] if lines else None
@@ -0,0 +1,151 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# A word belongs to a line when the middle half of its box overlaps the line's
+LINE_CORE = 0.25
+# Words on a line closer than this many box heights form one segment
+SEGMENT_GAP = 1.0
+# A value below its label starts within this many label heights
+BELOW_MAX_LINES = 2.0
+
+
+@dataclass
+class Layout:
+    """
+    OCR boxes grouped into lines and segments (runs of words on a line,
+    e.g. "Invoice No:" or "$1,250.00"). All arrays are per segment, in
+    reading order: top to bottom, then left to right.
+    """
+    text: np.ndarray      # object, segment text
+    x_min: np.ndarray
+    y_min: np.ndarray
+    x_max: np.ndarray
+    y_max: np.ndarray
+    line: np.ndarray      # line index, 0 = top line
+    words: int            # boxes the layout was built from
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @property
+    def height(self) -> np.ndarray:
+        return self.y_max - self.y_min
+
+    def lines(self) -> List[str]:
+        """Text of each line, segments separated by a space."""
+        if not len(self):
+            return []
+        starts = np.flatnonzero(np.r_[True, self.line[1:] != self.line[:-1]])
+        return [" ".join(segments) for segments in np.split(self.text, starts[1:])]
+
+    def to_text(self) -> str:
+        return "\n".join(self.lines())
+
+
+def build_layout(table_df: pd.DataFrame) -> Layout:
+    """
+    Groups a box DataFrame (text, x_min, y_min, x_max, y_max) into lines and
+    segments with sorted sweeps, without per-box Python loops:
+    - lines: boxes sorted by the top of their vertical core; a new line
+      starts where a core begins below every core seen so far
+    - segments: boxes of a line sorted by x; a new segment starts at a
+      horizontal gap wider than SEGMENT_GAP box heights
+    """
+    # Missing texts (NaN/None from OCR) become empty and are dropped; astype
+    # alone would keep NaN as a float under pandas 3
+    text = table_df["text"].fillna("").astype(str).str.strip().to_numpy(dtype=object)
+    keep = text != ""
+    text = text[keep]
+    x0, y0, x1, y1 = (
+        table_df[c].to_numpy(dtype=np.float64)[keep] for c in ("x_min", "y_min", "x_max", "y_max")
+    )
+
+    n = len(text)
+    if n == 0:
+        empty = np.empty(0)
+        return Layout(text[:0], empty, empty, empty, empty, np.empty(0, dtype=np.int64), 0)
+
+    # Lines: merge overlapping vertical cores
+    height = np.maximum(y1 - y0, 1e-6)
+    center = (y0 + y1) / 2
+    core_top, core_bottom = center - height * LINE_CORE, center + height * LINE_CORE
+
+    order = np.argsort(core_top, kind="stable")
+    new_line = np.empty(n, dtype=bool)
+    new_line[0] = True
+    new_line[1:] = core_top[order][1:] > np.maximum.accumulate(core_bottom[order])[:-1]
+    line = np.empty(n, dtype=np.int64)
+    line[order] = np.cumsum(new_line) - 1
+
+    # Reading order, then segments
+    order = np.lexsort((x0, line))
+    text, x0, y0, x1, y1 = text[order], x0[order], y0[order], x1[order], y1[order]
+    line, height = line[order], height[order]
+
+    new_segment = np.empty(n, dtype=bool)
+    new_segment[0] = True
+    new_segment[1:] = (line[1:] != line[:-1]) | (
+        x0[1:] - x1[:-1] > SEGMENT_GAP * np.maximum(height[1:], height[:-1])
+    )
+    starts = np.flatnonzero(new_segment)
+
+    if len(starts) == n:
+        segment_text = text
+    else:
+        segment_text = np.array(
+            [" ".join(words) for words in np.split(text, starts[1:])], dtype=object
+        )
+
+    return Layout(
+        text=segment_text,
+        x_min=np.minimum.reduceat(x0, starts),
+        y_min=np.minimum.reduceat(y0, starts),
+        x_max=np.maximum.reduceat(x1, starts),
+        y_max=np.maximum.reduceat(y1, starts),
+        line=line[starts],
+        words=n,
+    )
+
+
+def pair_values(layout: Layout, labels: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    For each label segment, the value segment it points to: the nearest one
+    to its right on the same line, else the nearest one below that overlaps
+    it horizontally (within BELOW_MAX_LINES label heights).
+    `labels` and `values` are segment indexes; returns a segment index per
+    label, -1 if there is none.
+    """
+    if not len(labels) or not len(values):
+        return np.full(len(labels), -1, dtype=np.int64)
+
+    # (labels x values) matrices
+    l_x0, l_x1 = layout.x_min[labels, None], layout.x_max[labels, None]
+    l_y1, l_h = layout.y_max[labels, None], layout.height[labels, None]
+    l_line = layout.line[labels, None]
+    v_x0, v_x1, v_y0 = layout.x_min[values], layout.x_max[values], layout.y_min[values]
+    v_line = layout.line[values]
+
+    right = (v_line == l_line) & (v_x0 >= l_x1 - l_h / 2)
+    right_dist = np.where(right, v_x0 - l_x1, np.inf)
+
+    gap = v_y0 - l_y1
+    below = (v_line > l_line) & (v_x0 < l_x1) & (v_x1 > l_x0) & (gap < BELOW_MAX_LINES * l_h)
+    below_dist = np.where(below, gap, np.inf)
+
+    best_right = right_dist.argmin(axis=1)
+    best_below = below_dist.argmin(axis=1)
+    rows = np.arange(len(labels))
+
+    return np.where(
+        np.isfinite(right_dist[rows, best_right]), values[best_right],
+        np.where(np.isfinite(below_dist[rows, best_below]), values[best_below], -1),
+    )
+
+
+def text_mask(match: Callable[[str], Optional[re.Match]], texts) -> np.ndarray:
+    """Boolean mask of the texts `match` (a pattern's search/fullmatch) accepts."""
+    return np.fromiter((match(t) is not None for t in texts), dtype=bool, count=len(texts))
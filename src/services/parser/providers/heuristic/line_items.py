@@ -0,0 +1,255 @@
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .layout import Layout, text_mask
+from .money import AMOUNT_LABEL, normalize_money
+
+# Item table header cells, by column role (the leading lookaheads let the
+# regex engine skip to candidate letters)
+ITEM_COLUMNS = ("description", "quantity", "unit_price", "amount")
+HEADER_PATTERNS = {
+    "description": re.compile(r"(?=[dipsDIPS])\b(?:description|items?|products?|services?|details?)\b", re.IGNORECASE),
+    "quantity": re.compile(r"(?=[quhQUH])\b(?:qty|quantity|units|hours|hrs)\b", re.IGNORECASE),
+    "unit_price": re.compile(r"(?=[uprUPR])\b(?:unit\s*+price|unit\s*+cost|price|rate)\b", re.IGNORECASE),
+    "amount": re.compile(r"(?=[altnALTN])\b(?:amount|line\s*+total|total|net)\b", re.IGNORECASE),
+}
+# A header names at least this many roles
+MIN_HEADER_ROLES = 2
+
+# A cell or token holding a number and nothing else ("$10.00", "2", "€ 1.234,50")
+NUMBER = re.compile(r"[\$€£]?\s*+[0-9][0-9.,]*+")
+
+# Without a header: at least this many item-like lines right above the totals
+MIN_ITEMS_WITHOUT_HEADER = 2
+
+
+def _number(text: str) -> float:
+    value = normalize_money(text) if NUMBER.fullmatch(text) else None
+    return np.nan if value is None else value
+
+
+def _columns(description: List[str], numbers: np.ndarray, roles: Dict[str, int]) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Packs items into the columnar output: one array per ITEM_COLUMNS entry,
+    NaN where a number is missing.
+    """
+    if not description:
+        return None
+    items = {"description": np.array(description, dtype=object)}
+    for role in ITEM_COLUMNS[1:]:
+        col = roles.get(role)
+        items[role] = numbers[:, col].astype(np.float64) if col is not None else np.full(len(description), np.nan)
+    return items
+
+
+def _numeric_roles(numbers: np.ndarray) -> Dict[str, int]:
+    """
+    Roles of numeric columns from the right: amount, then unit price, then
+    quantity; with two columns an integer-only left one is the quantity.
+    """
+    filled = ~np.isnan(numbers)
+    numeric = np.flatnonzero(filled.sum(axis=0) * 2 >= len(numbers))[::-1]
+    roles: Dict[str, int] = {}
+    if len(numeric) >= 1:
+        roles["amount"] = int(numeric[0])
+    if len(numeric) >= 3:
+        roles["unit_price"], roles["quantity"] = int(numeric[1]), int(numeric[2])
+    elif len(numeric) == 2:
+        left = numbers[filled[:, numeric[1]], numeric[1]]
+        roles["quantity" if np.all(left == np.round(left)) else "unit_price"] = int(numeric[1])
+    return roles
+
+
+def _header_line(role_hits: np.ndarray, line: np.ndarray, n_lines: int) -> int:
+    """First line naming MIN_HEADER_ROLES roles, -1 if none; role_hits is (roles x segments)."""
+    named = np.zeros((len(role_hits), n_lines), dtype=bool)
+    for r, hits in enumerate(role_hits):
+        named[r, line[hits]] = True
+    headers = np.flatnonzero(named.sum(axis=0) >= MIN_HEADER_ROLES)
+    return int(headers[0]) if len(headers) else -1
+
+
+def _summary_line(line_has_label: np.ndarray, after: int) -> int:
+    """First line after `after` with a subtotal/tax/total label, else the line count."""
+    below = np.flatnonzero(line_has_label[after + 1:])
+    return after + 1 + int(below[0]) if len(below) else len(line_has_label)
+
+
+def _run_above(item_like: np.ndarray, end: int) -> int:
+    """Start of the run of item-like lines ending right above `end`."""
+    breaks = np.flatnonzero(~item_like[:end])
+    return int(breaks[-1]) + 1 if len(breaks) else 0
+
+
+# Table mode
+def column_bounds(x_min: np.ndarray, x_max: np.ndarray, resolution: float) -> np.ndarray:
+    """
+    Column boundaries from an x-coverage histogram: bins no box covers
+    are gaps, and each gap between covered bins splits two columns at its
+    center. Returns the sorted x positions of the splits.
+    """
+    origin = x_min.min()
+    start = ((x_min - origin) / resolution).astype(np.int64)
+    stop = np.maximum(np.ceil((x_max - origin) / resolution).astype(np.int64), start + 1)
+    bins = int(stop.max())
+
+    # Coverage by difference array: +1 where a box starts, -1 past its end
+    diff = np.zeros(bins + 1, dtype=np.int64)
+    np.add.at(diff, start, 1)
+    np.add.at(diff, stop, -1)
+    empty = np.cumsum(diff)[:bins] == 0
+
+    # Runs of empty bins (edges are always covered)
+    edges = np.flatnonzero(np.diff(empty.astype(np.int8)))
+    gap_starts, gap_stops = edges[0::2] + 1, edges[1::2] + 1
+    return origin + (gap_starts + gap_stops) / 2 * resolution
+
+
+def table_line_items(layout: Layout) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Line items from a box layout, as columns (see ITEM_COLUMNS).
+    The items region runs from the header line (or, without one, the run of
+    lines ending in an amount right above the totals) to the first
+    subtotal/tax/total label. Columns are split at x gaps shared by every
+    line of the region; lines without numbers continue the description
+    of the item above.
+    """
+    if not len(layout):
+        return None
+
+    n_lines = int(layout.line[-1]) + 1
+    role_hits = np.stack([text_mask(p.search, layout.text) for p in HEADER_PATTERNS.values()])
+    header = _header_line(role_hits, layout.line, n_lines)
+
+    line_has_label = np.zeros(n_lines, dtype=bool)
+    line_has_label[layout.line[text_mask(AMOUNT_LABEL.search, layout.text)]] = True
+    numeric = text_mask(NUMBER.fullmatch, layout.text)
+
+    if header >= 0:
+        start, end = header + 1, _summary_line(line_has_label, header)
+    else:
+        # Item-like: text first, a number last
+        first = np.r_[True, layout.line[1:] != layout.line[:-1]]
+        last = np.r_[layout.line[1:] != layout.line[:-1], True]
+        item_like = np.zeros(n_lines, dtype=bool)
+        item_like[layout.line[last & numeric]] = True
+        item_like[layout.line[first & numeric]] = False
+        end = _summary_line(line_has_label, -1)
+        start = _run_above(item_like, end)
+        if end - start < MIN_ITEMS_WITHOUT_HEADER:
+            return None
+
+    region = (layout.line >= start) & (layout.line < end)
+    if not region.any():
+        return None
+
+    # Columns: the header takes part so its cells line up with the values
+    columns = region | (layout.line == header)
+    resolution = max(float(np.median(layout.height[columns])) / 2, 1.0)
+    bounds = column_bounds(layout.x_min[columns], layout.x_max[columns], resolution)
+    col = np.searchsorted(bounds, (layout.x_min + layout.x_max) / 2)
+
+    # Cell grid (rows = region lines); segments sharing a cell are joined
+    rows, cols = end - start, len(bounds) + 1
+    row = layout.line[region] - start
+    cells = np.full((rows, cols), "", dtype=object)
+    np.add.at(cells, (row, col[region]), layout.text[region] + " ")
+    cells = np.char.strip(cells.astype(str))
+    numbers = np.vectorize(_number, otypes=[np.float64])(cells)
+
+    roles = _numeric_roles(numbers)
+    if header >= 0:
+        # Header cells override the inferred roles
+        for r, name in enumerate(HEADER_PATTERNS):
+            hits = np.flatnonzero(role_hits[r] & (layout.line == header))
+            if len(hits) and name != "description":
+                roles[name] = int(col[hits[0]])
+    if "amount" not in roles:
+        return None
+
+    # Items: rows with an amount; rows without any number continue the
+    # description above
+    text_cols = [c for c in range(cols) if c not in roles.values()]
+    description = np.array([" ".join(filter(None, r)) for r in cells[:, text_cols]], dtype=object)
+    has_amount = ~np.isnan(numbers[:, roles["amount"]])
+    continuation = ~has_amount & np.isnan(numbers).all(axis=1) & (description != "")
+
+    item = np.cumsum(has_amount) - 1
+    for r in np.flatnonzero(continuation & (item >= 0)):
+        target = np.flatnonzero(has_amount)[item[r]]
+        description[target] = f"{description[target]} {description[r]}".strip()
+
+    return _columns(list(description[has_amount]), numbers[has_amount], roles)
+
+
+# Text mode
+def _split_numbers(line: str) -> tuple:
+    """
+    "Widget 2 $10.00 $20.00" -> ("Widget", [2.0, 10.0, 20.0]): up to three
+    trailing numbers and the text before them.
+    """
+    tokens = line.split()
+    numbers: List[float] = []
+    while tokens and len(numbers) < 3:
+        token = tokens[-1]
+        if token in ("$", "€", "£"):
+            tokens.pop()
+            continue
+        value = normalize_money(token) if NUMBER.fullmatch(token) else None
+        if value is None:
+            break
+        numbers.append(value)
+        tokens.pop()
+    return " ".join(tokens), numbers[::-1]
+
+
+def text_line_items(lines: List[str]) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Line items from OCR text lines, as columns (see ITEM_COLUMNS). Same
+    region rules as table_line_items; each item line ends in one to three
+    numbers: amount / quantity or unit price, amount / quantity, unit price,
+    amount.
+    """
+    if not lines:
+        return None
+
+    role_hits = np.stack([text_mask(p.search, lines) for p in HEADER_PATTERNS.values()])
+    headers = np.flatnonzero(role_hits.sum(axis=0) >= MIN_HEADER_ROLES)
+    header = int(headers[0]) if len(headers) else -1
+    line_has_label = text_mask(AMOUNT_LABEL.search, lines)
+
+    if header >= 0:
+        start, end = header + 1, _summary_line(line_has_label, header)
+        split = [_split_numbers(line) for line in lines[start:end]]
+    else:
+        end = _summary_line(line_has_label, -1)
+        split_all = [_split_numbers(line) for line in lines[:end]]
+        item_like = np.array([bool(text and numbers) for text, numbers in split_all], dtype=bool)
+        start = _run_above(item_like, end)
+        if end - start < MIN_ITEMS_WITHOUT_HEADER:
+            return None
+        split = split_all[start:]
+
+    description: List[str] = []
+    rows: List[List[float]] = []
+    for text, numbers in split:
+        if numbers:
+            description.append(text)
+            rows.append([np.nan] * (3 - len(numbers)) + numbers)
+        elif text and description:
+            description[-1] = f"{description[-1]} {text}"
+
+    if not rows:
+        return None
+
+    numbers = np.array(rows, dtype=np.float64)
+    roles = {"quantity": 0, "unit_price": 1, "amount": 2}
+    # Two numbers: the left one is a quantity if integer, else a unit price
+    pairs = np.isnan(numbers[:, 0]) & ~np.isnan(numbers[:, 1])
+    price_like = pairs & (numbers[:, 1] != np.round(numbers[:, 1]))
+    move = pairs & ~price_like
+    numbers[move, 0], numbers[move, 1] = numbers[move, 1], np.nan
+
+    return _columns(description, numbers, roles)
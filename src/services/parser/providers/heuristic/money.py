@@ -0,0 +1,148 @@
+import re
+from functools import lru_cache
+from typing import List, Literal, NamedTuple, Optional
+
+# Money-like numbers, optionally with a leading currency symbol
+MONEY_TOKEN = re.compile(r"(?:[\$€£]\s*+)?[0-9][0-9.,]*+")
+MONEY_JUNK = re.compile(r"[^\d,\.]")
+
+# Labels an amount can belong to. Tax labels skip tax/VAT registration
+# numbers ("Tax ID 123", "VAT No: 456").
+# (the leading lookahead lets the regex engine skip to candidate letters)
+AMOUNT_LABEL = re.compile(
+    r"(?=[sStTvVgGhHaAbB])\b(?:(?P<subtotal>sub\s*+(?:-\s*+)?total)"
+    r"|(?P<tax>(?:sales\s++)?(?:tax|vat)\b(?!\s*+(?:id\b|no\b|number|#|reg|code))|gst\b|hst\b)"
+    r"|(?P<total>grand\s*+total|total\s*+due|amount\s*+due|balance\s*+due|total\b))",
+    re.IGNORECASE,
+)
+
+AmountLabel = Literal["subtotal", "tax", "total"]
+
+
+class AmountToken(NamedTuple):
+    raw: str
+    value: Optional[float]         # locale-resolved, None if unparseable
+    start: int                     # offset in the document
+    line: int                      # 0-based line number
+    currency: Optional[str]        # "$", "€", "£"
+    percent: bool                  # followed by "%": a rate, not an amount
+    label: Optional[AmountLabel]   # nearest label on the line (or a label-only line above)
+
+
+@lru_cache(maxsize=4096)
+def normalize_money(raw: str) -> Optional[float]:
+    """
+    Normalize money strings into float, applying cleanup, conversion, and rejection logic.
+    """
+    # Remove all characters that are NOT a digit, comma, or period.
+    cleaned = MONEY_JUNK.sub("", raw)
+
+    commas, periods = cleaned.count(","), cleaned.count(".")
+
+    # Reject if three or more commas or periods are used
+    if commas >= 3 or periods >= 3:
+        return None
+
+    # Both separators: the rightmost one is the decimal separator
+    # "1,234.56" / "1,234,567.89" (US), "1.234,56" / "1.234.567,89" (EU)
+    if commas and periods:
+        decimal, thousands = (".", ",") if cleaned.rfind(".") > cleaned.rfind(",") else (",", ".")
+        if cleaned.count(decimal) > 1:
+            return None
+        cleaned = cleaned.replace(thousands, "").replace(decimal, ".")
+
+    # US Thousands Removal: "1,234,567" -> "1234567"
+    elif commas > 1:
+        cleaned = cleaned.replace(",", "")
+
+    # Only if there is exactly one comma and no periods: "194,82" -> "194.82"
+    elif commas == 1:
+        cleaned = cleaned.replace(",", ".")
+
+    # Cast to Float
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def lex_amounts(text: str) -> List[AmountToken]:
+    """
+    Tokenizes every money-like number of the document: one scan for
+    amounts, one for labels, merged left to right.
+    Each token gets the closest label to its left on the same line; tokens
+    on a line without one inherit the label of the line above when that
+    line holds a label but no amounts ("Total\n$22.00").
+    """
+    labels = [(m.start(), m.lastgroup) for m in AMOUNT_LABEL.finditer(text)]
+    labels.append((len(text), None))  # sentinel
+    next_label = 0
+
+    tokens: List[AmountToken] = []
+    append = tokens.append
+
+    line = 0
+    line_start, line_end = 0, -1
+    last_amount_line = -1              # last line with an amount that isn't a rate
+    label_pos, label = -1, None        # last label left of the current token
+    carried: Optional[str] = None      # label of a label-only line above
+
+    for m in MONEY_TOKEN.finditer(text):
+        start = m.start()
+
+        if start >= line_end:
+            # First amount on a new line
+            new_start = text.rfind("\n", 0, start) + 1
+            line += text.count("\n", line_start, new_start)
+            line_start = new_start
+            line_end = text.find("\n", start)
+            if line_end < 0:
+                line_end = len(text)
+
+            while labels[next_label][0] < line_start:
+                label_pos, label = labels[next_label]
+                next_label += 1
+
+            carried = None
+            if line_start and last_amount_line != line - 1:
+                above = text.rfind("\n", 0, line_start - 1) + 1
+                if label_pos >= above:
+                    carried = label
+
+        while labels[next_label][0] < start:
+            label_pos, label = labels[next_label]
+            next_label += 1
+
+        raw = m.group()
+        percent = text.startswith("%", m.end())
+        if not percent:
+            last_amount_line = line
+        append(AmountToken(
+            raw,
+            normalize_money(raw),
+            start,
+            line,
+            raw[0] if raw[0] in "$€£" else None,
+            percent,
+            label if label_pos >= line_start else carried,
+        ))
+
+    return tokens
+
+
+def labelled_amount(tokens: List[AmountToken], label: AmountLabel) -> Optional[float]:
+    """
+    Value for a label: on the first line with amounts carrying that label,
+    the last one that isn't a rate ("Tax (10%) $2.00" -> 2.00).
+    """
+    line = None
+    value = None
+    for token in tokens:
+        if token.label != label or token.percent or token.value is None:
+            continue
+        if line is None:
+            line = token.line
+        elif token.line != line:
+            break
+        value = token.value
+    return value
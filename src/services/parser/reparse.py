@@ -0,0 +1,253 @@
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import (ALL_COMPLETED, FIRST_COMPLETED,
+                                ProcessPoolExecutor, wait)
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from src.models.models import OCRResult
+from src.services.ocr.cache import OCRResultCache
+from src.utils.logging_config import logger
+
+from .factory import ParserFactory
+from .interface import BaseParser
+from .main import (RESULT_FOLDER, TIMESTAMP, _build_record, _serialize,
+                   parse_ocr_output)
+from .writers import JSONLResultWriter, iter_jsonl
+
+# Items sent to a worker per task (amortizes pickling/IPC overhead)
+CHUNK_SIZE = 64
+
+
+# Rebuild OCRResult objects
+def ocr_result_from_payload(payload: Optional[Dict[str, Any]], error: Optional[str] = None) -> OCRResult:
+    """
+    Rebuilds an OCRResult from a saved `ocr_result` payload.
+    The provider `raw` output is dropped: parsers never read it.
+    """
+    if not payload:
+        return OCRResult(error=error or "No saved OCR result")
+
+    tables = payload.get("tables")
+    if isinstance(tables, list):
+        tables = pd.DataFrame(tables)
+    elif isinstance(tables, str):
+        # Older batch files stored str(DataFrame), which can't be restored
+        logger.warning("Saved OCR tables are not restorable (stored as text)")
+        tables = None
+
+    return OCRResult(
+        text=payload.get("text"),
+        tables=tables,
+        error=payload.get("error"),
+    )
+
+
+def load_ocr_results(source: str) -> Iterator[Tuple[str, OCRResult]]:
+    """
+    Yields (file_path, OCRResult) pairs from:
+    - a batch results file written by run_batch (JSON or JSONL)
+    - an OCR cache directory
+    """
+    if os.path.isdir(source):
+        store = OCRResultCache(cache_dir=source, max_bytes=0, enabled=True)
+        yield from store.iter_entries()
+        return
+
+    if source.endswith(".jsonl"):
+        records = iter_jsonl(source)
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            records = json.load(f)
+
+    for record in records:
+        yield (
+            record.get("full_path") or record.get("file"),
+            ocr_result_from_payload(record.get("ocr_result"), record.get("error")),
+        )
+
+
+# Process-pool workers
+_WORKER_PARSER: Optional[BaseParser] = None
+
+
+def _init_worker(parser_name: str):
+    """
+    Builds the parser once per worker process.
+    """
+    global _WORKER_PARSER
+    _WORKER_PARSER = ParserFactory.get_parser(parser_name)
+    logger.info(f"[Worker {os.getpid()}] Loaded parser: {parser_name}")
+
+
+def _reparse_chunk(chunk: List[Tuple[int, str, OCRResult]]) -> List[Tuple[int, Dict[str, Any]]]:
+    out = []
+    for index, file_path, ocr_output in chunk:
+        try:
+            parsed = parse_ocr_output(ocr_output, _WORKER_PARSER, file_path)
+        except Exception as e:
+            logger.error(f"Parser failed for {file_path}: {e}", exc_info=True)
+            parsed = {"error": str(e)}
+        out.append((index, parsed))
+    return out
+
+
+def _chunks(items: Iterator[Tuple[str, OCRResult]], size: int) -> Iterator[List[Tuple[int, str, OCRResult]]]:
+    chunk = []
+    for index, (file_path, ocr_output) in enumerate(items):
+        chunk.append((index, file_path, ocr_output))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _iter_reparsed(source: str, parser_name: str, workers: int) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    """
+    Yields (file_path, index, parsed) as chunks finish.
+    """
+    if workers <= 1:
+        _init_worker(parser_name)
+        for chunk in _chunks(load_ocr_results(source), CHUNK_SIZE):
+            paths = {index: file_path for index, file_path, _ in chunk}
+            for index, parsed in _reparse_chunk(chunk):
+                yield paths[index], index, parsed
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(parser_name,)
+    ) as pool:
+        # Bound in-flight chunks so the source is read incrementally
+        max_in_flight = workers * 2
+        futures = {}
+
+        def drain(return_when):
+            done, _ = wait(futures, return_when=return_when)
+            for future in done:
+                paths = futures.pop(future)
+                for index, parsed in future.result():
+                    yield paths[index], index, parsed
+
+        for chunk in _chunks(load_ocr_results(source), CHUNK_SIZE):
+            paths = {index: file_path for index, file_path, _ in chunk}
+            futures[pool.submit(_reparse_chunk, chunk)] = paths
+            if len(futures) >= max_in_flight:
+                yield from drain(FIRST_COMPLETED)
+
+        if futures:
+            yield from drain(ALL_COMPLETED)
+
+
+# Re-parse entry point
+def run_reparse(source: str, parser_name: str = "heuristic", workers: int = None,
+    output_file: str = None, save_file: bool = True, output_format: str = "json"):
+    """
+    Replays previously saved OCR output through a parser, skipping OCR.
+    Returns the ordered records (json) or a summary (jsonl, streamed).
+    """
+    if not os.path.exists(source):
+        error = {"error": f"Path does not exist: {source}"}
+        logger.error(error["error"])
+        return [error]
+
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Re-parsing OCR results from {source} with parser: {parser_name} ({workers} workers)")
+
+    reparsed = _iter_reparsed(source, parser_name, workers)
+
+    if output_format == "jsonl":
+        if output_file is None:
+            output_file = os.path.join(RESULT_FOLDER, f"reparse_{TIMESTAMP}.jsonl")
+        if not save_file:
+            output_file = os.devnull
+
+        with JSONLResultWriter(output_file, default=_serialize) as writer:
+            for file_path, _, parsed in reparsed:
+                writer.write(_build_record(file_path, parser_name, parsed))
+
+        return {
+            "output_file": output_file if save_file else None,
+            "processed": writer.count,
+            "errors": writer.errors,
+        }
+
+    records: Dict[int, Dict[str, Any]] = {}
+    for file_path, index, parsed in reparsed:
+        records[index] = _build_record(file_path, parser_name, parsed)
+
+    results = [records[i] for i in range(len(records))]
+    logger.info(f"Re-parsed {len(results)} OCR results")
+
+    if save_file:
+        if output_file is None:
+            output_file = os.path.join(RESULT_FOLDER, f"reparse_{TIMESTAMP}.json")
+
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, default=_serialize)
+        logger.info(f"Saved re-parse results to {output_file}")
+
+    return results
+
+
+# CLI
+def cli():
+    parser = argparse.ArgumentParser(
+        description="Re-run only the parser stage over saved OCR results."
+    )
+    parser.add_argument(
+        "source",
+        help="Batch results file (.json / .jsonl) or OCR cache directory"
+    )
+    parser.add_argument(
+        "parser_name",
+        nargs="?",
+        default="heuristic",
+        help="Parser to use: heuristic | llm"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "jsonl"],
+        default="json",
+        help="json: one list written at the end | jsonl: stream one line per invoice"
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Output file (default: output/reparse_<timestamp>.<format>)"
+    )
+    parser.add_argument(
+        "--no-save",
+        action="store_true",
+        help="Do not save results to file (useful for debugging)"
+    )
+    args = parser.parse_args()
+
+    results = run_reparse(
+        args.source,
+        args.parser_name,
+        workers=args.workers,
+        output_file=args.output,
+        save_file=not args.no_save,
+        output_format=args.format
+    )
+
+    print(json.dumps(results, indent=4, default=_serialize))
+
+
+# Entry point
+if __name__ == "__main__":
+    cli()
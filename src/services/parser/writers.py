@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Callable, Collection, Dict, List, Literal, Optional
+
+from src.utils.file_utils import truncate_partial_line
+from src.utils.logging_config import logger
+
+RawMode = Literal["keep", "drop", "external"]
+
+
+class JSONLResultWriter:
+    """
+    Streams batch records to a JSON Lines file, one compact line per invoice.
+    - Lines are buffered and flushed every `flush_every` records
+    - `on_flush` runs after every flush (e.g. to checkpoint a manifest)
+    - `append` continues an existing file, first cutting off a partially
+      written last line and removing the records of `supersede` paths
+      (files about to be processed again, e.g. failed ones on resume)
+    - `raw_mode` controls the provider output stored under ocr_result.raw:
+        keep     -> serialized inline
+        drop     -> removed
+        external -> pickled to a sidecar folder, replaced by {"path": ...}
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        default: Callable[[Any], Any] = str,
+        raw_mode: RawMode = "keep",
+        flush_every: int = 50,
+        append: bool = False,
+        on_flush: Optional[Callable[[], None]] = None,
+        supersede: Optional[Collection[str]] = None,
+    ):
+        self.output_file = output_file
+        self.default = default
+        self.raw_mode = raw_mode
+        self.flush_every = max(1, flush_every)
+        self.on_flush = on_flush
+
+        self.raw_dir: Optional[str] = None
+        if raw_mode == "external":
+            self.raw_dir = f"{os.path.splitext(output_file)[0]}_raw"
+            os.makedirs(self.raw_dir, exist_ok=True)
+
+        self.count = 0
+        self.errors = 0
+        self._buffer: List[str] = []
+        if append:
+            dropped = truncate_partial_line(output_file)
+            if dropped:
+                logger.warning(f"Dropped a partial last line ({dropped} bytes) from {output_file}")
+            if supersede:
+                removed = drop_records(output_file, supersede)
+                if removed:
+                    logger.info(f"Removed {removed} superseded records from {output_file}")
+        self._file = open(output_file, "a" if append else "w", encoding="utf-8")
+
+
+    def write(self, record: Dict[str, Any]) -> None:
+        record = self._handle_raw(record)
+
+        self._buffer.append(
+            json.dumps(record, default=self.default, ensure_ascii=False) + "\n"
+        )
+        self.count += 1
+        if record.get("error"):
+            self.errors += 1
+
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._buffer.clear()
+        self._file.flush()
+
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        logger.info(f"Wrote {self.count} records to {self.output_file}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+    # Raw provider output
+    def _handle_raw(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        ocr_result = record.get("ocr_result")
+        if self.raw_mode == "keep" or not ocr_result or ocr_result.get("raw") is None:
+            return record
+
+        # Copy so the caller's record is left untouched
+        ocr_result = dict(ocr_result)
+
+        if self.raw_mode == "drop":
+            ocr_result["raw"] = None
+        else:
+            # Named by source path so appended (resumed) runs don't collide
+            source = record.get("full_path") or f"{self.count}"
+            stem = os.path.splitext(record.get("file") or "invoice")[0]
+            suffix = hashlib.sha1(source.encode()).hexdigest()[:12]
+            raw_path = os.path.join(self.raw_dir, f"{stem}_{suffix}.pkl")
+            with open(raw_path, "wb") as f:
+                pickle.dump(ocr_result["raw"], f, protocol=pickle.HIGHEST_PROTOCOL)
+            ocr_result["raw"] = {"path": raw_path}
+
+        return {**record, "ocr_result": ocr_result}
+
+
+def iter_jsonl(path: str):
+    """
+    Yields records from a JSON Lines file, one at a time.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def drop_records(path: str, full_paths: Collection[str]) -> int:
+    """
+    Rewrites a JSON Lines results file without the records of the given
+    source files (matched on full_path). Returns the number removed; the
+    file is only replaced when something was removed.
+    """
+    if not os.path.exists(path):
+        return 0
+
+    targets = {os.path.abspath(p) for p in full_paths}
+    tmp_path = f"{path}.tmp"
+    removed = 0
+    with open(path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+        for line in src:
+            if line.strip() and os.path.abspath(json.loads(line).get("full_path") or "") in targets:
+                removed += 1
+                continue
+            dst.write(line)
+
+    if removed:
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+    return removed
@@ -0,0 +1,41 @@
+import hashlib
+
+HASH_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+def file_digest(file_path: str, algorithm: str = "sha256") -> str:
+    """
+    Returns the hex digest of a file's bytes, read in chunks.
+    """
+    h = hashlib.new(algorithm)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def truncate_partial_line(file_path: str) -> int:
+    """
+    Cuts a line-oriented file back to its last newline, dropping a partially
+    written last line (e.g. after a kill), so appending starts on a fresh
+    line. Returns the number of bytes removed.
+    """
+    try:
+        f = open(file_path, "rb+")
+    except FileNotFoundError:
+        return 0
+
+    with f:
+        size = f.seek(0, 2)
+        end = size
+        while end > 0:
+            start = max(0, end - HASH_CHUNK_SIZE)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+        return size - end
@@ -0,0 +1,30 @@
+import importlib
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+
+@lru_cache(maxsize=None)
+def import_string(path: str) -> Any:
+    """
+    Imports "package.module:attr" and returns the attribute.
+    """
+    module_name, _, attr = path.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attr)
+
+
+@dataclass(frozen=True)
+class LazyClass:
+    """
+    Reference to a class that is imported only when first needed,
+    so heavy optional dependencies are paid for on selection, not at start-up.
+    """
+    path: str  # "package.module:ClassName"
+
+    @property
+    def name(self) -> str:
+        return self.path.rpartition(":")[2]
+
+    def load(self) -> Any:
+        return import_string(self.path)
@@ -0,0 +1,18 @@
+import pytest
+
+from src.config import get_settings
+
+
+@pytest.fixture
+def settings_env(monkeypatch):
+    """
+    Sets settings through their environment variables (e.g.
+    settings_env(OCR__MAX_PAGES=5)); get_settings is re-read around the test.
+    """
+    def apply(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        get_settings.cache_clear()
+
+    yield apply
+    get_settings.cache_clear()
@@ -0,0 +1,55 @@
+from concurrent.futures import Future
+
+from src.services.parser import main as batch
+
+
+class _InlinePool:
+    """ProcessPoolExecutor stand-in: runs each task on submit."""
+
+    def __init__(self, max_workers, initializer=None, initargs=(), **_):
+        self.submitted = 0
+        initializer(*initargs)
+        _InlinePool.last = self
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_init_worker_survives_failed_prewarm(monkeypatch):
+    warmed = []
+
+    def prewarm(extensions):
+        if extensions == [".png"]:
+            raise ModuleNotFoundError("No module named 'paddleocr'")
+        warmed.extend(extensions)
+        return []
+
+    monkeypatch.setattr(batch.InvoiceExtractorFactory, "prewarm", staticmethod(prewarm))
+
+    batch._init_worker([".pdf", ".png", ".tif"])
+
+    assert warmed == [".pdf", ".tif"]
+
+
+def test_parallel_batch_bounds_in_flight_files(monkeypatch):
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", _InlinePool)
+    monkeypatch.setattr(batch, "run_parser", lambda fp, *a, **k: {"structured_data": {"file": fp}})
+    files = [f"invoice_{i}.pdf" for i in range(20)]
+
+    workers, consumed = 2, 0
+    for _ in batch._iter_parallel(files, "heuristic", workers=workers):
+        consumed += 1
+        # Not yet consumed: up to 2 * workers running, plus the ones that
+        # just finished together
+        assert _InlinePool.last.submitted - consumed < 2 * (2 * workers)
+
+    assert consumed == len(files)
@@ -0,0 +1,49 @@
+import json
+
+from src.services.parser import main as batch
+from src.services.parser.manifest import BatchManifest
+from src.services.parser.writers import iter_jsonl
+
+
+def _invoices(folder, names):
+    folder.mkdir()
+    for name in names:
+        (folder / name).write_bytes(name.encode())
+    return str(folder)
+
+
+def _fake_run_parser(failing):
+    def run_parser(file_path, parser_name="heuristic", use_cache=True):
+        if file_path.endswith(tuple(failing)):
+            return {"error": "OCR failed", "sha256": None}
+        return {"structured_data": {"invoice_id": file_path}, "sha256": f"digest-{file_path}"}
+    return run_parser
+
+
+def test_resume_replaces_failed_records(tmp_path, monkeypatch):
+    folder = _invoices(tmp_path / "in", ["a.pdf", "b.pdf", "c.pdf"])
+    output = str(tmp_path / "out.jsonl")
+
+    monkeypatch.setattr(batch, "run_parser", _fake_run_parser({"b.pdf"}))
+    summary = batch.run_batch(folder, output_format="jsonl", output_file=output)
+    assert summary["errors"] == 1
+
+    monkeypatch.setattr(batch, "run_parser", _fake_run_parser(set()))
+    summary = batch.run_batch(folder, output_format="jsonl", output_file=output, resume=True)
+    assert summary["skipped"] == 2 and summary["processed"] == 1
+
+    records = list(iter_jsonl(output))
+    assert sorted(r["file"] for r in records) == ["a.pdf", "b.pdf", "c.pdf"]
+    assert not any(r["error"] for r in records)
+
+
+def test_manifest_reuses_the_record_digest(tmp_path, monkeypatch):
+    folder = _invoices(tmp_path / "in", ["a.pdf"])
+    output = str(tmp_path / "out.jsonl")
+
+    monkeypatch.setattr(batch, "run_parser", _fake_run_parser(set()))
+    batch.run_batch(folder, output_format="jsonl", output_file=output)
+
+    with open(BatchManifest.path_for(output), encoding="utf-8") as f:
+        entry = json.loads(f.readline())
+    assert entry["sha256"] == f"digest-{folder}/a.pdf"
@@ -0,0 +1,25 @@
+import pytest
+
+from src.services.ocr.batching import MicroBatcher
+
+
+def test_submit_after_close_raises():
+    batcher = MicroBatcher(lambda sources: [s * 2 for s in sources], max_wait_ms=0)
+    assert batcher.extract(21, timeout=5) == 42
+
+    batcher.close()
+    batcher.close()  # idempotent
+
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+    with pytest.raises(RuntimeError):
+        batcher.extract(1)
+
+
+def test_close_runs_submitted_sources():
+    batcher = MicroBatcher(lambda sources: list(sources), max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(6)]
+
+    batcher.close()
+
+    assert [f.result(timeout=5) for f in futures] == list(range(6))
@@ -0,0 +1,31 @@
+"""
+Golden corpus for HeuristicTextParser: each golden/heuristic_text/<case>.txt
+is parsed and the fields listed for it in expected.json must match exactly.
+Fields left out of a case are not checked. When a change is meant to alter
+the output, update expected.json in the same commit.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from src.services.parser.providers.heuristic.heuristic_text import \
+    HeuristicTextParser
+
+GOLDEN_DIR = Path(__file__).parent / "golden" / "heuristic_text"
+EXPECTED = json.loads((GOLDEN_DIR / "expected.json").read_text(encoding="utf-8"))
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return HeuristicTextParser()
+
+
+@pytest.mark.parametrize("case", sorted(EXPECTED))
+def test_golden(parser, case):
+    text = (GOLDEN_DIR / f"{case}.txt").read_text(encoding="utf-8")
+    result = parser.parse(text)
+
+    assert result.error is None
+    parsed = {field: getattr(result, field) for field in EXPECTED[case]}
+    assert parsed == EXPECTED[case]
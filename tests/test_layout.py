@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from src.services.parser.providers.heuristic.heuristic_table import \
+    HeuristicTableParser
+from src.services.parser.providers.heuristic.layout import build_layout
+
+
+def _boxes(rows):
+    return pd.DataFrame(rows, columns=["text", "x_min", "y_min", "x_max", "y_max"])
+
+
+INVOICE = [
+    ("ACME", 10, 10, 60, 20), ("Corp", 65, 10, 110, 20),
+    ("Invoice", 10, 40, 70, 50), ("No:", 75, 40, 100, 50), ("INV-1001", 200, 40, 280, 50),
+    ("Total", 10, 70, 60, 80), ("$22.00", 200, 70, 260, 80),
+]
+
+
+def test_build_layout_groups_lines_and_segments():
+    layout = build_layout(_boxes(INVOICE))
+
+    assert layout.lines() == ["ACME Corp", "Invoice No: INV-1001", "Total $22.00"]
+    assert list(layout.text) == ["ACME Corp", "Invoice No:", "INV-1001", "Total", "$22.00"]
+    assert layout.words == len(INVOICE)
+
+
+def test_build_layout_drops_missing_text():
+    rows = INVOICE + [(np.nan, 10, 100, 50, 110), (None, 60, 100, 90, 110), ("  ", 10, 130, 20, 140)]
+    layout = build_layout(_boxes(rows))
+
+    assert layout.lines() == ["ACME Corp", "Invoice No: INV-1001", "Total $22.00"]
+    assert layout.words == len(INVOICE)
+
+
+def test_table_parser_with_missing_text():
+    rows = INVOICE + [(np.nan, 10, 100, 50, 110)]
+    result = HeuristicTableParser().parse(_boxes(rows))
+
+    assert result.error is None
+    assert result.invoice_id == "INV-1001"
+    assert result.vendor_name == "ACME Corp"
+    assert result.total_amount == 22.0
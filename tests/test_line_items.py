@@ -0,0 +1,42 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.models.models import InvoiceParseResult
+from src.services.parser.providers.heuristic.heuristic_text import \
+    HeuristicTextParser
+
+GOLDEN_DIR = Path(__file__).parent / "golden" / "heuristic_text"
+
+
+def test_line_items_dump_json():
+    text = (GOLDEN_DIR / "us_service.txt").read_text(encoding="utf-8")
+    result = HeuristicTextParser().parse(text)
+
+    assert isinstance(result.line_items["amount"], np.ndarray)
+    dumped = json.loads(result.model_dump_json())
+    assert dumped["line_items"] == {
+        "description": ["Widget", "Gadget"],
+        "quantity": [2.0, 1.0],
+        "unit_price": [10.0, 5.5],
+        "amount": [20.0, 5.5],
+    }
+    assert result.model_dump(mode="json")["line_items"] == dumped["line_items"]
+
+
+def test_line_items_dump_json_nan_is_null():
+    result = InvoiceParseResult(line_items={
+        "description": np.array(["Support"], dtype=object),
+        "quantity": np.array([np.nan]),
+        "amount": np.array([99.0]),
+    })
+
+    dumped = json.loads(result.model_dump_json())
+    assert dumped["line_items"] == {"description": ["Support"], "quantity": [None], "amount": [99.0]}
+    # Python dumps keep the arrays
+    assert isinstance(result.model_dump()["line_items"]["amount"], np.ndarray)
+
+
+def test_line_items_dump_json_empty():
+    assert json.loads(InvoiceParseResult().model_dump_json())["line_items"] is None
@@ -0,0 +1,18 @@
+import pytest
+from PIL import Image
+
+pytest.importorskip("paddleocr")
+
+from src.services.ocr.providers.paddleocr import \
+    PaddleOCRExtractor  # noqa: E402
+
+
+def test_read_image_leaves_caller_images_untouched(tmp_path):
+    Image.new("RGB", (2400, 1600), "white").save(tmp_path / "scan.jpg")
+    image = Image.open(tmp_path / "scan.jpg")
+    extractor = PaddleOCRExtractor.__new__(PaddleOCRExtractor)
+
+    array = extractor._read_image(image, PaddleOCRExtractor.MAX_SIZE)
+
+    assert array.shape == (1600, 2400, 3)
+    assert image.size == (2400, 1600)
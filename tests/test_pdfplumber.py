@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+from PIL import Image
+
+from src.models.models import OCRResult
+from src.services.ocr.providers.ocr_utils import TABLE_COLUMNS
+from src.services.ocr.providers.pdfplumber import PDFPlumberExtractor
+
+# Letter page, in points
+PAGE_SIZE = (612, 792)
+# A word on the scanned page, in points (x_min, y_min, x_max, y_max)
+WORD_BOX = (100.0, 200.0, 300.0, 220.0)
+
+
+def _scanned_pdf(path, pages: int = 1) -> str:
+    # No text layer: every page goes through the OCR fallback
+    images = [Image.new("RGB", PAGE_SIZE, "white") for _ in range(pages)]
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=72.0)
+    return str(path)
+
+
+def _downscaling_ocr(image: Image.Image, max_size: int = 960) -> OCRResult:
+    """Like PaddleOCR: shrinks the page to max_size and reports the boxes in it."""
+    scale = min(1.0, max_size / max(image.size))
+    processed = (round(image.width * scale), round(image.height * scale))
+    px = [v * image.width / PAGE_SIZE[0] * scale for v in WORD_BOX]
+    tables = pd.DataFrame([["Total", *px, 0.99]], columns=TABLE_COLUMNS)
+    return OCRResult(tables=tables, raw={"image_size": processed})
+
+
+def test_ocr_boxes_map_to_points_on_downscaled_pages(tmp_path, settings_env):
+    settings_env(OCR__OCR_OUTPUT_MODE="table", OCR__PDF_RASTER_DPI=200)
+    extractor = PDFPlumberExtractor()
+    extractor._ocr_image = _downscaling_ocr
+
+    result = extractor.extract_data(_scanned_pdf(tmp_path / "scan.pdf"))
+
+    assert result.error is None
+    assert result.raw["ocr_pages"] == [1]
+    # Rasterized at 200 dpi the page is 1700 x 2200 px, over the 960 px limit
+    box = result.tables.loc[0, ["x_min", "y_min", "x_max", "y_max"]].to_numpy(dtype=float)
+    assert box == pytest.approx(WORD_BOX, abs=0.5)
+
+
+def test_ocr_boxes_without_reported_size_use_the_raster():
+    result = OCRResult(tables=pd.DataFrame([["Total", 200, 400, 600, 440, 0.9]], columns=TABLE_COLUMNS))
+
+    df = PDFPlumberExtractor._ocr_table(result, 792.0, PAGE_SIZE, (1224, 1584))
+
+    box = df.loc[0, ["x_min", "y_min", "x_max", "y_max"]].to_numpy(dtype=float)
+    assert box == pytest.approx((100.0, 992.0, 300.0, 1012.0))
+
+
+def test_paddleocr_reports_processed_size():
+    pytest.importorskip("paddleocr")
+    from src.services.ocr.providers.paddleocr import PaddleOCRExtractor
+
+    extractor = PaddleOCRExtractor.__new__(PaddleOCRExtractor)
+    extractor.output_mode = "table"
+    prediction = {"rec_texts": ["Total"], "rec_boxes": np.array([[10, 20, 60, 30]]), "rec_scores": [0.9]}
+
+    result = extractor._to_result(prediction, np.zeros((960, 742, 3), dtype=np.uint8))
+
+    assert result.raw["image_size"] == (742, 960)
+
+
+def _text_pdf(path, pages) -> str:
+    """Minimal PDF with one line of Helvetica text per page."""
+    n = len(pages)
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(n))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode(),
+    ]
+    font = 3 + 2 * n
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_SIZE[0]} {PAGE_SIZE[1]}] "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {4 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    path.write_bytes(bytes(out))
+    return str(path)
+
+
+def test_parallel_page_ranges_keep_page_order(tmp_path, settings_env, monkeypatch):
+    settings_env(OCR__PDF_PAGE_WORKERS=2)
+    extractor = PDFPlumberExtractor()
+    monkeypatch.setattr(extractor, "RANGE_PAGES", 3)
+    ranges = []
+    parallel = extractor._iter_pages_parallel
+    monkeypatch.setattr(extractor, "_iter_pages_parallel", lambda *a: ranges.append(a) or parallel(*a))
+
+    pages = [f"Page {i} text" for i in range(1, extractor.parallel_min_pages + 3)]
+    result = extractor.extract_data(_text_pdf(tmp_path / "long.pdf", pages))
+
+    assert ranges, "the default threshold should allow the parallel path"
+    assert result.error is None
+    assert result.text.splitlines() == pages
+    assert result.raw["pages_read"] == len(pages)
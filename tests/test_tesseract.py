@@ -0,0 +1,35 @@
+from src.services.ocr.providers import tesseract
+from src.services.ocr.providers.tesseract import TesseractExtractor
+
+
+def _image_to_data(rows):
+    # pytesseract.image_to_data(output_type=DICT) columns; conf -1 = layout row
+    keys = ["block_num", "par_num", "line_num", "left", "top", "width", "height", "conf", "text"]
+    return {key: [row[i] for row in rows] for i, key in enumerate(keys)}
+
+
+def test_text_keeps_blank_lines_between_paragraphs():
+    data = _image_to_data([
+        (1, 0, 0, 0, 0, 200, 40, -1, ""),
+        (1, 1, 1, 10, 10, 50, 10, 96, "ACME"),
+        (1, 1, 1, 65, 10, 40, 10, 95, "Corp"),
+        (1, 1, 2, 10, 25, 90, 10, 91, "Springfield"),
+        (2, 1, 1, 10, 60, 60, 10, 93, "Invoice"),
+        (2, 1, 1, 75, 60, 40, 10, 92, "INV-1"),
+        (2, 2, 1, 10, 80, 40, 10, 90, "Total"),
+        (2, 2, 1, 55, 80, 40, 10, 90, "$5.00"),
+    ])
+
+    text = TesseractExtractor._words_to_text(TesseractExtractor._words_to_df(data))
+
+    assert text == "ACME Corp\nSpringfield\n\nInvoice INV-1\n\nTotal $5.00"
+
+
+def test_cache_key_includes_backend(settings_env, monkeypatch):
+    monkeypatch.setattr(tesseract, "tesserocr", object())
+
+    settings_env(OCR__TESSERACT_BACKEND="auto")
+    assert TesseractExtractor.cache_key_params_for()["backend"] == "tesserocr"
+
+    settings_env(OCR__TESSERACT_BACKEND="subprocess")
+    assert TesseractExtractor.cache_key_params_for()["backend"] == "subprocess"